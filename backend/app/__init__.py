@@ -0,0 +1,4 @@
+import time
+
+# Taken before main.py pulls in FastAPI/SQLModel; see main.STARTUP_TIMINGS.
+IMPORT_STARTED = time.perf_counter()
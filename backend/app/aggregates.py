@@ -0,0 +1,149 @@
+"""Running totals behind /goals/summary.
+
+Every write that adds, removes or re-weighs sets applies the change to the
+single ``runningtotals`` row in the same transaction, so the summary is one
+primary-key read. ``rebuild_totals`` recomputes the row from scratch:
+
+    python -m app.aggregates
+"""
+
+import argparse
+import sys
+from typing import Iterable, List, Optional
+
+from sqlalchemy import and_, bindparam, case, delete, func, select, text
+from sqlalchemy.engine import Connection
+
+from .archive import archived_totals
+from .catalog import is_chinup_expr
+from .models import Exercise, RunningTotals, SetEntry, WorkoutSession
+
+TOTALS_ID = 1
+# SQLite's default host-parameter limit is 32766; stay well below it.
+_ID_CHUNK = 10000
+
+
+def total_load_expr():
+    """SQL equivalent of main.total_load; needs Exercise and WorkoutSession joined in."""
+    return SetEntry.weight_kg + case(
+        (
+            and_(Exercise.uses_bodyweight, WorkoutSession.bodyweight_kg.is_not(None)),
+            WorkoutSession.bodyweight_kg,
+        ),
+        else_=0.0,
+    )
+
+
+def _totals_of(*where):
+    is_chinup = is_chinup_expr()
+    return (
+        select(
+            func.count(SetEntry.id),
+            func.coalesce(func.sum(total_load_expr()), 0.0),
+            func.coalesce(func.sum(case((is_chinup, SetEntry.reps), else_=0)), 0),
+            func.coalesce(func.sum(case((is_chinup, 1), else_=0)), 0),
+        )
+        .select_from(SetEntry)
+        .join(Exercise, Exercise.id == SetEntry.exercise_id, isouter=True)
+        .join(WorkoutSession, WorkoutSession.id == SetEntry.session_id, isouter=True)
+        .where(*where)
+    )
+
+
+def apply_entries(conn: Connection, *where, sign: int = 1) -> None:
+    """Add (sign=1) or remove (sign=-1) the sets matching `where` to the running totals.
+
+    Call with sign=-1 before deleting or changing sets and sign=1 after
+    inserting or changing them, inside the same transaction.
+    """
+    _add_totals(conn, *conn.execute(_totals_of(*where)).one(), sign=sign)
+
+
+# Raw SQL like appmeta's upserts: SQLAlchemy never caches the compiled form of
+# the SQLite dialect's insert (Insert.inherit_cache is False), and compiling
+# this upsert on every write cost ten times more than running it.
+_ADD_TOTALS = text(
+    "INSERT INTO runningtotals (id, total_sets, total_load_kg, chinup_reps, chinup_sets) "
+    "VALUES (:id, :sets, :load, :chinup_reps, :chinup_sets) "
+    "ON CONFLICT(id) DO UPDATE SET "
+    "total_sets = total_sets + excluded.total_sets, "
+    "total_load_kg = total_load_kg + excluded.total_load_kg, "
+    "chinup_reps = chinup_reps + excluded.chinup_reps, "
+    "chinup_sets = chinup_sets + excluded.chinup_sets"
+)
+# Built once: constructing the totals select took most of a single-set
+# write's time, far more than running it.
+_TOTALS_OF_IDS = _totals_of(SetEntry.id.in_(bindparam("ids", expanding=True)))
+_TOTALS_OF_SESSION = _totals_of(SetEntry.session_id == bindparam("session_id"))
+
+
+def _add_totals(conn: Connection, sets, load, chinup_reps, chinup_sets, sign: int = 1) -> None:
+    if not sets:
+        return
+    conn.execute(
+        _ADD_TOTALS,
+        {
+            "id": TOTALS_ID,
+            "sets": sign * sets,
+            "load": sign * load,
+            "chinup_reps": sign * chinup_reps,
+            "chinup_sets": sign * chinup_sets,
+        },
+    )
+
+
+def apply_entry_ids(conn: Connection, entry_ids: Iterable[int], sign: int = 1) -> None:
+    ids: List[int] = list(entry_ids)
+    for start in range(0, len(ids), _ID_CHUNK):
+        chunk = ids[start : start + _ID_CHUNK]
+        _add_totals(conn, *conn.execute(_TOTALS_OF_IDS, {"ids": chunk}).one(), sign=sign)
+
+
+def apply_session(conn: Connection, session_id: int, sign: int = 1) -> None:
+    """apply_entries for every set of one session."""
+    totals = conn.execute(_TOTALS_OF_SESSION, {"session_id": session_id}).one()
+    _add_totals(conn, *totals, sign=sign)
+
+
+def reset_totals(conn: Connection) -> None:
+    conn.execute(delete(RunningTotals))
+
+
+def rebuild_totals(conn: Connection) -> None:
+    """Recompute the totals from every stored set, archived ones included."""
+    reset_totals(conn)
+    apply_entries(conn)
+    _add_totals(conn, *archived_totals(conn))
+
+
+def read_totals(conn: Connection) -> RunningTotals:
+    row = conn.execute(select(RunningTotals).where(RunningTotals.id == TOTALS_ID)).first()
+    return RunningTotals(**row._mapping) if row else RunningTotals(id=TOTALS_ID)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argparse.ArgumentParser(description="Recompute the /goals/summary running totals.").parse_args(
+        argv
+    )
+
+    from sqlmodel import Session
+
+    from .dataversion import bump_data_version
+    from .db import engine, init_db
+
+    init_db()
+    with Session(engine) as db:
+        conn = db.connection()
+        rebuild_totals(conn)
+        totals = read_totals(conn)
+        bump_data_version(db)
+        db.commit()
+    print(
+        f"Rebuilt running totals: {totals.total_sets} sets, "
+        f"{totals.chinup_sets} chin-up sets ({totals.chinup_reps} reps)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+"""Vectorised analytics over the whole set history.
+
+The history, archived sets included, is read once per data version into
+NumPy column arrays; the /analytics endpoints then compute tonnage, e1RM and
+rolling load with array operations instead of per-row Python loops. The rules
+match main.py: ``total_load`` adds session bodyweight for bodyweight
+exercises, tonnage is total load times reps, and e1RM is Epley on the total
+load.
+"""
+
+import threading
+from datetime import date, datetime, timezone
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.engine import Engine
+
+from .archive import SESSION_BODYWEIGHTS, Archive, load_archive, session_bodyweights
+from .catalog import Catalog, ExerciseInfo
+from .dataversion import current_data_version
+
+DAY_S = 86400
+# Day 0 (1970-01-01) was a Thursday; shifting by 3 days puts weeks on Mondays.
+_MONDAY_SHIFT = 3
+
+# Unordered: every computation below groups with np.unique, which sorts anyway.
+_HISTORY_SQL = (
+    "SELECT CAST(strftime('%s', e.created_at) AS INTEGER), e.exercise_id, e.weight_kg, e.reps, "
+    "IFNULL(s.bodyweight_kg, 0.0) "
+    "FROM setentry e LEFT JOIN workoutsession s ON s.id = e.session_id"
+)
+_ROW = np.dtype(
+    [
+        ("ts", "i8"),
+        ("exercise_id", "i8"),
+        ("weight_kg", "f8"),
+        ("reps", "i8"),
+        ("bodyweight_kg", "f8"),
+    ]
+)
+
+
+class SetHistory(NamedTuple):
+    ts: np.ndarray  # seconds since the epoch, naive UTC like created_at
+    exercise_id: np.ndarray
+    weight_kg: np.ndarray
+    reps: np.ndarray
+    bodyweight_kg: np.ndarray  # 0 where the session has none; it adds nothing either way
+
+    @property
+    def size(self) -> int:
+        return int(self.ts.shape[0])
+
+    def select(self, mask: np.ndarray) -> "SetHistory":
+        return SetHistory(*(column[mask] for column in self))
+
+
+def _archived_history(conn, archive: Archive) -> SetHistory:
+    sets = archive.sets()
+    bodyweights = conn.execute(SESSION_BODYWEIGHTS)
+    return SetHistory(
+        sets.created_at_us // 1_000_000,
+        np.asarray(sets.exercise_id),
+        np.asarray(sets.weight_kg),
+        np.asarray(sets.reps),
+        session_bodyweights(sets.session_id, bodyweights),
+    )
+
+
+def load_history(engine: Engine) -> SetHistory:
+    """Hot sets from SQLite followed by the archived ones."""
+    with engine.connect() as conn:
+        # Iterate the DBAPI cursor directly: fromiter never builds Row objects.
+        result = conn.exec_driver_sql(_HISTORY_SQL)
+        rows = np.fromiter(result.cursor, dtype=_ROW)
+        hot = SetHistory(*(np.ascontiguousarray(rows[name]) for name in _ROW.names))
+        archive = load_archive(conn)
+        if not archive.segments:
+            return hot
+        archived = _archived_history(conn, archive)
+    return SetHistory(*(np.concatenate(columns) for columns in zip(hot, archived)))
+
+
+_lock = threading.Lock()
+_cached: Optional[Tuple[int, SetHistory]] = None
+
+
+def history(engine: Engine) -> SetHistory:
+    """The full history, reloaded only after a write bumps the data version."""
+    global _cached
+    version = current_data_version(engine)
+    with _lock:
+        cached = _cached
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    loaded = load_history(engine)
+    with _lock:
+        _cached = (version, loaded)
+    return loaded
+
+
+def epoch_seconds(value: datetime) -> int:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((value - datetime(1970, 1, 1)).total_seconds())
+
+
+def in_range(h: SetHistory, since: Optional[datetime], until: Optional[datetime]) -> SetHistory:
+    """Sets with since <= created_at < until."""
+    if since is None and until is None:
+        return h
+    mask = np.ones(h.size, dtype=bool)
+    if since is not None:
+        mask &= h.ts >= epoch_seconds(since)
+    if until is not None:
+        mask &= h.ts < epoch_seconds(until)
+    return h.select(mask)
+
+
+def _per_set(
+    catalog: Catalog, h: SetHistory, value: Callable[[ExerciseInfo], object], default, dtype
+) -> np.ndarray:
+    """value(exercise) for every set, via a lookup table indexed by exercise id."""
+    size = max(max(catalog.by_id, default=0), int(h.exercise_id.max(initial=0))) + 1
+    table = np.full(size, default, dtype=dtype)
+    for ex in catalog.ordered:
+        table[ex.id] = value(ex)
+    return table[h.exercise_id]
+
+
+def total_load(h: SetHistory, catalog: Catalog) -> np.ndarray:
+    uses_bodyweight = _per_set(catalog, h, lambda ex: ex.uses_bodyweight, False, bool)
+    return h.weight_kg + np.where(uses_bodyweight, h.bodyweight_kg, 0.0)
+
+
+def epley_1rm(load: np.ndarray, reps: np.ndarray) -> np.ndarray:
+    return load * (1.0 + reps / 30.0)
+
+
+def day_index(ts: np.ndarray) -> np.ndarray:
+    return ts // DAY_S
+
+
+def week_index(ts: np.ndarray) -> np.ndarray:
+    """Day index of the Monday starting each timestamp's week."""
+    days = day_index(ts)
+    return days - (days + _MONDAY_SHIFT) % 7
+
+
+def _dates(days: np.ndarray) -> List[date]:
+    return days.astype("datetime64[D]").tolist()
+
+
+def weekly_volume(h: SetHistory, catalog: Catalog) -> List[dict]:
+    """Sets, reps and tonnage per (Monday, body_part), ordered by week then body_part."""
+    parts = sorted({ex.body_part for ex in catalog.ordered})
+    codes = {part: i for i, part in enumerate(parts)}
+    # Sets whose exercise is gone are dropped, as the inner join in /heatmap does.
+    code = _per_set(catalog, h, lambda ex: codes[ex.body_part], -1, np.int64)
+    known = code >= 0
+    h, code = h.select(known), code[known]
+    if not h.size:
+        return []
+
+    key = week_index(h.ts) * len(parts) + code
+    groups, inverse = np.unique(key, return_inverse=True)
+    sets = np.bincount(inverse)
+    reps = np.bincount(inverse, weights=h.reps)
+    tonnage = np.bincount(inverse, weights=total_load(h, catalog) * h.reps)
+    weeks = _dates(groups // len(parts))
+    return [
+        {
+            "week": week,
+            "body_part": parts[c],
+            "sets": n,
+            "reps": int(r),
+            "tonnage_kg": t,
+        }
+        for week, c, n, r, t in zip(
+            weeks, (groups % len(parts)).tolist(), sets.tolist(), reps.tolist(), tonnage.tolist()
+        )
+    ]
+
+
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over `window` entries; entries before the start count as zero."""
+    sums = np.cumsum(np.concatenate(([0.0], values)))
+    ends = np.arange(1, values.shape[0] + 1)
+    return (sums[ends] - sums[np.maximum(ends - window, 0)]) / window
+
+
+def workload(
+    h: SetHistory,
+    catalog: Catalog,
+    acute_days: int = 7,
+    chronic_days: int = 28,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[dict]:
+    """Daily tonnage with acute and chronic rolling means and their ratio (ACWR).
+
+    Covers every day from the first to the last set, rest days included, then
+    keeps the days in [since, until); the rolling windows still see the days
+    before `since`. The ratio is None while the chronic load is zero.
+    """
+    if not h.size:
+        return []
+    days = day_index(h.ts)
+    first = int(days.min())
+    load = np.bincount(days - first, weights=total_load(h, catalog) * h.reps)
+    acute = _rolling_mean(load, acute_days)
+    chronic = _rolling_mean(load, chronic_days)
+    ratio = np.divide(acute, chronic, out=np.zeros_like(acute), where=chronic > 0)
+
+    start, stop = 0, load.shape[0]
+    if since is not None:
+        start = max(start, -(-epoch_seconds(since) // DAY_S) - first)
+    if until is not None:
+        stop = min(stop, -(-epoch_seconds(until) // DAY_S) - first)
+    if start >= stop:
+        return []
+    window = slice(start, stop)
+    return [
+        {
+            "date": day,
+            "load_kg": day_load,
+            "acute_kg": a,
+            "chronic_kg": c,
+            "ratio": r if c > 0 else None,
+        }
+        for day, day_load, a, c, r in zip(
+            _dates(np.arange(first + start, first + stop)),
+            load[window].tolist(),
+            acute[window].tolist(),
+            chronic[window].tolist(),
+            ratio[window].tolist(),
+        )
+    ]
+
+
+def e1rm_trends(h: SetHistory, catalog: Catalog) -> List[dict]:
+    """Least-squares slope (kg/week) of each exercise's best daily e1RM."""
+    if not h.size:
+        return []
+    e1rm = epley_1rm(total_load(h, catalog), h.reps)
+    days = day_index(h.ts)
+    first = int(days.min())
+    span = int(days.max()) - first + 1
+
+    # Best e1RM per (exercise, day); np.unique sorts by exercise, then day.
+    groups, inverse = np.unique(h.exercise_id * span + (days - first), return_inverse=True)
+    best = np.full(groups.shape[0], -np.inf)
+    np.maximum.at(best, inverse, e1rm)
+    exercise = groups // span
+    weeks = (groups % span) / 7.0
+
+    ids, per_exercise, counts = np.unique(exercise, return_inverse=True, return_counts=True)
+    sx = np.bincount(per_exercise, weights=weeks)
+    sy = np.bincount(per_exercise, weights=best)
+    sxx = np.bincount(per_exercise, weights=weeks * weeks)
+    sxy = np.bincount(per_exercise, weights=weeks * best)
+    denom = counts * sxx - sx * sx
+    slope = np.divide(counts * sxy - sx * sy, denom, out=np.zeros_like(sx), where=denom > 0)
+
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    latest = best[starts + counts - 1]
+    peak = np.maximum.reduceat(best, starts)
+    return [
+        {
+            "exercise_id": ex_id,
+            "exercise_name": catalog.name(ex_id),
+            "days": n,
+            "slope_kg_per_week": s if d > 0 else None,
+            "latest_e1rm_kg": last,
+            "best_e1rm_kg": top,
+        }
+        for ex_id, n, s, d, last, top in zip(
+            ids.tolist(),
+            counts.tolist(),
+            slope.tolist(),
+            denom.tolist(),
+            latest.tolist(),
+            peak.tolist(),
+        )
+    ]
@@ -0,0 +1,35 @@
+"""Reads and writes of the ``appmeta`` key/value table."""
+
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+
+def read_meta(conn: Connection, key: str) -> Optional[str]:
+    return conn.execute(text("SELECT value FROM appmeta WHERE key = :key"), {"key": key}).scalar()
+
+
+def write_meta(conn: Connection, key: str, value: str) -> None:
+    conn.execute(
+        text(
+            "INSERT INTO appmeta (key, value) VALUES (:key, :value) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value"
+        ),
+        {"key": key, "value": value},
+    )
+
+
+def increment_meta(conn: Connection, key: str) -> None:
+    """Add one to an integer value, starting from 1."""
+    conn.execute(
+        text(
+            "INSERT INTO appmeta (key, value) VALUES (:key, '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        ),
+        {"key": key},
+    )
+
+
+def delete_meta(conn: Connection, key: str) -> None:
+    conn.execute(text("DELETE FROM appmeta WHERE key = :key"), {"key": key})
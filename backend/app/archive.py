@@ -0,0 +1,512 @@
+"""Cold storage for old sets.
+
+Archiving moves every set created before a day-aligned cutoff out of
+``setentry`` into an immutable segment under ``ARCHIVE_DIR``: one ``.npy``
+file per fixed-width column (id, session_id, exercise_id, created_at in
+microseconds, weight_kg, reps), memory-mapped when read. Sessions, goals,
+running totals and rollups stay in SQLite, so summaries and long-range charts
+still include the archived sets while the live database stays small.
+
+The cutoff becomes the archive horizon (``archive_horizon`` in ``appmeta``).
+History before it is read-only: writes that would add, re-weigh or remove
+archived sets are refused, so the totals and rollups they fed stay valid.
+Idempotency keys of archived sets move to ``archivedkey``, so a batch replay
+of one is still dropped as a duplicate. Sets are copied in batches of
+``ARCHIVE_BATCH_SIZE``, so memory stays flat however many are archived.
+A segment only counts once the transaction that deleted its rows has moved
+the horizon past it; a segment left behind by a failed run is ignored and
+removed by the next one.
+
+    python -m app.archive [--older-than-days 365] [--vacuum]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session
+
+from .appmeta import delete_meta, increment_meta, read_meta, write_meta
+from .cache import CommitCache, mark, on_commit, on_meta_change
+from .catalog import is_chinup
+from .dataversion import bump_data_version
+from .models import ArchivedKey, Exercise, SetEntry, WorkoutSession
+
+HORIZON_KEY = "archive_horizon"
+# Bumped with every archive run or clear, so other processes drop their cache.
+VERSION_KEY = "archive_version"
+CHANGED, CLEARED = "archive_changed", "archive_cleared"
+DEFAULT_AFTER_DAYS = 365
+# Sets read from SQLite and written to the column files at a time.
+ARCHIVE_BATCH_SIZE = 10000
+SEGMENT_PREFIX = "sets-"
+
+COLUMNS = (
+    ("id", "<i8"),
+    ("session_id", "<i8"),
+    ("exercise_id", "<i8"),
+    ("created_at_us", "<i8"),  # microseconds since the epoch, naive UTC like created_at
+    ("weight_kg", "<f8"),
+    ("reps", "<i8"),
+)
+_EPOCH = datetime(1970, 1, 1)
+_US = timedelta(microseconds=1)
+_US_PER_DAY = 86_400_000_000
+
+archive_dir: Optional[str] = None
+after_days = DEFAULT_AFTER_DAYS
+
+
+def configure(path: Optional[str], older_than_days: int = DEFAULT_AFTER_DAYS) -> None:
+    """Keep segments under `path` (None disables archiving) and archive sets past that age."""
+    global archive_dir, after_days
+    archive_dir, after_days = path, older_than_days
+    invalidate_archive()
+
+
+def epoch_us(value: datetime) -> int:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // _US
+
+
+class ArchivedSets(NamedTuple):
+    id: np.ndarray
+    session_id: np.ndarray
+    exercise_id: np.ndarray
+    created_at_us: np.ndarray
+    weight_kg: np.ndarray
+    reps: np.ndarray
+
+    @property
+    def size(self) -> int:
+        return int(self.id.shape[0])
+
+    def select(self, mask: np.ndarray) -> "ArchivedSets":
+        return ArchivedSets(*(column[mask] for column in self))
+
+    def created_at(self) -> List[datetime]:
+        return self.created_at_us.astype("datetime64[us]").tolist()
+
+    @classmethod
+    def concat(cls, parts: Iterable["ArchivedSets"]) -> "ArchivedSets":
+        parts = list(parts)
+        if not parts:
+            return cls(*(np.empty(0, dtype=dtype) for _, dtype in COLUMNS))
+        return cls(*(np.concatenate(columns) for columns in zip(*parts)))
+
+
+class Archive(NamedTuple):
+    """Snapshot of the committed archive: the horizon and its segments, oldest first."""
+
+    horizon: Optional[datetime]
+    segments: Tuple[ArchivedSets, ...]
+
+    @property
+    def size(self) -> int:
+        return sum(segment.size for segment in self.segments)
+
+    def holds(self, value: datetime) -> bool:
+        """True when a set created at `value` would fall before the horizon."""
+        return self.horizon is not None and epoch_us(value) < epoch_us(self.horizon)
+
+    def sets(
+        self,
+        exercise_id: Optional[int] = None,
+        session_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> ArchivedSets:
+        """Matching sets ordered by created_at, id (`until` is exclusive)."""
+        parts = []
+        for segment in self.segments:
+            mask = np.ones(segment.size, dtype=bool)
+            if exercise_id is not None:
+                mask &= segment.exercise_id == exercise_id
+            if session_id is not None:
+                mask &= segment.session_id == session_id
+            if since is not None:
+                mask &= segment.created_at_us >= epoch_us(since)
+            if until is not None:
+                mask &= segment.created_at_us < epoch_us(until)
+            parts.append(segment.select(mask))
+        return ArchivedSets.concat(parts)
+
+    def latest(self, skip: Iterable[int] = ()) -> ArchivedSets:
+        """The newest set of each exercise not in `skip`, oldest first."""
+        sets = self.sets()
+        # Sets are ordered by created_at, id, so the last one per exercise is its newest.
+        _, from_end = np.unique(sets.exercise_id[::-1], return_index=True)
+        newest = np.sort(sets.size - 1 - from_end)
+        skipped = np.fromiter(skip, dtype=np.int64)
+        return sets.select(newest[~np.isin(sets.exercise_id[newest], skipped)])
+
+    def by_id(self, ids: Iterable[int]) -> ArchivedSets:
+        wanted = np.fromiter(ids, dtype=np.int64)
+        return ArchivedSets.concat(s.select(np.isin(s.id, wanted)) for s in self.segments)
+
+    def holds_session(self, session_id: int) -> bool:
+        return any(bool((s.session_id == session_id).any()) for s in self.segments)
+
+    def session_counts(self, session_ids: Iterable[int]) -> Dict[int, int]:
+        wanted = np.fromiter(session_ids, dtype=np.int64)
+        counts: Dict[int, int] = {}
+        for segment in self.segments:
+            ids, n = np.unique(
+                segment.session_id[np.isin(segment.session_id, wanted)], return_counts=True
+            )
+            for session_id, count in zip(ids.tolist(), n.tolist()):
+                counts[session_id] = counts.get(session_id, 0) + count
+        return counts
+
+
+def _segment_name(until: date) -> str:
+    return f"{SEGMENT_PREFIX}{until:%Y%m%d}"
+
+
+def _segment_until(name: str) -> Optional[date]:
+    if not name.startswith(SEGMENT_PREFIX) or name.endswith(".tmp"):
+        return None
+    try:
+        return datetime.strptime(name[len(SEGMENT_PREFIX) :], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def _segment_dirs() -> List[Tuple[date, str]]:
+    if not archive_dir or not os.path.isdir(archive_dir):
+        return []
+    found = []
+    for name in os.listdir(archive_dir):
+        until = _segment_until(name)
+        if until is not None:
+            found.append((until, os.path.join(archive_dir, name)))
+    return sorted(found)
+
+
+def _open_segment(path: str) -> ArchivedSets:
+    return ArchivedSets(
+        *(np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name, _ in COLUMNS)
+    )
+
+
+def read_horizon(conn: Connection) -> Optional[datetime]:
+    value = read_meta(conn, HORIZON_KEY)
+    return datetime.fromisoformat(value) if value else None
+
+
+def load_archive(conn: Connection) -> Archive:
+    horizon = read_horizon(conn)
+    if horizon is None:
+        return Archive(None, ())
+    segments = tuple(
+        _open_segment(path) for until, path in _segment_dirs() if until <= horizon.date()
+    )
+    return Archive(horizon, segments)
+
+
+_archive: CommitCache[Archive] = CommitCache()
+
+
+def _load(engine: Engine) -> Archive:
+    with engine.connect() as conn:
+        return load_archive(conn)
+
+
+def get_archive(engine: Engine) -> Archive:
+    return _archive.get(lambda: _load(engine))
+
+
+def cached_archive() -> Optional[Archive]:
+    return _archive.peek()
+
+
+def invalidate_archive() -> None:
+    _archive.invalidate()
+
+
+def _remove_segments() -> None:
+    for _, path in _segment_dirs():
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _mark_changed(db: Session) -> None:
+    increment_meta(db.connection(), VERSION_KEY)
+    mark(db, CHANGED)
+
+
+on_commit(CHANGED, invalidate_archive)
+on_commit(CLEARED, _remove_segments)
+on_meta_change(VERSION_KEY, invalidate_archive)
+
+
+def clear_archive(db: Session) -> None:
+    """Forget the horizon; the segment files are removed once the transaction commits."""
+    delete_meta(db.connection(), HORIZON_KEY)
+    db.connection().execute(delete(ArchivedKey))
+    _mark_changed(db)
+    mark(db, CLEARED)
+
+
+# (id, bodyweight_kg) of every session with a bodyweight, for session_bodyweights.
+SESSION_BODYWEIGHTS = select(WorkoutSession.id, WorkoutSession.bodyweight_kg).where(
+    WorkoutSession.bodyweight_kg.is_not(None)
+)
+
+
+def _loads(conn: Connection, sets: ArchivedSets) -> Tuple[np.ndarray, np.ndarray]:
+    """Total load of each set (bodyweight added as aggregates does) and whether it is a chin-up."""
+    exercises = conn.execute(select(Exercise.id, Exercise.name, Exercise.uses_bodyweight)).all()
+    bodyweights = conn.execute(SESSION_BODYWEIGHTS).all()
+    size = max([int(sets.exercise_id.max())] + [ex_id for ex_id, _, _ in exercises]) + 1
+    uses_bodyweight = np.zeros(size, dtype=bool)
+    chinup = np.zeros(size, dtype=bool)
+    for ex_id, name, bw in exercises:
+        uses_bodyweight[ex_id] = bool(bw)
+        chinup[ex_id] = is_chinup(name)
+    bodyweight = session_bodyweights(sets.session_id, bodyweights)
+    load = sets.weight_kg + np.where(uses_bodyweight[sets.exercise_id], bodyweight, 0.0)
+    return load, chinup[sets.exercise_id]
+
+
+def archived_totals(conn: Connection) -> Tuple[int, float, int, int]:
+    """(sets, total load, chin-up reps, chin-up sets) of the archive, as aggregates sums them."""
+    sets = load_archive(conn).sets()
+    if not sets.size:
+        return 0, 0.0, 0, 0
+    load, chinup_sets = _loads(conn, sets)
+    return (
+        sets.size,
+        float(load.sum()),
+        int(sets.reps[chinup_sets].sum()),
+        int(chinup_sets.sum()),
+    )
+
+
+_ROLLUP_COLUMNS = (
+    "exercise_id",
+    "bucket",
+    "sets",
+    "reps",
+    "tonnage_kg",
+    "top_set_kg",
+    "max_e1rm_kg",
+    "best_set_id",
+)
+
+
+def archived_daily_rollups(
+    conn: Connection, since: Optional[date] = None, until: Optional[date] = None
+) -> List[dict]:
+    """``dailyrollup`` rows for the archived sets in [since, until), as rollups computes them."""
+    sets = load_archive(conn).sets(
+        since=datetime.combine(since, time.min) if since is not None else None,
+        until=datetime.combine(until, time.min) if until is not None else None,
+    )
+    if not sets.size:
+        return []
+    load, _ = _loads(conn, sets)
+    # Same arithmetic and tie-break as rollups._daily_select: best e1RM, then oldest.
+    e1rm = load * (1.0 + sets.reps / 30.0)
+    day = sets.created_at_us // _US_PER_DAY
+    order = np.lexsort((sets.id, sets.created_at_us, -e1rm, day, sets.exercise_id))
+    exercise_id, day = sets.exercise_id[order], day[order]
+    reps, load, e1rm, ids = sets.reps[order], load[order], e1rm[order], sets.id[order]
+    starts = np.flatnonzero(
+        np.r_[True, (exercise_id[1:] != exercise_id[:-1]) | (day[1:] != day[:-1])]
+    )
+    columns = zip(
+        exercise_id[starts].tolist(),
+        day[starts].astype("datetime64[D]").tolist(),
+        np.diff(np.r_[starts, sets.size]).tolist(),
+        np.add.reduceat(reps, starts).tolist(),
+        np.add.reduceat(load * reps, starts).tolist(),
+        np.maximum.reduceat(load, starts).tolist(),
+        e1rm[starts].tolist(),
+        ids[starts].tolist(),
+    )
+    return [dict(zip(_ROLLUP_COLUMNS, row)) for row in columns]
+
+
+def session_bodyweights(
+    session_ids: np.ndarray, bodyweights: Iterable[Tuple[int, float]]
+) -> np.ndarray:
+    """Bodyweight of each set's session (0 where there is none), from (id, kg) pairs."""
+    pairs = list(bodyweights)
+    size = max([int(session_ids.max(initial=0))] + [s for s, _ in pairs]) + 1
+    table = np.zeros(size, dtype=np.float64)
+    for session_id, kg in pairs:
+        table[session_id] = kg
+    return table[session_ids]
+
+
+def best_set(
+    sets: ArchivedSets, min_reps: Optional[int], bodyweight: Optional[np.ndarray] = None
+) -> Optional[Tuple[float, float, int, bool]]:
+    """(weight, total load, reps, reached min_reps) of the set a PR goal ranks first.
+
+    Sets with at least `min_reps` come first, then the heaviest total load (weight
+    plus `bodyweight`, aligned with `sets`), then the oldest.
+    """
+    if not sets.size:
+        return None
+    total = sets.weight_kg + bodyweight if bodyweight is not None else sets.weight_kg
+    if min_reps is None:
+        eligible = np.zeros(sets.size, dtype=bool)
+    else:
+        eligible = sets.reps >= min_reps
+    # lexsort is stable and sorts by its last key first; sets are oldest first.
+    i = int(np.lexsort((-total, ~eligible))[0])
+    return float(sets.weight_kg[i]), float(total[i]), int(sets.reps[i]), bool(eligible[i])
+
+
+class ArchiveResult(NamedTuple):
+    archived: int
+    horizon: Optional[datetime]
+    segment: Optional[str]
+
+
+def _write_segment(path: str, size: int, batches: Iterable[Dict[str, list]]) -> None:
+    """Fill a segment of `size` sets from column batches, then move it into place."""
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    files = {
+        name: np.lib.format.open_memmap(
+            os.path.join(tmp, f"{name}.npy"), mode="w+", dtype=dtype, shape=(size,)
+        )
+        for name, dtype in COLUMNS
+    }
+    written = 0
+    for batch in batches:
+        end = written + len(batch["id"])
+        for name, column in files.items():
+            column[written:end] = batch[name]
+        written = end
+    if written != size:
+        raise RuntimeError(f"Expected {size} sets to archive, read {written}")
+    for name, column in files.items():
+        column.flush()
+        with open(os.path.join(tmp, f"{name}.npy"), "rb+") as f:
+            os.fsync(f.fileno())
+    files.clear()  # unmap before the rename
+    os.replace(tmp, path)
+    dir_fd = os.open(os.path.dirname(path), os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def _batches(conn: Connection, where) -> Iterator[Dict[str, list]]:
+    """The sets matching `where` in created_at, id order, ARCHIVE_BATCH_SIZE at a time."""
+    result = conn.execute(
+        select(
+            SetEntry.id,
+            SetEntry.session_id,
+            SetEntry.exercise_id,
+            SetEntry.created_at,
+            SetEntry.weight_kg,
+            SetEntry.reps,
+        )
+        .where(where)
+        .order_by(SetEntry.created_at, SetEntry.id)
+        .execution_options(yield_per=ARCHIVE_BATCH_SIZE)
+    )
+    for rows in result.partitions():
+        ids, session_ids, exercise_ids, created_at, weights, reps = zip(*rows)
+        yield {
+            "id": ids,
+            "session_id": session_ids,
+            "exercise_id": exercise_ids,
+            "created_at_us": [(value - _EPOCH) // _US for value in created_at],
+            "weight_kg": weights,
+            "reps": reps,
+        }
+
+
+def archive_sets(engine: Engine, before: date) -> ArchiveResult:
+    """Move every set created before midnight UTC of `before` into a new segment."""
+    if not archive_dir:
+        raise RuntimeError("ARCHIVE_DIR is not configured")
+    cutoff = datetime.combine(before, time.min)
+    os.makedirs(archive_dir, exist_ok=True)
+
+    with Session(engine) as db:
+        conn = db.connection()
+        current = read_horizon(conn)
+        if current is not None and cutoff <= current:
+            return ArchiveResult(0, current, None)
+        # Writing the horizon first takes SQLite's write lock, so no set can be
+        # added before the cutoff between the reads and the DELETE below.
+        write_meta(conn, HORIZON_KEY, cutoff.isoformat())
+        for until, path in _segment_dirs():
+            if current is None or until > current.date():
+                shutil.rmtree(path)  # left by a run that never committed
+
+        archived = SetEntry.created_at < cutoff
+        count = conn.execute(select(func.count()).select_from(SetEntry).where(archived)).scalar()
+        segment = None
+        if count:
+            segment = _segment_name(before)
+            _write_segment(os.path.join(archive_dir, segment), count, _batches(conn, archived))
+            # Segments have no key column; keep the keys so batch replays stay dropped.
+            conn.execute(
+                insert(ArchivedKey)
+                .prefix_with("OR IGNORE")
+                .from_select(
+                    ["idempotency_key"],
+                    select(SetEntry.idempotency_key).where(
+                        archived, SetEntry.idempotency_key.is_not(None)
+                    ),
+                )
+            )
+            conn.execute(delete(SetEntry).where(archived))
+        _mark_changed(db)
+        bump_data_version(db)
+        db.commit()
+    return ArchiveResult(count, cutoff, segment)
+
+
+def cutoff_for(older_than_days: int, today: Optional[date] = None) -> date:
+    return (today or datetime.utcnow().date()) - timedelta(days=older_than_days)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Move old sets into the columnar archive.")
+    parser.add_argument(
+        "--older-than-days",
+        type=int,
+        help="archive sets from before this many days ago (default: $ARCHIVE_AFTER_DAYS or 365)",
+    )
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the database afterwards")
+    args = parser.parse_args(argv)
+
+    from .db import engine, init_db
+
+    older_than_days = args.older_than_days if args.older_than_days is not None else after_days
+
+    init_db()
+    try:
+        result = archive_sets(engine, cutoff_for(older_than_days))
+    except RuntimeError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if args.vacuum:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("VACUUM")
+    print(
+        f"Archived {result.archived} sets into {result.segment or 'no new segment'}; "
+        f"horizon {result.horizon.isoformat() if result.horizon else 'unset'}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
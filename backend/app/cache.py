@@ -0,0 +1,153 @@
+"""Process-level caches that are dropped when a transaction commits.
+
+Writers set a flag in ``session.info`` inside their transaction; the callback
+registered for that flag with ``on_commit`` runs after the commit, and the
+flag is discarded on rollback.
+
+Commits from other processes (the importer, archive and rebuild CLIs) never
+reach those callbacks. Each cache therefore also bumps a counter in
+``appmeta``. ``check_meta`` asks SQLite whether any other connection has
+committed since its last call. When one has, it re-reads the counters and
+drops the caches whose counter moved.
+"""
+
+import threading
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+T = TypeVar("T")
+
+
+class CommitCache(Generic[T]):
+    """One cached value, loaded on demand and dropped by ``invalidate``."""
+
+    def __init__(self, lookups=None):
+        # Optional metrics counter with a "hit"/"miss" label.
+        self.lookups = lookups
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        # Bumped on every invalidation so a load that raced a commit is not cached.
+        self._generation = 0
+
+    def peek(self) -> Optional[T]:
+        """The cached value, or None where ``get`` would have to load it."""
+        with self._lock:
+            value = self._value
+        if value is not None and self.lookups is not None:
+            self.lookups.inc("hit")
+        return value
+
+    def get(self, load: Callable[[], T]) -> T:
+        with self._lock:
+            value, generation = self._value, self._generation
+        if value is not None:
+            if self.lookups is not None:
+                self.lookups.inc("hit")
+            return value
+        if self.lookups is not None:
+            self.lookups.inc("miss")
+        value = load()
+        with self._lock:
+            if generation == self._generation:
+                self._value = value
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._value = None
+            self._generation += 1
+
+
+def mark(db: Session, flag: str) -> None:
+    db.info[flag] = True
+
+
+def on_commit(flag: str, callback: Callable[[], None]) -> None:
+    """Run `callback` after each commit of a session that was ``mark``-ed with `flag`."""
+
+    def after_commit(session) -> None:
+        if session.info.pop(flag, False):
+            callback()
+
+    def after_rollback(session) -> None:
+        session.info.pop(flag, None)
+
+    event.listen(Session, "after_commit", after_commit)
+    event.listen(Session, "after_rollback", after_rollback)
+
+
+# appmeta key -> callback run by check_meta when the key's value changes.
+_watched: Dict[str, Callable[[], None]] = {}
+
+
+def on_meta_change(key: str, callback: Callable[[], None]) -> None:
+    _watched[key] = callback
+
+
+class _Watch:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        # PRAGMA data_version only moves when a *different* connection commits,
+        # so this connection is kept out of the pool and used for nothing else.
+        self.conn = engine.raw_connection()
+        self.conn.detach()
+        self.data_version: Optional[int] = None
+        self.seen: Dict[str, Optional[str]] = {}
+
+    def pragma_data_version(self) -> int:
+        cursor = self.conn.cursor()
+        try:
+            return cursor.execute("PRAGMA data_version").fetchone()[0]
+        finally:
+            cursor.close()
+
+
+_watch: Optional[_Watch] = None
+_watch_lock = threading.Lock()
+
+
+def _watchable(engine: Engine) -> bool:
+    return engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:")
+
+
+def _watch_for(engine: Engine) -> _Watch:
+    global _watch
+    if _watch is None or _watch.engine is not engine:
+        if _watch is not None:
+            _watch.conn.close()
+        _watch = _Watch(engine)
+    return _watch
+
+
+def check_meta(engine: Engine) -> None:
+    """Run the callbacks of the watched appmeta keys that changed since the last call.
+
+    Unless another connection has committed since then this is one PRAGMA, and
+    otherwise a primary-key read of a few rows, so it can run on the event loop.
+    """
+    if not _watchable(engine):
+        return
+    with _watch_lock:
+        watch = _watch_for(engine)
+        # Read before the counters, so a commit in between is caught next time.
+        version = watch.pragma_data_version()
+        if version == watch.data_version:
+            return
+        keys = list(_watched)
+        cursor = watch.conn.cursor()
+        try:
+            rows = cursor.execute(
+                f"SELECT key, value FROM appmeta WHERE key IN ({', '.join('?' * len(keys))})",
+                keys,
+            ).fetchall()
+        finally:
+            cursor.close()
+        values = dict(rows)
+        changed = [k for k in keys if k not in watch.seen or watch.seen[k] != values.get(k)]
+        watch.seen = {k: values.get(k) for k in keys}
+        watch.data_version = version
+    for key in changed:
+        _watched[key]()
@@ -0,0 +1,99 @@
+"""Process-level cache of the exercise catalog.
+
+The catalog only changes when it is seeded or when an import adds exercises,
+so read endpoints take an immutable snapshot from here instead of loading the
+``exercise`` table on every request. Code that writes exercises calls
+``mark_catalog_changed`` inside its transaction; the snapshot is dropped after
+that commit, or once another process's change to ``catalog_version`` is seen.
+"""
+
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from . import metrics
+from .appmeta import increment_meta
+from .cache import CommitCache, mark, on_commit, on_meta_change
+from .models import Exercise
+
+CHANGED = "catalog_changed"
+VERSION_KEY = "catalog_version"
+
+# Exercises /goals/summary counts as chin-ups, by lower-cased name: the seeded
+# ones and the spellings Strong and Hevy exports use.
+CHINUP_NAMES = frozenset(
+    {"chin-up", "weighted chin-up", "chin up", "weighted chin up", "chin up (weighted)"}
+)
+
+
+def is_chinup(name: str) -> bool:
+    return (name or "").strip().lower() in CHINUP_NAMES
+
+
+def is_chinup_expr():
+    """SQL twin of is_chinup; needs Exercise in the FROM clause."""
+    return func.lower(func.trim(Exercise.name)).in_(sorted(CHINUP_NAMES))
+
+
+class ExerciseInfo(NamedTuple):
+    id: int
+    name: str
+    uses_bodyweight: bool
+    body_part: str
+    sub_part: str
+
+
+class Catalog(NamedTuple):
+    by_id: Mapping[int, ExerciseInfo]
+    # Sorted by name, as /exercises lists them.
+    ordered: Tuple[ExerciseInfo, ...]
+
+    def name(self, exercise_id: int, default: str = "Unknown") -> str:
+        ex = self.by_id.get(exercise_id)
+        return ex.name if ex else default
+
+    def uses_bodyweight(self, exercise_id: int) -> bool:
+        ex = self.by_id.get(exercise_id)
+        return bool(ex and ex.uses_bodyweight)
+
+
+_catalog: CommitCache[Catalog] = CommitCache(metrics.CATALOG_CACHE)
+
+
+def _load(engine: Engine) -> Catalog:
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(
+                Exercise.id,
+                Exercise.name,
+                Exercise.uses_bodyweight,
+                Exercise.body_part,
+                Exercise.sub_part,
+            ).order_by(Exercise.name)
+        ).all()
+    ordered = tuple(ExerciseInfo(id, name, bool(bw), bp, sp) for id, name, bw, bp, sp in rows)
+    return Catalog(MappingProxyType({ex.id: ex for ex in ordered}), ordered)
+
+
+def get_catalog(engine: Engine) -> Catalog:
+    return _catalog.get(lambda: _load(engine))
+
+
+def cached_catalog() -> Optional[Catalog]:
+    return _catalog.peek()
+
+
+def invalidate_catalog() -> None:
+    _catalog.invalidate()
+
+
+def mark_catalog_changed(db: Session) -> None:
+    increment_meta(db.connection(), VERSION_KEY)
+    mark(db, CHANGED)
+
+
+on_commit(CHANGED, invalidate_catalog)
+on_meta_change(VERSION_KEY, invalidate_catalog)
@@ -0,0 +1,153 @@
+"""Change log behind /changes.
+
+Every write that creates, edits or deletes a session, set or goal appends
+(entity, entity_id, op) rows to ``changelog`` in its own transaction; the
+autoincrement id is the sync cursor. A client keeping a local replica passes
+the last cursor it saw and gets back the current rows that were upserted since
+and the ids that were deleted. Bulk writes (imports, reset) log one ``reset``
+entry instead of a row per set.
+
+Compaction drops entries superseded by a later one for the same row, and
+entries older than the retention window. Either a reset or an expired entry
+raises the floor (``changes_floor`` in ``appmeta``); a cursor below the floor
+can no longer be replayed and the client has to reload everything. It runs at
+startup and from:
+
+    python -m app.changes [--retention-days 30]
+"""
+
+import argparse
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.engine import Connection
+
+from .appmeta import read_meta, write_meta
+from .models import ChangeLog, SetEntry
+
+ENTITIES = ("session", "set", "goal")
+UPSERT, DELETE, RESET = "upsert", "delete", "reset"
+FLOOR_KEY = "changes_floor"
+DEFAULT_RETENTION_DAYS = 30
+
+
+def record(conn: Connection, entity: str, op: str, entity_ids: Iterable[int]) -> None:
+    now = datetime.utcnow()
+    rows = [
+        {"entity": entity, "entity_id": entity_id, "op": op, "changed_at": now}
+        for entity_id in entity_ids
+    ]
+    if rows:
+        conn.execute(insert(ChangeLog), rows)
+
+
+def record_sets(conn: Connection, op: str, *where) -> None:
+    """Log `op` for every set matching `where`, in one INSERT ... SELECT."""
+    conn.execute(
+        insert(ChangeLog).from_select(
+            ["entity", "entity_id", "op", "changed_at"],
+            select(literal("set"), SetEntry.id, literal(op), literal(datetime.utcnow())).where(
+                *where
+            ),
+        )
+    )
+
+
+def _write_floor(conn: Connection, floor: int) -> None:
+    write_meta(conn, FLOOR_KEY, str(floor))
+
+
+def record_reset(conn: Connection) -> None:
+    """Everything may have changed: clients with an older cursor reload in full."""
+    entry_id = conn.execute(
+        insert(ChangeLog)
+        .values(entity="all", entity_id=0, op=RESET, changed_at=datetime.utcnow())
+        .returning(ChangeLog.id)
+    ).scalar_one()
+    _write_floor(conn, entry_id)
+
+
+def read_floor(conn: Connection) -> int:
+    return int(read_meta(conn, FLOOR_KEY) or 0)
+
+
+def latest_cursor(conn: Connection) -> int:
+    latest = conn.execute(select(func.max(ChangeLog.id))).scalar() or 0
+    return max(latest, read_floor(conn))
+
+
+class Changes(NamedTuple):
+    cursor: int
+    upserted: Dict[str, List[int]]
+    deleted: Dict[str, List[int]]
+
+
+def changes_since(conn: Connection, since: int) -> Optional[Changes]:
+    """The last op per row in (since, cursor]; None when `since` cannot be replayed."""
+    cursor = latest_cursor(conn)
+    if since < read_floor(conn) or since > cursor:
+        return None
+    last = (
+        select(ChangeLog.entity, ChangeLog.entity_id, func.max(ChangeLog.id).label("id"))
+        .where(ChangeLog.id > since, ChangeLog.id <= cursor, ChangeLog.entity.in_(ENTITIES))
+        .group_by(ChangeLog.entity, ChangeLog.entity_id)
+        .subquery()
+    )
+    upserted: Dict[str, List[int]] = {entity: [] for entity in ENTITIES}
+    deleted: Dict[str, List[int]] = {entity: [] for entity in ENTITIES}
+    for entity, entity_id, op in conn.execute(
+        select(last.c.entity, last.c.entity_id, ChangeLog.op)
+        .join(ChangeLog, ChangeLog.id == last.c.id)
+        .order_by(last.c.id)
+    ):
+        (deleted if op == DELETE else upserted)[entity].append(entity_id)
+    return Changes(cursor, upserted, deleted)
+
+
+def compact(
+    conn: Connection, retention_days: int = DEFAULT_RETENTION_DAYS, now: Optional[datetime] = None
+) -> int:
+    """Drop superseded and expired entries; returns how many were removed."""
+    floor = read_floor(conn)
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    expired = conn.execute(
+        select(func.max(ChangeLog.id)).where(ChangeLog.changed_at < cutoff)
+    ).scalar()
+    if expired is not None and expired > floor:
+        floor = expired
+        _write_floor(conn, floor)
+    # Entries below the floor can never be replayed; the floor entry itself
+    # stays so the cursor does not move backwards.
+    removed = conn.execute(delete(ChangeLog).where(ChangeLog.id < floor)).rowcount
+    latest = select(func.max(ChangeLog.id)).group_by(ChangeLog.entity, ChangeLog.entity_id)
+    removed += conn.execute(delete(ChangeLog).where(ChangeLog.id.not_in(latest))).rowcount
+    return removed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compact the /changes log.")
+    parser.add_argument("--retention-days", type=int, help="default: $CHANGELOG_RETENTION_DAYS")
+    args = parser.parse_args(argv)
+
+    from sqlmodel import Session
+
+    from .dataversion import bump_data_version
+    from .db import CHANGELOG_RETENTION_DAYS, engine, init_db
+
+    init_db()
+    retention = args.retention_days if args.retention_days is not None else CHANGELOG_RETENTION_DAYS
+    with Session(engine) as db:
+        conn = db.connection()
+        removed = compact(conn, retention)
+        floor = read_floor(conn)
+        # Cached /changes responses may point below the new floor.
+        bump_data_version(db)
+        db.commit()
+    print(f"Removed {removed} change-log entries; cursors below {floor} must reload")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Monotonic data-version counter used for ETags on read endpoints.
+
+Every mutating endpoint calls ``bump_data_version`` inside its transaction. The
+value is cached in-process and dropped after a bumping commit, or when
+``cache.check_meta`` sees another process bump it, so conditional GETs are
+answered without touching the database.
+"""
+
+import re
+from typing import Optional
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from .appmeta import increment_meta, read_meta
+from .cache import CommitCache, mark, on_commit, on_meta_change
+
+DATA_VERSION_KEY = "data_version"
+BUMPED = "data_version_bumped"
+
+_version: CommitCache[int] = CommitCache()
+
+
+def bump_data_version(db: Session) -> None:
+    increment_meta(db.connection(), DATA_VERSION_KEY)
+    mark(db, BUMPED)
+
+
+def _read(engine: Engine) -> int:
+    with engine.connect() as conn:
+        return int(read_meta(conn, DATA_VERSION_KEY) or 0)
+
+
+def current_data_version(engine: Engine) -> int:
+    return _version.get(lambda: _read(engine))
+
+
+def cached_data_version() -> Optional[int]:
+    """The version if it is cached, without a query (for the event loop)."""
+    return _version.peek()
+
+
+def invalidate_data_version() -> None:
+    _version.invalidate()
+
+
+def etag_for(version: int) -> str:
+    return f'W/"{version}"'
+
+
+# One entity-tag of an If-None-Match list: optional W/ prefix, quoted opaque-tag.
+_ENTITY_TAG = re.compile(r'\s*(?:W/)?"([^"]*)"\s*(?:,|$)')
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check with RFC 9110 weak comparison: `*` or an equal opaque-tag."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = _ENTITY_TAG.match(etag).group(1)
+    return any(tag == opaque for tag in _ENTITY_TAG.findall(if_none_match))
+
+
+on_commit(BUMPED, invalidate_data_version)
+on_meta_change(DATA_VERSION_KEY, invalidate_data_version)
@@ -1,8 +1,51 @@
 import os
-from sqlalchemy import text
+from typing import Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from . import archive, metrics, slowlog
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:////data/app.db")
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "sdcard-safe")
+
+# PRAGMAs applied to every new SQLite connection. WAL lets readers run while a
+# set is being written; with synchronous=NORMAL a power cut can lose the last
+# commit but never corrupts the file, and it fsyncs far less than FULL.
+STORAGE_PROFILES = {
+    "sdcard-safe": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -8000,  # KiB
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,  # ms
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    "test": {
+        "journal_mode": "MEMORY",
+        "synchronous": "OFF",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "MEMORY",
+        "busy_timeout": 1000,
+    },
+}
+
+if DATABASE_PROFILE not in STORAGE_PROFILES:
+    raise RuntimeError(
+        f"Unknown DATABASE_PROFILE {DATABASE_PROFILE!r}; "
+        f"expected one of {', '.join(STORAGE_PROFILES)}"
+    )
 
 # SQLite needs check_same_thread=False for FastAPI concurrency
 engine = create_engine(
@@ -12,59 +55,83 @@ engine = create_engine(
 )
 
 
-def _sqlite_column_exists(table: str, column: str) -> bool:
-    with engine.connect() as conn:
-        rows = conn.execute(text(f"PRAGMA table_info({table})")).fetchall()
-        return any(r[1] == column for r in rows)
+def _async_url(url: str) -> str:
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://") :]
+    return url
+
+
+# Same database through aiosqlite, for the async endpoints. Its connections run
+# on their own threads, so slow writes do not hold Starlette's threadpool.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _async_url(DATABASE_URL))
+async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False)
+
+
+def _apply_storage_profile(dbapi_conn, _record):
+    cursor = dbapi_conn.cursor()
+    for pragma, value in STORAGE_PROFILES[DATABASE_PROFILE].items():
+        cursor.execute(f"PRAGMA {pragma}={value}")
+    cursor.close()
+
+
+if DATABASE_URL.startswith("sqlite"):
+    event.listen(engine, "connect", _apply_storage_profile)
+    event.listen(async_engine.sync_engine, "connect", _apply_storage_profile)
+
+metrics.instrument_engine(engine)
+metrics.instrument_engine(async_engine.sync_engine)
+
 
+def _beside_database(name: str) -> Optional[str]:
+    if DATABASE_URL.startswith("sqlite:///") and DATABASE_URL != "sqlite:///:memory:":
+        return os.path.join(os.path.dirname(DATABASE_URL[len("sqlite:///") :]), name)
+    return None
 
-def _sqlite_table_exists(table: str) -> bool:
+
+# Off unless SLOW_QUERY_MS is set, e.g. SLOW_QUERY_MS=50.
+SLOW_QUERY_MS = float(os.environ["SLOW_QUERY_MS"]) if os.getenv("SLOW_QUERY_MS") else None
+slowlog.configure(
+    SLOW_QUERY_MS, os.getenv("SLOW_QUERY_LOG") or _beside_database("slow_queries.log")
+)
+slowlog.instrument_engine(engine)
+slowlog.instrument_engine(async_engine.sync_engine)
+
+# Column files for sets moved out by `python -m app.archive` or POST /admin/archive.
+archive.configure(
+    os.getenv("ARCHIVE_DIR") or _beside_database("archive"),
+    int(os.getenv("ARCHIVE_AFTER_DAYS", archive.DEFAULT_AFTER_DAYS)),
+)
+
+
+# Change-log entries older than this are compacted away; see changes.py.
+CHANGELOG_RETENTION_DAYS = int(os.getenv("CHANGELOG_RETENTION_DAYS", "30"))
+
+
+def storage_settings() -> dict:
+    """Effective PRAGMA values as reported by SQLite, for the startup log."""
+    if not DATABASE_URL.startswith("sqlite"):
+        return {}
     with engine.connect() as conn:
-        row = conn.execute(
-            text("SELECT name FROM sqlite_master WHERE type='table' AND name=:name"),
-            {"name": table},
-        ).fetchone()
-        return row is not None
+        return {
+            pragma: conn.execute(text(f"PRAGMA {pragma}")).scalar()
+            for pragma in STORAGE_PROFILES[DATABASE_PROFILE]
+        }
 
 
 def init_db() -> None:
-    SQLModel.metadata.create_all(engine)
-
-    # Lightweight sqlite migration for older DBs missing columns.
     if DATABASE_URL.startswith("sqlite"):
-        if _sqlite_table_exists("exercise") and not _sqlite_column_exists(
-            "exercise", "uses_bodyweight"
-        ):
-            with engine.connect() as conn:
-                conn.execute(
-                    text(
-                        "ALTER TABLE exercise ADD COLUMN uses_bodyweight BOOLEAN NOT NULL DEFAULT 0"
-                    )
-                )
-                conn.commit()
-        if _sqlite_table_exists("exercise") and not _sqlite_column_exists("exercise", "body_part"):
-            with engine.connect() as conn:
-                conn.execute(
-                    text("ALTER TABLE exercise ADD COLUMN body_part TEXT NOT NULL DEFAULT 'other'")
-                )
-                conn.commit()
-        if _sqlite_table_exists("exercise") and not _sqlite_column_exists("exercise", "sub_part"):
-            with engine.connect() as conn:
-                conn.execute(
-                    text(
-                        "ALTER TABLE exercise ADD COLUMN sub_part TEXT NOT NULL DEFAULT 'compound'"
-                    )
-                )
-                conn.commit()
-        # Migrate workoutsession.bodyweight_kg (added 2026-02)
-        if _sqlite_table_exists("workoutsession") and not _sqlite_column_exists(
-            "workoutsession", "bodyweight_kg"
-        ):
-            with engine.connect() as conn:
-                conn.execute(text("ALTER TABLE workoutsession ADD COLUMN bodyweight_kg FLOAT"))
-                conn.commit()
+        from .migrations import migrate
+
+        migrate(engine)
+    else:
+        SQLModel.metadata.create_all(engine)
 
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+
+async def get_async_session():
+    async with AsyncSession(async_engine) as session:
+        yield session
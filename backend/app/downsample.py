@@ -0,0 +1,68 @@
+from datetime import date, datetime, timedelta
+from typing import Hashable, List, Sequence
+
+
+def day_key(ts: datetime) -> date:
+    return ts.date()
+
+
+def week_key(ts: datetime) -> date:
+    # Monday of the ISO week
+    d = ts.date()
+    return d - timedelta(days=d.weekday())
+
+
+def bucket_max(keys: Sequence[Hashable], values: Sequence[float]) -> List[int]:
+    """Index of the largest value in each run of equal bucket keys (input must be sorted)."""
+    out: List[int] = []
+    current = object()
+    for i, bucket in enumerate(keys):
+        if bucket != current:
+            current = bucket
+            out.append(i)
+        elif values[i] > values[out[-1]]:
+            out[-1] = i
+    return out
+
+
+def running_max_indices(values: Sequence[float]) -> List[int]:
+    """Indices where the value beats everything before it (i.e. PRs)."""
+    out: List[int] = []
+    best = None
+    for i, v in enumerate(values):
+        if best is None or v > best:
+            best = v
+            out.append(i)
+    return out
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points preserving the shape."""
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    out = [0]
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        count = avg_end - avg_start
+        avg_x = sum(xs[avg_start:avg_end]) / count
+        avg_y = sum(ys[avg_start:avg_end]) / count
+
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+        best_area = -1.0
+        best = range_start
+        for j in range(range_start, range_end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        out.append(best)
+        a = best
+    out.append(n - 1)
+    return out
@@ -0,0 +1,364 @@
+"""Bulk import of workout history exported from Strong or Hevy.
+
+Rows are parsed lazily from any line iterator and written in chunks: each chunk
+creates its missing exercises and sessions, then inserts its sets with one
+multi-row INSERT in its own transaction. Every set gets an idempotency key
+derived from its source row, so importing the same file twice adds nothing,
+and re-running an import that failed part-way only adds the missing sets.
+Sessions that started before the archive horizon are skipped and counted as
+archived.
+
+CLI::
+
+    python -m app.importer strong.csv [--source strong|hevy] [--unit kg|lb]
+"""
+
+import argparse
+import csv
+import hashlib
+import re
+import sys
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from .aggregates import apply_entry_ids
+from .archive import read_horizon
+from .catalog import mark_catalog_changed
+from .changes import record_reset
+from .rollups import days_of_entries, refresh_days
+from .dataversion import bump_data_version
+from .models import Exercise, SetEntry, WorkoutSession
+
+IMPORT_CHUNK_SIZE = 5000
+LB_TO_KG = 0.45359237
+
+DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%d %b %Y, %H:%M", "%d %B %Y, %H:%M")
+
+
+class ImportRow(NamedTuple):
+    started_at: datetime
+    ended_at: Optional[datetime]
+    exercise_name: str
+    weight_kg: float
+    reps: int
+
+
+class ImportResult(NamedTuple):
+    rows: int
+    skipped: int
+    inserted: int
+    duplicates: int
+    archived: int
+    sessions_created: int
+    exercises_created: int
+
+
+class CsvImportError(ValueError):
+    pass
+
+
+def _parse_date(value: str) -> datetime:
+    value = (value or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise CsvImportError(f"Unrecognised date {value!r}")
+
+
+def _parse_duration(value: str) -> Optional[timedelta]:
+    # Strong writes durations such as "1h 5m" or "45m"
+    match = re.fullmatch(r"\s*(?:(\d+)h)?\s*(?:(\d+)m)?\s*(?:(\d+)s)?\s*", value or "")
+    if not match or not any(match.groups()):
+        return None
+    hours, minutes, seconds = (int(g or 0) for g in match.groups())
+    return timedelta(hours=hours, minutes=minutes, seconds=seconds)
+
+
+def _number(value: str) -> float:
+    value = (value or "").strip().replace(",", ".")
+    try:
+        return float(value) if value else 0.0
+    except ValueError:
+        raise CsvImportError(f"Not a number: {value!r}")
+
+
+# Columns each source's rows cannot be parsed without.
+REQUIRED_FIELDS = {
+    "strong": ("Date", "Exercise Name", "Reps"),
+    "hevy": ("start_time", "exercise_title", "reps"),
+}
+
+
+def detect_source(fieldnames: List[str]) -> str:
+    fields = set(fieldnames or [])
+    for source, required in REQUIRED_FIELDS.items():
+        if fields.issuperset(required):
+            return source
+    raise CsvImportError("Unrecognised CSV header; expected a Strong or Hevy export")
+
+
+def parse_rows(
+    lines: Iterable[str], source: str = "auto", unit: str = "kg"
+) -> Iterator[Optional[ImportRow]]:
+    """Yield one ImportRow per set; rows without reps (cardio, notes) yield None."""
+    lines = _decoded(lines)
+    header = next(lines, "")
+    delimiter = ";" if header.count(";") > header.count(",") else ","
+    reader = csv.DictReader(_chain(header, lines), delimiter=delimiter)
+    if source == "auto":
+        source = detect_source(reader.fieldnames)
+    if source not in REQUIRED_FIELDS:
+        raise CsvImportError(f"Unknown source {source!r}")
+    missing = [f for f in REQUIRED_FIELDS[source] if f not in (reader.fieldnames or [])]
+    if missing:
+        raise CsvImportError(f"Not a {source} export; missing columns: {', '.join(missing)}")
+    factor = LB_TO_KG if unit == "lb" else 1.0
+
+    try:
+        for record in reader:
+            try:
+                yield _parse_record(record, source, factor)
+            except ValueError as e:
+                # Bad dates and numbers are the file's fault, not the server's.
+                raise CsvImportError(f"Line {reader.line_num}: {e}") from e
+    except csv.Error as e:
+        raise CsvImportError(f"Line {reader.line_num}: {e}") from e
+
+
+def _parse_record(record: Dict[str, str], source: str, factor: float) -> Optional[ImportRow]:
+    if source == "strong":
+        started_at = _parse_date(record["Date"])
+        duration = _parse_duration(record.get("Duration", ""))
+        ended_at = started_at + duration if duration else None
+        name = record["Exercise Name"]
+        weight = _number(record.get("Weight", "")) * factor
+        reps = _number(record.get("Reps", ""))
+    else:
+        started_at = _parse_date(record["start_time"])
+        ended_at = _parse_date(record["end_time"]) if record.get("end_time") else None
+        name = record["exercise_title"]
+        if record.get("weight_lbs"):
+            weight = _number(record["weight_lbs"]) * LB_TO_KG
+        else:
+            weight = _number(record.get("weight_kg", "")) * factor
+        reps = _number(record.get("reps", ""))
+    name = (name or "").strip()
+    if not name or reps <= 0:
+        return None
+    return ImportRow(started_at, ended_at, name, round(weight, 3), int(reps))
+
+
+def _decoded(lines: Iterable[str]) -> Iterator[str]:
+    # Text streams decode lazily, so a bad byte surfaces while iterating.
+    line_no = 0
+    try:
+        for line_no, line in enumerate(lines, 1):
+            yield line
+    except UnicodeDecodeError as e:
+        raise CsvImportError(f"File is not UTF-8 text after line {line_no}") from e
+
+
+def _chain(first: str, rest: Iterator[str]) -> Iterator[str]:
+    yield first
+    yield from rest
+
+
+class _Importer:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.exercises: Dict[str, int] = {}
+        self.sessions: Dict[datetime, int] = {}
+        self.ordinals: Dict[datetime, int] = {}
+        self.sessions_created = 0
+        self.exercises_created = 0
+        self.archived = 0
+        with Session(engine) as db:
+            for ex_id, name in db.exec(select(Exercise.id, Exercise.name)).all():
+                self.exercises[name.lower()] = ex_id
+
+    def _ensure_exercises(self, db: Session, names: Iterable[str]) -> None:
+        missing = {}
+        for name in names:
+            if name.lower() not in self.exercises:
+                missing.setdefault(name.lower(), name)
+        if not missing:
+            return
+        # Same upsert-by-name the seed uses; new exercises get the model defaults.
+        conn = db.connection()
+        result = conn.execute(
+            insert(Exercise).on_conflict_do_nothing(index_elements=[Exercise.name]),
+            [{"name": name} for name in missing.values()],
+        )
+        self.exercises_created += result.rowcount
+        if result.rowcount:
+            mark_catalog_changed(db)
+        for ex_id, name in conn.execute(
+            select(Exercise.id, Exercise.name).where(Exercise.name.in_(list(missing.values())))
+        ):
+            self.exercises[name.lower()] = ex_id
+
+    def _ensure_sessions(self, db: Session, rows: List[ImportRow]) -> None:
+        ends: Dict[datetime, Optional[datetime]] = {}
+        for row in rows:
+            if row.started_at not in self.sessions:
+                ends.setdefault(row.started_at, row.ended_at)
+        if not ends:
+            return
+        conn = db.connection()
+        for session_id, started_at in conn.execute(
+            select(WorkoutSession.id, WorkoutSession.started_at).where(
+                WorkoutSession.started_at.in_(list(ends))
+            )
+        ):
+            self.sessions[started_at] = session_id
+            ends.pop(started_at, None)
+        if not ends:
+            return
+        created = conn.execute(
+            insert(WorkoutSession).returning(
+                WorkoutSession.id, WorkoutSession.started_at, sort_by_parameter_order=True
+            ),
+            [
+                {"started_at": started_at, "ended_at": ended_at or started_at}
+                for started_at, ended_at in ends.items()
+            ],
+        )
+        for session_id, started_at in created:
+            self.sessions[started_at] = session_id
+            self.sessions_created += 1
+
+    def flush(self, rows: List[ImportRow]) -> int:
+        with Session(self.engine) as db:
+            horizon = read_horizon(db.connection())
+            if horizon is not None:
+                # Archived history is read-only; these rows are counted, not written.
+                kept = [row for row in rows if row.started_at >= horizon]
+                self.archived += len(rows) - len(kept)
+                rows = kept
+                if not rows:
+                    return 0
+            self._ensure_exercises(db, (r.exercise_name for r in rows))
+            self._ensure_sessions(db, rows)
+            params = []
+            for row in rows:
+                ordinal = self.ordinals.get(row.started_at, 0)
+                self.ordinals[row.started_at] = ordinal + 1
+                key = hashlib.sha1(
+                    f"{row.started_at.isoformat()}|{ordinal}|{row.exercise_name}|"
+                    f"{row.weight_kg}|{row.reps}".encode()
+                ).hexdigest()
+                params.append(
+                    {
+                        "session_id": self.sessions[row.started_at],
+                        "exercise_id": self.exercises[row.exercise_name.lower()],
+                        "weight_kg": row.weight_kg,
+                        "reps": row.reps,
+                        # Sources have no per-set time; keep the file order within a session.
+                        "created_at": row.started_at + timedelta(seconds=ordinal),
+                        "idempotency_key": f"import:{key}",
+                    }
+                )
+            conn = db.connection()
+            inserted_ids = (
+                conn.execute(
+                    insert(SetEntry)
+                    .on_conflict_do_nothing(index_elements=[SetEntry.idempotency_key])
+                    .returning(SetEntry.id),
+                    params,
+                )
+                .scalars()
+                .all()
+            )
+            inserted = len(inserted_ids)
+            apply_entry_ids(conn, inserted_ids)
+            refresh_days(conn, days_of_entries(conn, inserted_ids))
+            if inserted:
+                # One marker instead of a change-log row per imported set.
+                record_reset(conn)
+            bump_data_version(db)
+            db.commit()
+        return inserted
+
+
+def import_rows(
+    engine: Engine,
+    rows: Iterable[Optional[ImportRow]],
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> ImportResult:
+    """Write parsed rows in chunks; `progress(rows_read, sets_inserted)` runs per chunk."""
+    importer = _Importer(engine)
+    total = skipped = inserted = 0
+    chunk: List[ImportRow] = []
+    for row in rows:
+        total += 1
+        if row is None:
+            skipped += 1
+            continue
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            inserted += importer.flush(chunk)
+            chunk = []
+            if progress:
+                progress(total, inserted)
+    if chunk:
+        inserted += importer.flush(chunk)
+        if progress:
+            progress(total, inserted)
+    return ImportResult(
+        rows=total,
+        skipped=skipped,
+        inserted=inserted,
+        duplicates=total - skipped - importer.archived - inserted,
+        archived=importer.archived,
+        sessions_created=importer.sessions_created,
+        exercises_created=importer.exercises_created,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import a Strong or Hevy CSV export.")
+    parser.add_argument("path")
+    parser.add_argument("--source", choices=["auto", "strong", "hevy"], default="auto")
+    parser.add_argument("--unit", choices=["kg", "lb"], default="kg")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    from .db import engine, init_db
+    from .seed import seed_exercises
+
+    init_db()
+    with Session(engine) as db:
+        seed_exercises(db)
+
+    def report(rows_read: int, sets_inserted: int) -> None:
+        print(f"{rows_read} rows read, {sets_inserted} sets inserted", file=sys.stderr)
+
+    with open(args.path, newline="", encoding="utf-8-sig") as f:
+        try:
+            result = import_rows(
+                engine, parse_rows(f, args.source, args.unit), args.chunk_size, report
+            )
+        except CsvImportError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+    print(
+        f"Imported {result.inserted} sets ({result.duplicates} already present, "
+        f"{result.skipped} rows skipped, {result.archived} before the archive horizon), "
+        f"{result.sessions_created} new sessions, "
+        f"{result.exercises_created} new exercises"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
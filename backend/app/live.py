@@ -0,0 +1,114 @@
+"""Live per-session events, pushed to clients as Server-Sent Events.
+
+Endpoints publish a small event after their commit (a set added or deleted,
+a bodyweight change, the session ending) and every client streaming
+``/sessions/{id}/events`` gets just that row instead of re-polling the entry
+list. Fan-out is an in-process asyncio queue per subscriber, so like the
+other caches this assumes a single API process. ``publish`` is safe to call
+from the threadpool that runs the sync endpoints.
+
+A subscriber that falls QUEUE_SIZE events behind is sent ``resync`` and
+disconnected; it should reload (or replay ``/changes``) and reconnect.
+"""
+
+import asyncio
+import threading
+from typing import AsyncIterator, Dict, Set
+
+QUEUE_SIZE = 256
+# Below the proxy's 30s read timeout so idle streams stay open.
+KEEPALIVE_S = 15.0
+
+_CLOSE = object()
+
+
+class Subscription:
+    def __init__(self, session_id: int):
+        self.session_id = session_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, item) -> None:
+        # Runs on self.loop. After an overflow nothing more is queued: the
+        # stream drains what it has, then tells the client to resync.
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+_lock = threading.Lock()
+_subscribers: Dict[int, Set[Subscription]] = {}
+
+
+def subscribe(session_id: int) -> Subscription:
+    """Register on the running event loop; events published from now on are queued."""
+    subscription = Subscription(session_id)
+    with _lock:
+        _subscribers.setdefault(session_id, set()).add(subscription)
+    return subscription
+
+
+def unsubscribe(subscription: Subscription) -> None:
+    with _lock:
+        subscribers = _subscribers.get(subscription.session_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del _subscribers[subscription.session_id]
+
+
+def subscriber_count(session_id: int) -> int:
+    with _lock:
+        return len(_subscribers.get(session_id, ()))
+
+
+def format_event(event: str, data: bytes) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+
+def publish(session_id: int, event: str, data: bytes, last: bool = False) -> None:
+    """Queue `event` with JSON `data` for every subscriber; `last` then ends their streams."""
+    with _lock:
+        subscribers = list(_subscribers.get(session_id, ()))
+    message = format_event(event, data)
+    for subscription in subscribers:
+        _deliver(subscription, message)
+        if last:
+            _deliver(subscription, _CLOSE)
+
+
+def close_all() -> None:
+    """End every stream, e.g. on shutdown."""
+    with _lock:
+        subscribers = [s for group in _subscribers.values() for s in group]
+    for subscription in subscribers:
+        _deliver(subscription, _CLOSE)
+
+
+def _deliver(subscription: Subscription, item) -> None:
+    try:
+        subscription.loop.call_soon_threadsafe(subscription.offer, item)
+    except RuntimeError:  # its event loop has been closed
+        unsubscribe(subscription)
+
+
+async def stream(subscription: Subscription) -> AsyncIterator[bytes]:
+    try:
+        while True:
+            if subscription.overflowed and subscription.queue.empty():
+                yield format_event("resync", b"{}")
+                return
+            try:
+                item = await asyncio.wait_for(subscription.queue.get(), KEEPALIVE_S)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if item is _CLOSE:
+                return
+            yield item
+    finally:
+        unsubscribe(subscription)
@@ -1,18 +1,75 @@
-from datetime import datetime
-from typing import List, Optional
-
-from fastapi import FastAPI, Depends, HTTPException
+import csv
+import io
+import json
+import logging
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from sqlalchemy import delete
+from sqlalchemy import and_, case, delete, func, or_
+from sqlalchemy.dialects.sqlite import insert
 from sqlmodel import Session, select
-
-from .db import init_db, get_session as get_db_session
-from .models import Exercise, WorkoutSession, SetEntry, FitnessGoal
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib encoder
+    orjson = None
+
+from . import IMPORT_STARTED, analytics, archive, changes, live, metrics, slowlog
+from .aggregates import (
+    apply_entry_ids,
+    apply_session,
+    read_totals,
+    reset_totals,
+    total_load_expr,
+)
+from .cache import check_meta
+from .catalog import Catalog, cached_catalog, get_catalog, invalidate_catalog
+from .rollups import affected_days, days_of_entries, refresh_days, reset_rollups
+from .dataversion import (
+    bump_data_version,
+    cached_data_version,
+    current_data_version,
+    etag_for,
+    etag_matches,
+)
+from .db import (
+    CHANGELOG_RETENTION_DAYS,
+    DATABASE_PROFILE,
+    get_async_session,
+    get_session as get_db_session,
+    init_db,
+    storage_settings,
+)
+from .importer import IMPORT_CHUNK_SIZE, CsvImportError, import_rows, parse_rows
+from .downsample import bucket_max, day_key, lttb, running_max_indices, week_key
+from .models import (
+    ArchivedKey,
+    ChangeLog,
+    DailyRollup,
+    Exercise,
+    FitnessGoal,
+    SetEntry,
+    WeeklyRollup,
+    WorkoutSession,
+)
 from .seed import seed_exercises
 
 app = FastAPI(title="Gym App API", version="0.1.0")
 
+# Reuse uvicorn's handler so messages show up in `make logs`.
+logger = logging.getLogger("uvicorn.error")
+
+# Seconds spent in each cold-start phase; served at /admin/startup.
+STARTUP_TIMINGS = {"imports_s": time.perf_counter() - IMPORT_STARTED}
+
 # For local/dev simplicity; tighten later if you want.
 app.add_middleware(
     CORSMiddleware,
@@ -20,17 +77,90 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# GET responses that are not a pure function of stored data.
+ETAG_EXCLUDED_PATHS = {
+    "/",
+    "/health",
+    "/metrics",
+    "/admin/startup",
+    "/admin/slow-queries",
+    "/goals/progress",
+}
+
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """Weak ETag from the data version; a matching If-None-Match skips the handler."""
+    from .db import engine
+
+    # Every request first drops caches made stale by another process, e.g. a
+    # CLI import or archive run, so ETags and handlers see its writes.
+    check_meta(engine)
+    path = request.url.path
+    if (
+        request.method != "GET"
+        or path in ETAG_EXCLUDED_PATHS
+        or path.startswith(("/docs", "/redoc", "/openapi"))
+        or path.endswith("/events")
+    ):
+        return await call_next(request)
+
+    version = cached_data_version()
+    if version is None:
+        version = await run_in_threadpool(current_data_version, engine)
+    etag = etag_for(version)
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers["ETag"] = etag
+    return response
+
+
+# Added last so it wraps everything above, including 304s and CORS preflights.
+app.add_middleware(metrics.MetricsMiddleware)
+
 
 @app.on_event("startup")
 def on_startup():
+    started = time.perf_counter()
     init_db()
+    migrated = time.perf_counter()
+    settings = ", ".join(f"{k}={v}" for k, v in storage_settings().items())
+    logger.info("SQLite storage profile %s: %s", DATABASE_PROFILE, settings or "n/a")
     # Seed exercises once
     from .db import engine
 
     with Session(engine) as db:
-        seed_exercises(db)
+        seeded = seed_exercises(db)
+        changes.compact(db.connection(), CHANGELOG_RETENTION_DAYS)
+        db.commit()
+    invalidate_catalog()
+    finished = time.perf_counter()
+
+    STARTUP_TIMINGS.update(
+        init_db_s=migrated - started,
+        seed_s=finished - migrated,
+        seeded=seeded,
+    )
+    logger.info(
+        "Startup: imports %.3fs, init_db %.3fs, seed %.3fs (%s)",
+        STARTUP_TIMINGS["imports_s"],
+        STARTUP_TIMINGS["init_db_s"],
+        STARTUP_TIMINGS["seed_s"],
+        "applied" if seeded else "unchanged",
+    )
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    from .db import async_engine
+
+    live.close_all()
+    await async_engine.dispose()
 
 
 @app.get("/health")
@@ -38,14 +168,110 @@ def health():
     return {"ok": True}
 
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/admin/startup")
+def startup_timings():
+    return STARTUP_TIMINGS
+
+
+@app.get("/admin/slow-queries")
+def slow_queries(limit: int = Query(50, ge=1, le=slowlog.RECENT_LIMIT)):
+    """Recent statements over SLOW_QUERY_MS, newest first, with their query plans."""
+    return {
+        "enabled": slowlog.threshold_s is not None,
+        "threshold_ms": None if slowlog.threshold_s is None else slowlog.threshold_s * 1000,
+        "log_path": slowlog.log_path,
+        "queries": slowlog.recent(limit),
+    }
+
+
+@app.delete("/admin/slow-queries")
+def clear_slow_queries():
+    slowlog.clear()
+    return {"ok": True}
+
+
+class ArchiveOut(BaseModel):
+    archived: int
+    horizon: Optional[datetime]
+    segment: Optional[str]
+
+
+@app.get("/admin/archive")
+def archive_status():
+    arc = cold_archive()
+    return {
+        "enabled": archive.archive_dir is not None,
+        "archive_dir": archive.archive_dir,
+        "horizon": arc.horizon,
+        "segments": len(arc.segments),
+        "sets": arc.size,
+    }
+
+
+@app.post("/admin/archive", response_model=ArchiveOut)
+def archive_old_sets(older_than_days: Optional[int] = Query(None, ge=1)):
+    """Move sets from before midnight UTC `older_than_days` ago into the columnar archive."""
+    from .db import engine
+
+    days = older_than_days if older_than_days is not None else archive.after_days
+    try:
+        result = archive.archive_sets(engine, archive.cutoff_for(days))
+    except RuntimeError as e:
+        raise HTTPException(400, str(e))
+    return ArchiveOut(**result._asdict())
+
+
 @app.get("/")
 def root():
     return {"ok": True, "docs": "/docs", "health": "/health"}
 
 
+def exercise_catalog() -> Catalog:
+    from .db import engine
+
+    return get_catalog(engine)
+
+
+def cold_archive() -> archive.Archive:
+    from .db import engine
+
+    return archive.get_archive(engine)
+
+
+# For async endpoints: a cache hit is returned inline, a miss is loaded in the
+# threadpool so its SQLite query does not block the event loop.
+async def exercise_catalog_async() -> Catalog:
+    catalog = cached_catalog()
+    return catalog if catalog is not None else await run_in_threadpool(exercise_catalog)
+
+
+async def cold_archive_async() -> archive.Archive:
+    arc = archive.cached_archive()
+    return arc if arc is not None else await run_in_threadpool(cold_archive)
+
+
+def _archived_rows(sets: archive.ArchivedSets, *columns: str) -> list:
+    """Archived sets as tuples of `columns`, oldest first, like rows from SQL."""
+    values = [
+        sets.created_at() if column == "created_at" else getattr(sets, column).tolist()
+        for column in columns
+    ]
+    return list(zip(*values))
+
+
+async def _session_bodyweights(db: AsyncSession) -> dict:
+    rows = await db.exec(archive.SESSION_BODYWEIGHTS)
+    return dict(rows.all())
+
+
 @app.get("/exercises", response_model=List[Exercise])
-def list_exercises(db: Session = Depends(get_db_session)):
-    return db.exec(select(Exercise).order_by(Exercise.name)).all()
+def list_exercises():
+    return fast_json([ex._asdict() for ex in exercise_catalog().ordered])
 
 
 class SessionStartIn(BaseModel):
@@ -76,35 +302,83 @@ def start_session(payload: Optional[SessionStartIn] = None, db: Session = Depend
     bodyweight = payload.bodyweight_kg if payload else None
     s = WorkoutSession(bodyweight_kg=bodyweight)
     db.add(s)
+    db.flush()
+    changes.record(db.connection(), "session", changes.UPSERT, [s.id])
+    bump_data_version(db)
     db.commit()
     db.refresh(s)
     return s
 
 
+def _parse_session_cursor(before: str):
+    started_at, sep, session_id = before.rpartition(",")
+    try:
+        if not sep:
+            raise ValueError(before)
+        return datetime.fromisoformat(started_at), int(session_id)
+    except ValueError:
+        raise HTTPException(400, "Invalid before cursor")
+
+
 @app.get("/sessions", response_model=List[SessionOut])
-def list_sessions(db: Session = Depends(get_db_session)):
-    sessions = db.exec(select(WorkoutSession).order_by(WorkoutSession.started_at.desc())).all()
-    counts = {}
-    for row in db.exec(select(SetEntry.session_id)).all():
-        if isinstance(row, tuple):
-            session_id = row[0]
-        elif hasattr(row, "session_id"):
-            session_id = row.session_id
-        else:
-            session_id = int(row)
-        counts[session_id] = counts.get(session_id, 0) + 1
-    out: List[SessionOut] = []
-    for s in sessions:
-        out.append(
-            SessionOut(
-                id=s.id,
-                started_at=s.started_at,
-                ended_at=s.ended_at,
-                bodyweight_kg=s.bodyweight_kg,
-                sets=counts.get(s.id, 0),
+async def list_sessions(
+    before: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """Sessions newest first.
+
+    Pages with `limit` and `before=<started_at>,<id>` taken from the last row of
+    the previous page.
+    """
+    page = select(
+        WorkoutSession.id,
+        WorkoutSession.started_at,
+        WorkoutSession.ended_at,
+        WorkoutSession.bodyweight_kg,
+    )
+    if before is not None:
+        started_at, session_id = _parse_session_cursor(before)
+        page = page.where(
+            or_(
+                WorkoutSession.started_at < started_at,
+                and_(WorkoutSession.started_at == started_at, WorkoutSession.id < session_id),
             )
         )
-    return out
+    page = page.order_by(WorkoutSession.started_at.desc(), WorkoutSession.id.desc())
+    if limit is not None:
+        page = page.limit(limit)
+    return await _sessions_out(db, page.subquery())
+
+
+async def _sessions_out(db: AsyncSession, page) -> List[SessionOut]:
+    """SessionOut with set counts for the sessions in the `page` subquery, newest first."""
+    rows = (
+        await db.exec(
+            select(
+                page.c.id,
+                page.c.started_at,
+                page.c.ended_at,
+                page.c.bodyweight_kg,
+                func.count(SetEntry.id),
+            )
+            .select_from(page)
+            .join(SetEntry, SetEntry.session_id == page.c.id, isouter=True)
+            .group_by(page.c.id)
+            .order_by(page.c.started_at.desc(), page.c.id.desc())
+        )
+    ).all()
+    archived = (await cold_archive_async()).session_counts(row[0] for row in rows)
+    return [
+        SessionOut(
+            id=session_id,
+            started_at=started_at,
+            ended_at=ended_at,
+            bodyweight_kg=bodyweight_kg,
+            sets=sets + archived.get(session_id, 0),
+        )
+        for session_id, started_at, ended_at, bodyweight_kg, sets in rows
+    ]
 
 
 @app.get("/sessions/{session_id}", response_model=WorkoutSession)
@@ -124,10 +398,23 @@ def set_bodyweight(session_id: int, payload: BodyweightIn, db: Session = Depends
     s = db.get(WorkoutSession, session_id)
     if not s:
         raise HTTPException(404, "Session not found")
+    if cold_archive().holds_session(session_id):
+        raise HTTPException(400, "Session has archived sets")
+    # Bodyweight exercises in this session change load; re-apply them to the totals.
+    apply_session(db.connection(), session_id, sign=-1)
     s.bodyweight_kg = float(payload.bodyweight_kg)
     db.add(s)
+    db.flush()
+    conn = db.connection()
+    apply_session(conn, session_id)
+    refresh_days(conn, affected_days(conn, SetEntry.session_id == session_id))
+    # total_kg of the session's sets changes with the bodyweight.
+    changes.record(conn, "session", changes.UPSERT, [session_id])
+    changes.record_sets(conn, changes.UPSERT, SetEntry.session_id == session_id)
+    bump_data_version(db)
     db.commit()
     db.refresh(s)
+    live.publish(session_id, "bodyweight", json_bytes(_session_event(s)))
     return s
 
 
@@ -139,8 +426,11 @@ def end_session(session_id: int, db: Session = Depends(get_db_session)):
     if s.ended_at is None:
         s.ended_at = datetime.utcnow()
         db.add(s)
+        changes.record(db.connection(), "session", changes.UPSERT, [session_id])
+        bump_data_version(db)
         db.commit()
         db.refresh(s)
+        live.publish(session_id, "session_ended", json_bytes(_session_event(s)), last=True)
     return s
 
 
@@ -157,17 +447,85 @@ def total_load(entry: SetEntry, ex: Optional[Exercise], session: Optional[Workou
     return total
 
 
-@app.post("/sessions/{session_id}/entries", response_model=SetEntry)
-def add_entry(session_id: int, payload: SetEntryIn, db: Session = Depends(get_db_session)):
-    s = db.get(WorkoutSession, session_id)
+def catalog_total_load(
+    catalog: Catalog, exercise_id: int, weight_kg: float, bodyweight_kg: Optional[float]
+) -> float:
+    """total_load for a row already fetched from SQL, with the exercise from the catalog."""
+    total = float(weight_kg)
+    if bodyweight_kg is not None and catalog.uses_bodyweight(exercise_id):
+        total += float(bodyweight_kg)
+    return total
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def json_bytes(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(
+        value, default=_json_default, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def fast_json(rows: list) -> Response:
+    """Encode plain dicts straight to JSON, bypassing response_model validation.
+
+    Callers build rows from SQL tuples with the same keys and types as their
+    response model, so the output is identical to the validated path.
+    """
+    return Response(json_bytes(rows), media_type="application/json")
+
+
+def _bucket_expr(column, bucket: str):
+    """SQL date for the start of the day/week/month bucket `column` falls in."""
+    if bucket == "day":
+        return func.date(column)
+    if bucket == "week":
+        # Monday of the ISO week
+        return func.date(column, "weekday 0", "-6 days")
+    if bucket == "month":
+        return func.date(column, "start of month")
+    raise HTTPException(400, "Invalid bucket")
+
+
+def _on_bucket_boundary(value: Optional[datetime], weekly: bool = False) -> bool:
+    """True when a range bound cuts no rollup bucket in half (None is unbounded)."""
+    if value is None:
+        return True
+    if value.tzinfo is not None or value.time() != datetime.min.time():
+        return False
+    return not weekly or value.weekday() == 0
+
+
+class SetEntryOut(BaseModel):
+    """A stored set as add_entry returns it; idempotency keys stay server-side."""
+
+    id: int
+    session_id: int
+    exercise_id: int
+    weight_kg: float
+    reps: int
+    created_at: datetime
+
+
+@app.post("/sessions/{session_id}/entries", response_model=SetEntryOut)
+async def add_entry(
+    session_id: int, payload: SetEntryIn, db: AsyncSession = Depends(get_async_session)
+):
+    s = await db.get(WorkoutSession, session_id)
     if not s:
         raise HTTPException(404, "Session not found")
     if s.ended_at is not None:
         raise HTTPException(400, "Session already ended")
 
-    ex = db.get(Exercise, payload.exercise_id)
+    ex = await db.get(Exercise, payload.exercise_id)
     if not ex:
         raise HTTPException(404, "Exercise not found")
+    bodyweight_kg = s.bodyweight_kg  # s is expired by the commit below
 
     entry = SetEntry(
         session_id=session_id,
@@ -176,49 +534,242 @@ def add_entry(session_id: int, payload: SetEntryIn, db: Session = Depends(get_db
         reps=int(payload.reps),
     )
     db.add(entry)
-    db.commit()
-    db.refresh(entry)
-    return entry
+    await db.flush()
+
+    def fold_in(sync_db: Session) -> None:
+        conn = sync_db.connection()
+        apply_entry_ids(conn, [entry.id])
+        refresh_days(conn, [(entry.exercise_id, entry.created_at.date())])
+        changes.record(conn, "set", changes.UPSERT, [entry.id])
+        changes.record(conn, "session", changes.UPSERT, [session_id])
+        bump_data_version(sync_db)
+
+    await db.run_sync(fold_in)
+    # Taken before the commit expires `entry`, so no SELECT is needed to return it.
+    out = SetEntryOut(
+        id=entry.id,
+        session_id=session_id,
+        exercise_id=entry.exercise_id,
+        weight_kg=entry.weight_kg,
+        reps=entry.reps,
+        created_at=entry.created_at,
+    )
+    await db.commit()
+    if live.subscriber_count(session_id):
+        row = _entry_row(
+            await exercise_catalog_async(),
+            out.id,
+            session_id,
+            out.exercise_id,
+            out.weight_kg,
+            out.reps,
+            out.created_at,
+            bodyweight_kg,
+        )
+        live.publish(session_id, "entry_added", json_bytes(row))
+    return out
 
 
-@app.get("/sessions/{session_id}/entries", response_model=List[EntryOut])
-def list_entries(session_id: int, db: Session = Depends(get_db_session)):
+class SetEntryBatchItem(SetEntryIn):
+    idempotency_key: str
+    created_at: Optional[datetime] = None
+
+
+class SetEntryBatchIn(BaseModel):
+    entries: List[SetEntryBatchItem]
+
+
+class SetEntryBatchOut(BaseModel):
+    inserted: int
+    duplicates: int
+
+
+@app.post("/sessions/{session_id}/entries/batch", response_model=SetEntryBatchOut)
+def add_entries_batch(
+    session_id: int, payload: SetEntryBatchIn, db: Session = Depends(get_db_session)
+):
+    """Insert queued sets in one transaction; keys that were already stored are skipped."""
     s = db.get(WorkoutSession, session_id)
     if not s:
         raise HTTPException(404, "Session not found")
+    if s.ended_at is not None:
+        raise HTTPException(400, "Session already ended")
+    if not payload.entries:
+        return SetEntryBatchOut(inserted=0, duplicates=0)
 
-    entries = db.exec(
-        select(SetEntry)
-        .where(SetEntry.session_id == session_id)
-        .order_by(SetEntry.created_at.desc())
-    ).all()
+    exercise_ids = {e.exercise_id for e in payload.entries}
+    known = set(db.exec(select(Exercise.id).where(Exercise.id.in_(exercise_ids))).all())
+    if exercise_ids - known:
+        raise HTTPException(404, "Exercise not found")
+    arc = cold_archive()
+    entries = payload.entries
+    if arc.horizon is not None:
+        # Replays of sets that have since been archived are duplicates too.
+        keys = [e.idempotency_key for e in entries]
+        archived_keys = set(
+            db.exec(
+                select(ArchivedKey.idempotency_key).where(ArchivedKey.idempotency_key.in_(keys))
+            ).all()
+        )
+        entries = [e for e in entries if e.idempotency_key not in archived_keys]
+        if not entries:
+            return SetEntryBatchOut(inserted=0, duplicates=len(payload.entries))
+    if any(e.created_at is not None and arc.holds(e.created_at) for e in entries):
+        raise HTTPException(400, "Cannot add sets before the archive horizon")
+
+    now = datetime.utcnow()
+    # Core executemany on the session's connection; RETURNING skips replayed keys.
+    conn = db.connection()
+    result = conn.execute(
+        insert(SetEntry)
+        .on_conflict_do_nothing(index_elements=[SetEntry.idempotency_key])
+        .returning(SetEntry.id),
+        [
+            {
+                "session_id": session_id,
+                "exercise_id": e.exercise_id,
+                "weight_kg": float(e.weight_kg),
+                "reps": int(e.reps),
+                "created_at": e.created_at or now,
+                "idempotency_key": e.idempotency_key,
+            }
+            for e in entries
+        ],
+    )
+    inserted_ids = result.scalars().all()
+    inserted = len(inserted_ids)
+    if inserted:
+        apply_entry_ids(conn, inserted_ids)
+        refresh_days(conn, days_of_entries(conn, inserted_ids))
+        changes.record(conn, "set", changes.UPSERT, inserted_ids)
+        changes.record(conn, "session", changes.UPSERT, [session_id])
+        bump_data_version(db)
+    db.commit()
+    if inserted and live.subscriber_count(session_id):
+        catalog = exercise_catalog()
+        for row in db.exec(
+            select(
+                SetEntry.id,
+                SetEntry.exercise_id,
+                SetEntry.weight_kg,
+                SetEntry.reps,
+                SetEntry.created_at,
+            )
+            .where(SetEntry.id.in_(inserted_ids))
+            .order_by(SetEntry.created_at, SetEntry.id)
+        ):
+            event = _entry_row(catalog, row[0], session_id, *row[1:], s.bodyweight_kg)
+            live.publish(session_id, "entry_added", json_bytes(event))
+    return SetEntryBatchOut(inserted=inserted, duplicates=len(payload.entries) - inserted)
 
-    exercises = {e.id: e for e in db.exec(select(Exercise)).all()}
-    out: List[EntryOut] = []
-    for entry in entries:
-        ex = exercises.get(entry.exercise_id)
-        out.append(
-            EntryOut(
-                id=entry.id,
-                session_id=entry.session_id,
-                exercise_id=entry.exercise_id,
-                exercise_name=ex.name if ex else "Unknown",
-                weight_kg=entry.weight_kg,
-                reps=entry.reps,
-                created_at=entry.created_at,
-                total_kg=total_load(entry, ex, s),
+
+@app.get("/sessions/{session_id}/entries", response_model=List[EntryOut])
+async def list_entries(session_id: int, db: AsyncSession = Depends(get_async_session)):
+    s = await db.get(WorkoutSession, session_id)
+    if not s:
+        raise HTTPException(404, "Session not found")
+
+    rows = (
+        await db.exec(
+            select(
+                SetEntry.id,
+                SetEntry.exercise_id,
+                SetEntry.weight_kg,
+                SetEntry.reps,
+                SetEntry.created_at,
             )
+            .where(SetEntry.session_id == session_id)
+            .order_by(SetEntry.created_at.desc())
         )
-    return out
+    ).all()
+    archived = (await cold_archive_async()).sets(session_id=session_id)
+    catalog = await exercise_catalog_async()
+    return await run_in_threadpool(
+        _entries_response, catalog, session_id, s.bodyweight_kg, rows, archived
+    )
+
+
+def _entries_response(
+    catalog: Catalog,
+    session_id: int,
+    bodyweight_kg: Optional[float],
+    rows: list,
+    archived: archive.ArchivedSets,
+) -> Response:
+    # Archived sets are older than every set still in SQLite.
+    rows += reversed(
+        _archived_rows(archived, "id", "exercise_id", "weight_kg", "reps", "created_at")
+    )
+    return fast_json(
+        [_entry_row(catalog, entry_id, session_id, *row, bodyweight_kg) for entry_id, *row in rows]
+    )
+
+
+def _entry_row(
+    catalog: Catalog, entry_id, session_id, exercise_id, weight_kg, reps, created_at, bodyweight_kg
+) -> dict:
+    """An EntryOut-shaped dict, as /sessions/{id}/entries lists it."""
+    return {
+        "id": entry_id,
+        "session_id": session_id,
+        "exercise_id": exercise_id,
+        "exercise_name": catalog.name(exercise_id),
+        "weight_kg": float(weight_kg),
+        "reps": reps,
+        "created_at": created_at,
+        "total_kg": catalog_total_load(catalog, exercise_id, weight_kg, bodyweight_kg),
+    }
+
+
+def _session_event(s: WorkoutSession) -> dict:
+    return {
+        "id": s.id,
+        "started_at": s.started_at,
+        "ended_at": s.ended_at,
+        "bodyweight_kg": s.bodyweight_kg,
+    }
+
+
+@app.get("/sessions/{session_id}/events")
+async def session_events(session_id: int, db: AsyncSession = Depends(get_async_session)):
+    """Server-Sent Events for one session: entry_added, entry_deleted, bodyweight, session_ended.
+
+    Each event carries only the changed row (an entry as listed by
+    /sessions/{id}/entries, `{id, session_id}` for a deletion, or the session).
+    The stream closes after session_ended; `resync` means events were dropped.
+    """
+    s = await db.get(WorkoutSession, session_id)
+    if not s:
+        raise HTTPException(404, "Session not found")
+    if s.ended_at is not None:
+        raise HTTPException(400, "Session already ended")
+    subscription = live.subscribe(session_id)
+    return StreamingResponse(
+        live.stream(subscription),
+        media_type="text/event-stream",
+        # X-Accel-Buffering stops nginx from holding events back.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.delete("/entries/{entry_id}")
 def delete_entry(entry_id: int, db: Session = Depends(get_db_session)):
     entry = db.get(SetEntry, entry_id)
     if not entry:
+        if cold_archive().by_id([entry_id]).size:
+            raise HTTPException(400, "Entry is archived")
         raise HTTPException(404, "Entry not found")
+    apply_entry_ids(db.connection(), [entry_id], sign=-1)
     db.delete(entry)
+    db.flush()
+    conn = db.connection()
+    refresh_days(conn, [(entry.exercise_id, entry.created_at.date())])
+    changes.record(conn, "set", changes.DELETE, [entry_id])
+    changes.record(conn, "session", changes.UPSERT, [entry.session_id])
+    bump_data_version(db)
     db.commit()
+    event = {"id": entry_id, "session_id": entry.session_id}
+    live.publish(entry.session_id, "entry_deleted", json_bytes(event))
     return {"ok": True}
 
 
@@ -244,61 +795,223 @@ def epley_1rm(weight_kg: float, reps: int) -> float:
 
 
 @app.get("/progress/summary", response_model=List[ProgressSummary])
-def progress_summary(db: Session = Depends(get_db_session)):
-    exercises = {e.id: e for e in db.exec(select(Exercise)).all()}
-    sessions = {s.id: s for s in db.exec(select(WorkoutSession)).all()}
-    rows = db.exec(select(SetEntry).order_by(SetEntry.created_at.desc())).all()
-
-    seen = set()
-    out: List[ProgressSummary] = []
-    for r in rows:
-        if r.exercise_id in seen:
-            continue
-        seen.add(r.exercise_id)
-        ex = exercises.get(r.exercise_id)
-        session = sessions.get(r.session_id)
-        total = total_load(r, ex, session)
-        out.append(
-            ProgressSummary(
-                exercise_id=r.exercise_id,
-                date=r.created_at,
-                weight_kg=r.weight_kg,
-                total_kg=total,
-                reps=r.reps,
+async def progress_summary(db: AsyncSession = Depends(get_async_session)):
+    # One index seek per exercise on ix_setentry_exercise_id_created_at, so this
+    # scales with the size of the catalog rather than the set history.
+    latest_id = (
+        select(SetEntry.id)
+        .where(SetEntry.exercise_id == Exercise.id)
+        .order_by(SetEntry.created_at.desc(), SetEntry.id.desc())
+        .limit(1)
+        .correlate(Exercise)
+        .scalar_subquery()
+    )
+    rows = (
+        await db.exec(
+            select(
+                SetEntry.exercise_id,
+                SetEntry.created_at,
+                SetEntry.weight_kg,
+                SetEntry.reps,
+                WorkoutSession.bodyweight_kg,
             )
+            .select_from(Exercise)
+            .join(SetEntry, SetEntry.id == latest_id)
+            .join(WorkoutSession, WorkoutSession.id == SetEntry.session_id, isouter=True)
+            .order_by(SetEntry.created_at.desc())
         )
-    return out
+    ).all()
+
+    catalog = await exercise_catalog_async()
+    arc = await cold_archive_async()
+    if arc.segments:
+        # Exercises whose sets are all archived; those are older than any row above.
+        latest = arc.latest(skip=[row[0] for row in rows])
+        if latest.size:
+            bodyweights = await _session_bodyweights(db)
+            rows += [
+                (exercise_id, created_at, weight_kg, reps, bodyweights.get(session_id))
+                for exercise_id, created_at, weight_kg, reps, session_id in reversed(
+                    _archived_rows(
+                        latest, "exercise_id", "created_at", "weight_kg", "reps", "session_id"
+                    )
+                )
+                if exercise_id in catalog.by_id
+            ]
+    return [
+        ProgressSummary(
+            exercise_id=exercise_id,
+            date=created_at,
+            weight_kg=weight_kg,
+            total_kg=catalog_total_load(catalog, exercise_id, weight_kg, bodyweight_kg),
+            reps=reps,
+        )
+        for exercise_id, created_at, weight_kg, reps, bodyweight_kg in rows
+    ]
+
+
+async def _progress_rows(db: AsyncSession, columns, exercise_id, since, until, limit):
+    """(created_at, weight_kg, reps, bodyweight_kg) oldest first, archived sets included."""
+    stmt = (
+        select(*columns)
+        .join(WorkoutSession, WorkoutSession.id == SetEntry.session_id, isouter=True)
+        .where(SetEntry.exercise_id == exercise_id)
+    )
+    if since is not None:
+        stmt = stmt.where(SetEntry.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(SetEntry.created_at < until)
+    if limit is not None:
+        rows = (
+            await db.exec(
+                stmt.order_by(SetEntry.created_at.desc(), SetEntry.id.desc()).limit(limit)
+            )
+        ).all()
+        rows.reverse()
+    else:
+        rows = (await db.exec(stmt.order_by(SetEntry.created_at.asc(), SetEntry.id.asc()))).all()
+
+    if limit is not None and len(rows) >= limit:
+        return rows
+    archived = (await cold_archive_async()).sets(exercise_id=exercise_id, since=since, until=until)
+    if limit is not None:
+        archived = archived.select(slice(max(archived.size - (limit - len(rows)), 0), None))
+    if not archived.size:
+        return rows
+    bodyweights = await _session_bodyweights(db)
+    return [
+        (created_at, weight_kg, reps, bodyweights.get(session_id))
+        for session_id, created_at, weight_kg, reps in _archived_rows(
+            archived, "session_id", "created_at", "weight_kg", "reps"
+        )
+    ] + list(rows)
 
 
 @app.get("/progress/exercise/{exercise_id}", response_model=List[ProgressPoint])
-def exercise_progress(exercise_id: int, db: Session = Depends(get_db_session)):
-    ex = db.get(Exercise, exercise_id)
+async def exercise_progress(
+    exercise_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    resolution: Optional[str] = None,
+    max_points: Optional[int] = Query(None, ge=3),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """Sets for one exercise, oldest first; `limit` keeps the most recent ones.
+
+    `resolution=day|week` keeps the best e1RM set per bucket and `max_points`
+    thins the series with LTTB. PR points are always kept.
+    """
+    bucket_key = None
+    if resolution is not None:
+        bucket_key = {"day": day_key, "week": week_key}.get(resolution.strip().lower())
+        if bucket_key is None:
+            raise HTTPException(400, "Invalid resolution")
+
+    ex = await db.get(Exercise, exercise_id)
     if not ex:
         raise HTTPException(404, "Exercise not found")
 
-    rows = db.exec(
-        select(SetEntry)
-        .where(SetEntry.exercise_id == exercise_id)
-        .order_by(SetEntry.created_at.asc())
-    ).all()
+    columns = (SetEntry.created_at, SetEntry.weight_kg, SetEntry.reps, WorkoutSession.bodyweight_kg)
+    weekly = bucket_key is week_key
+    if (
+        bucket_key is not None
+        and limit is None
+        and _on_bucket_boundary(since, weekly)
+        and _on_bucket_boundary(until, weekly)
+    ):
+        # Whole buckets only: the rollup already points at each bucket's best-e1RM set.
+        rollup = WeeklyRollup if weekly else DailyRollup
+        stmt = (
+            select(rollup.best_set_id, *columns)
+            .select_from(rollup)
+            .join(SetEntry, SetEntry.id == rollup.best_set_id, isouter=True)
+            .join(WorkoutSession, WorkoutSession.id == SetEntry.session_id, isouter=True)
+            .where(rollup.exercise_id == exercise_id)
+        )
+        if since is not None:
+            stmt = stmt.where(rollup.bucket >= since.date())
+        if until is not None:
+            stmt = stmt.where(rollup.bucket < until.date())
+        rows = (await db.exec(stmt.order_by(rollup.bucket))).all()
+        archived = {}
+        missing = [row[0] for row in rows if row[1] is None]
+        if missing:
+            # Buckets before the archive horizon point at archived sets.
+            bodyweights = await _session_bodyweights(db)
+            archived = {
+                set_id: (created_at, weight_kg, reps, bodyweights.get(session_id))
+                for set_id, session_id, created_at, weight_kg, reps in _archived_rows(
+                    (await cold_archive_async()).by_id(missing),
+                    "id",
+                    "session_id",
+                    "created_at",
+                    "weight_kg",
+                    "reps",
+                )
+            }
+        rows = [row[1:] if row[1] is not None else archived.get(row[0]) for row in rows]
+        rows = [row for row in rows if row is not None]
+        bucket_key = None
+    else:
+        rows = await _progress_rows(db, columns, exercise_id, since, until, limit)
+
+    # e1RMs, LTTB and encoding are CPU work; keep them off the event loop.
+    return await run_in_threadpool(
+        _progress_response, rows, ex.uses_bodyweight, bucket_key, max_points
+    )
 
-    out: List[ProgressPoint] = []
-    for r in rows:
-        total = r.weight_kg
-        if ex.uses_bodyweight:
-            s = db.get(WorkoutSession, r.session_id)
-            if s and s.bodyweight_kg is not None:
-                total = float(r.weight_kg) + float(s.bodyweight_kg)
+
+def _progress_response(
+    rows: list, uses_bodyweight: bool, bucket_key, max_points: Optional[int]
+) -> Response:
+    out = []
+    for created_at, weight_kg, reps, bodyweight_kg in rows:
+        total = float(weight_kg)
+        if uses_bodyweight and bodyweight_kg is not None:
+            total += float(bodyweight_kg)
         out.append(
-            ProgressPoint(
-                date=r.created_at,
-                weight_kg=r.weight_kg,
-                total_kg=total,
-                reps=r.reps,
-                e1rm=epley_1rm(total, r.reps),
-            )
+            {
+                "date": created_at,
+                "weight_kg": float(weight_kg),
+                "total_kg": total,
+                "reps": reps,
+                "e1rm": epley_1rm(total, reps),
+            }
         )
-    return out
+    if bucket_key is not None or max_points is not None:
+        out = downsample_progress(out, bucket_key, max_points)
+    return fast_json(out)
+
+
+def downsample_progress(points: List[dict], bucket_key=None, max_points: Optional[int] = None):
+    """Thin ProgressPoint-shaped dicts (oldest first) to at most `max_points`.
+
+    PR points survive unless there are more of them than `max_points`; then
+    the PR curve itself is thinned with LTTB.
+    """
+    if bucket_key is not None:
+        keep = bucket_max([bucket_key(p["date"]) for p in points], [p["e1rm"] for p in points])
+        points = [points[i] for i in keep]
+    if max_points is not None and len(points) > max_points:
+        e1rms = [p["e1rm"] for p in points]
+        xs = [p["date"].timestamp() for p in points]
+        prs = running_max_indices(e1rms)
+        if len(prs) > max_points:
+            if max_points >= 3:
+                picks = lttb([xs[i] for i in prs], [e1rms[i] for i in prs], max_points)
+                keep = {prs[i] for i in picks}
+            else:
+                keep = set(prs[len(prs) - max_points :])
+        else:
+            keep = set(prs)
+            spare = max_points - len(prs)
+            if spare >= 3:
+                keep.update(lttb(xs, e1rms, spare))
+            elif spare:
+                keep.add(len(points) - 1)
+        points = [points[i] for i in sorted(keep)]
+    return points
 
 
 class BodyweightPoint(BaseModel):
@@ -311,8 +1024,17 @@ def delete_session(session_id: int, db: Session = Depends(get_db_session)):
     s = db.get(WorkoutSession, session_id)
     if not s:
         raise HTTPException(404, "Session not found")
+    if cold_archive().holds_session(session_id):
+        raise HTTPException(400, "Session has archived sets")
+    conn = db.connection()
+    apply_session(conn, session_id, sign=-1)
+    days = affected_days(conn, SetEntry.session_id == session_id)
+    changes.record_sets(conn, changes.DELETE, SetEntry.session_id == session_id)
+    changes.record(conn, "session", changes.DELETE, [session_id])
     db.exec(delete(SetEntry).where(SetEntry.session_id == session_id))
+    refresh_days(conn, days)
     db.delete(s)
+    bump_data_version(db)
     db.commit()
     return {"ok": True}
 
@@ -342,21 +1064,22 @@ class GoalsSummary(BaseModel):
     total_sets: int
 
 
+def _goal_out(g: FitnessGoal) -> GoalOut:
+    return GoalOut(
+        id=g.id,
+        type=g.type,
+        exercise_id=g.exercise_id,
+        target_weight_kg=g.target_weight_kg,
+        target_reps=g.target_reps,
+        target_sessions_per_week=g.target_sessions_per_week,
+        created_at=g.created_at,
+    )
+
+
 @app.get("/goals", response_model=List[GoalOut])
 def list_goals(db: Session = Depends(get_db_session)):
     goals = db.exec(select(FitnessGoal).order_by(FitnessGoal.created_at.desc())).all()
-    return [
-        GoalOut(
-            id=g.id,
-            type=g.type,
-            exercise_id=g.exercise_id,
-            target_weight_kg=g.target_weight_kg,
-            target_reps=g.target_reps,
-            target_sessions_per_week=g.target_sessions_per_week,
-            created_at=g.created_at,
-        )
-        for g in goals
-    ]
+    return [_goal_out(g) for g in goals]
 
 
 @app.post("/goals", response_model=GoalOut)
@@ -384,17 +1107,12 @@ def create_goal(payload: GoalIn, db: Session = Depends(get_db_session)):
         target_sessions_per_week=payload.target_sessions_per_week,
     )
     db.add(goal)
+    db.flush()
+    changes.record(db.connection(), "goal", changes.UPSERT, [goal.id])
+    bump_data_version(db)
     db.commit()
     db.refresh(goal)
-    return GoalOut(
-        id=goal.id,
-        type=goal.type,
-        exercise_id=goal.exercise_id,
-        target_weight_kg=goal.target_weight_kg,
-        target_reps=goal.target_reps,
-        target_sessions_per_week=goal.target_sessions_per_week,
-        created_at=goal.created_at,
-    )
+    return _goal_out(goal)
 
 
 @app.delete("/goals/{goal_id}")
@@ -403,47 +1121,182 @@ def delete_goal(goal_id: int, db: Session = Depends(get_db_session)):
     if not goal:
         raise HTTPException(404, "Goal not found")
     db.delete(goal)
+    changes.record(db.connection(), "goal", changes.DELETE, [goal_id])
+    bump_data_version(db)
     db.commit()
     return {"ok": True}
 
 
 @app.get("/goals/summary", response_model=GoalsSummary)
 def goals_summary(db: Session = Depends(get_db_session)):
-    exercises = db.exec(select(Exercise)).all()
-    ex_map = {e.id: e for e in exercises}
-    chinup_ids = {e.id for e in exercises if "chin" in e.name.lower()}
-
-    sessions = {s.id: s for s in db.exec(select(WorkoutSession)).all()}
-    entries = db.exec(select(SetEntry)).all()
-
-    total_sets = len(entries)
-    total_load_sum = 0.0
-    chinup_reps = 0
-    chinup_sets = 0
-
-    for entry in entries:
-        ex = ex_map.get(entry.exercise_id)
-        session = sessions.get(entry.session_id)
-        total = total_load(entry, ex, session)
-        total_load_sum += total
-        if entry.exercise_id in chinup_ids:
-            chinup_reps += int(entry.reps)
-            chinup_sets += 1
-
-    avg_load = total_load_sum / total_sets if total_sets else 0.0
+    # Maintained by every write (see aggregates.py), so this is one row read.
+    totals = read_totals(db.connection())
     return GoalsSummary(
-        chinup_reps=chinup_reps,
-        chinup_sets=chinup_sets,
-        avg_load_kg=avg_load,
-        total_sets=total_sets,
+        chinup_reps=totals.chinup_reps,
+        chinup_sets=totals.chinup_sets,
+        avg_load_kg=totals.total_load_kg / totals.total_sets if totals.total_sets else 0.0,
+        total_sets=totals.total_sets,
     )
 
 
+class WeeklySessions(BaseModel):
+    week: date
+    sessions: int
+
+
+class GoalProgress(BaseModel):
+    goal_id: int
+    type: str
+    percent: float
+    best_weight_kg: Optional[float] = None
+    best_total_kg: Optional[float] = None
+    best_reps: Optional[int] = None
+    has_match: bool = False
+    sessions_last_7_days: Optional[int] = None
+    weekly_sessions: Optional[List[WeeklySessions]] = None
+
+
+@app.get("/goals/progress", response_model=List[GoalProgress])
+def goals_progress(weeks: int = Query(8, ge=1, le=52), db: Session = Depends(get_db_session)):
+    """Progress for every goal using a fixed number of queries.
+
+    PR goals report the heaviest set with at least `target_reps` (falling back to
+    the heaviest set overall); frequency goals report the last 7 days and the
+    trailing `weeks` calendar weeks.
+    """
+    goals = db.exec(select(FitnessGoal).order_by(FitnessGoal.created_at.desc())).all()
+    if not goals:
+        return []
+
+    best_by_goal = {}
+    if any(g.type == "pr" for g in goals):
+        total = total_load_expr()
+        eligible = case((SetEntry.reps >= FitnessGoal.target_reps, 1), else_=0)
+        ranked = (
+            select(
+                FitnessGoal.id.label("goal_id"),
+                SetEntry.weight_kg,
+                total.label("total_kg"),
+                SetEntry.reps,
+                eligible.label("eligible"),
+                func.row_number()
+                .over(
+                    partition_by=FitnessGoal.id,
+                    order_by=(eligible.desc(), total.desc(), SetEntry.created_at.asc()),
+                )
+                .label("rn"),
+            )
+            .select_from(FitnessGoal)
+            .join(SetEntry, SetEntry.exercise_id == FitnessGoal.exercise_id)
+            .join(Exercise, Exercise.id == SetEntry.exercise_id)
+            .join(WorkoutSession, WorkoutSession.id == SetEntry.session_id, isouter=True)
+            .where(FitnessGoal.type == "pr")
+            .subquery()
+        )
+        for row in db.exec(
+            select(
+                ranked.c.goal_id,
+                ranked.c.weight_kg,
+                ranked.c.total_kg,
+                ranked.c.reps,
+                ranked.c.eligible,
+            ).where(ranked.c.rn == 1)
+        ).all():
+            best_by_goal[row[0]] = row
+
+        arc = cold_archive()
+        if arc.segments:
+            # Archived sets are older than every set above, so they win ties.
+            catalog = exercise_catalog()
+            bodyweights = db.exec(archive.SESSION_BODYWEIGHTS).all()
+            for g in goals:
+                if g.type != "pr":
+                    continue
+                sets = arc.sets(exercise_id=g.exercise_id)
+                if not sets.size:
+                    continue
+                bodyweight = None
+                if catalog.uses_bodyweight(g.exercise_id):
+                    bodyweight = archive.session_bodyweights(sets.session_id, bodyweights)
+                weight_kg, total_kg, reps, eligible = archive.best_set(
+                    sets, g.target_reps, bodyweight
+                )
+                hot = best_by_goal.get(g.id)
+                if hot is None or (eligible, total_kg) >= (bool(hot[4]), hot[2]):
+                    best_by_goal[g.id] = (g.id, weight_kg, total_kg, reps, int(eligible))
+
+    last_7_days = 0
+    weekly: List[WeeklySessions] = []
+    if any(g.type == "frequency" for g in goals):
+        now = datetime.utcnow()
+        last_7_days = db.exec(
+            select(func.count(WorkoutSession.id)).where(
+                WorkoutSession.started_at >= now - timedelta(days=7)
+            )
+        ).one()
+        this_week = now.date() - timedelta(days=now.weekday())
+        first_week = this_week - timedelta(weeks=weeks - 1)
+        week_col = _bucket_expr(WorkoutSession.started_at, "week").label("week")
+        counts = {
+            str(week): n
+            for week, n in db.exec(
+                select(week_col, func.count(WorkoutSession.id))
+                .where(
+                    WorkoutSession.started_at >= datetime.combine(first_week, datetime.min.time())
+                )
+                .group_by(week_col)
+            ).all()
+        }
+        weekly = [
+            WeeklySessions(week=w, sessions=counts.get(w.isoformat(), 0))
+            for w in (first_week + timedelta(weeks=i) for i in range(weeks))
+        ]
+
+    out: List[GoalProgress] = []
+    for g in goals:
+        if g.type == "pr":
+            best = best_by_goal.get(g.id)
+            if best is None:
+                out.append(GoalProgress(goal_id=g.id, type=g.type, percent=0.0))
+                continue
+            _, weight_kg, total_kg, reps, eligible_flag = best
+            target = float(g.target_weight_kg or 0)
+            out.append(
+                GoalProgress(
+                    goal_id=g.id,
+                    type=g.type,
+                    percent=min(1.0, total_kg / target) if target > 0 else 0.0,
+                    best_weight_kg=weight_kg,
+                    best_total_kg=total_kg,
+                    best_reps=reps,
+                    has_match=bool(eligible_flag),
+                )
+            )
+        else:
+            target = int(g.target_sessions_per_week or 0)
+            out.append(
+                GoalProgress(
+                    goal_id=g.id,
+                    type=g.type,
+                    percent=min(1.0, last_7_days / target) if target > 0 else 0.0,
+                    sessions_last_7_days=last_7_days,
+                    weekly_sessions=weekly,
+                )
+            )
+    return out
+
+
 @app.post("/admin/reset")
 def admin_reset(db: Session = Depends(get_db_session)):
     db.exec(delete(SetEntry))
     db.exec(delete(WorkoutSession))
     db.exec(delete(FitnessGoal))
+    reset_totals(db.connection())
+    reset_rollups(db.connection())
+    archive.clear_archive(db)
+    db.exec(delete(ChangeLog))
+    changes.record_reset(db.connection())
+    bump_data_version(db)
     db.commit()
     seed_exercises(db)
     return {"ok": True}
@@ -478,27 +1331,548 @@ class HeatmapEntry(BaseModel):
 
 
 @app.get("/heatmap/entries", response_model=List[HeatmapEntry])
-def heatmap_entries(db: Session = Depends(get_db_session)):
+async def heatmap_entries(db: AsyncSession = Depends(get_async_session)):
     """Get all workout entries for the heatmap visualization."""
-    entries = db.exec(select(SetEntry).order_by(SetEntry.created_at.desc())).all()
+    rows = (
+        await db.exec(
+            select(
+                SetEntry.id,
+                SetEntry.session_id,
+                SetEntry.exercise_id,
+                SetEntry.weight_kg,
+                SetEntry.reps,
+                SetEntry.created_at,
+                WorkoutSession.bodyweight_kg,
+            )
+            .join(WorkoutSession, WorkoutSession.id == SetEntry.session_id, isouter=True)
+            .order_by(SetEntry.created_at.desc())
+        )
+    ).all()
+    archived = (await cold_archive_async()).sets()
+    bodyweights = await _session_bodyweights(db) if archived.size else {}
+    catalog = await exercise_catalog_async()
+    # Building and encoding 100k rows would stall the event loop for about a second.
+    return await run_in_threadpool(_heatmap_response, catalog, rows, archived, bodyweights)
+
+
+def _heatmap_response(
+    catalog: Catalog, rows: list, archived: archive.ArchivedSets, bodyweights: dict
+) -> Response:
+    if archived.size:
+        rows += [
+            (
+                entry_id,
+                session_id,
+                exercise_id,
+                weight_kg,
+                reps,
+                created_at,
+                bodyweights.get(session_id),
+            )
+            for entry_id, session_id, exercise_id, weight_kg, reps, created_at in reversed(
+                _archived_rows(
+                    archived, "id", "session_id", "exercise_id", "weight_kg", "reps", "created_at"
+                )
+            )
+        ]
+    return fast_json(
+        [
+            {
+                "id": entry_id,
+                "session_id": session_id,
+                "exercise_id": exercise_id,
+                "weight_kg": float(weight_kg),
+                "reps": reps,
+                "created_at": created_at,
+                "total_kg": catalog_total_load(catalog, exercise_id, weight_kg, bodyweight_kg),
+            }
+            for entry_id, session_id, exercise_id, weight_kg, reps, created_at, bodyweight_kg in rows
+        ]
+    )
 
-    exercises = {e.id: e for e in db.exec(select(Exercise)).all()}
-    sessions = {s.id: s for s in db.exec(select(WorkoutSession)).all()}
 
-    out: List[HeatmapEntry] = []
-    for entry in entries:
-        ex = exercises.get(entry.exercise_id)
-        session = sessions.get(entry.session_id)
-        total = total_load(entry, ex, session)
-        out.append(
-            HeatmapEntry(
-                id=entry.id,
-                session_id=entry.session_id,
-                exercise_id=entry.exercise_id,
-                weight_kg=entry.weight_kg,
-                reps=entry.reps,
-                created_at=entry.created_at,
-                total_kg=total,
+class HeatmapBucket(BaseModel):
+    bucket: date
+    body_part: str
+    sub_part: str
+    sets: int
+    reps: int
+    tonnage_kg: float
+
+
+@app.get("/heatmap", response_model=List[HeatmapBucket])
+async def heatmap_buckets(
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    bucket: str = "week",
+    db: AsyncSession = Depends(get_async_session),
+):
+    """Per body_part/sub_part set, rep and tonnage totals per time bucket (`to` is exclusive)."""
+    bucket = (bucket or "").strip().lower()
+    archived = None
+    if _on_bucket_boundary(from_) and _on_bucket_boundary(to):
+        # Day-aligned ranges are answered from the rollups (weekly ones when they fit).
+        weekly = _on_bucket_boundary(from_, True) and _on_bucket_boundary(to, True)
+        rollup = WeeklyRollup if bucket == "week" and weekly else DailyRollup
+        bucket_col = _bucket_expr(rollup.bucket, bucket).label("bucket")
+        stmt = select(
+            bucket_col,
+            Exercise.body_part,
+            Exercise.sub_part,
+            func.sum(rollup.sets),
+            func.sum(rollup.reps),
+            func.sum(rollup.tonnage_kg),
+        ).join(Exercise, Exercise.id == rollup.exercise_id)
+        if from_ is not None:
+            stmt = stmt.where(rollup.bucket >= from_.date())
+        if to is not None:
+            stmt = stmt.where(rollup.bucket < to.date())
+    else:
+        bucket_col = _bucket_expr(SetEntry.created_at, bucket).label("bucket")
+        stmt = (
+            select(
+                bucket_col,
+                Exercise.body_part,
+                Exercise.sub_part,
+                func.count(SetEntry.id),
+                func.sum(SetEntry.reps),
+                func.sum(total_load_expr() * SetEntry.reps),
             )
+            .join(Exercise, Exercise.id == SetEntry.exercise_id)
+            .join(WorkoutSession, WorkoutSession.id == SetEntry.session_id)
         )
-    return out
+        if from_ is not None:
+            stmt = stmt.where(SetEntry.created_at >= from_)
+        if to is not None:
+            stmt = stmt.where(SetEntry.created_at < to)
+        # The rollups cover archived days; a raw range has to read the archive.
+        archived = (await cold_archive_async()).sets(since=from_, until=to)
+    stmt = stmt.group_by(bucket_col, Exercise.body_part, Exercise.sub_part).order_by(
+        bucket_col, Exercise.body_part, Exercise.sub_part
+    )
+    rows = (await db.exec(stmt)).all()
+    if archived is not None and archived.size:
+        rows = await _with_archived_buckets(db, rows, archived, bucket)
+
+    return [
+        HeatmapBucket(
+            bucket=b,
+            body_part=body_part,
+            sub_part=sub_part,
+            sets=sets,
+            reps=reps or 0,
+            tonnage_kg=float(tonnage or 0.0),
+        )
+        for b, body_part, sub_part, sets, reps, tonnage in rows
+    ]
+
+
+_BUCKET_KEYS = {"day": day_key, "week": week_key, "month": lambda ts: ts.date().replace(day=1)}
+
+
+async def _with_archived_buckets(db: AsyncSession, rows, archived, bucket: str) -> list:
+    """Add archived sets to /heatmap rows (bucket, body_part, sub_part, sets, reps, tonnage)."""
+    catalog = await exercise_catalog_async()
+    bodyweights = await _session_bodyweights(db)
+    bucket_key = _BUCKET_KEYS[bucket]
+    merged = {}
+    for b, body_part, sub_part, sets, reps, tonnage in rows:
+        merged[(date.fromisoformat(b), body_part, sub_part)] = [sets, reps or 0, tonnage or 0.0]
+    for session_id, exercise_id, created_at, weight_kg, reps in _archived_rows(
+        archived, "session_id", "exercise_id", "created_at", "weight_kg", "reps"
+    ):
+        ex = catalog.by_id.get(exercise_id)
+        if ex is None:
+            continue
+        total = catalog_total_load(catalog, exercise_id, weight_kg, bodyweights.get(session_id))
+        key = (bucket_key(created_at), ex.body_part, ex.sub_part)
+        totals = merged.setdefault(key, [0, 0, 0.0])
+        totals[0] += 1
+        totals[1] += reps
+        totals[2] += total * reps
+    return [(*key, *merged[key]) for key in sorted(merged)]
+
+
+class WeeklyVolume(BaseModel):
+    week: date
+    body_part: str
+    sets: int
+    reps: int
+    tonnage_kg: float
+
+
+class WorkloadDay(BaseModel):
+    date: date
+    load_kg: float
+    acute_kg: float
+    chronic_kg: float
+    ratio: Optional[float] = None
+
+
+class E1rmTrend(BaseModel):
+    exercise_id: int
+    exercise_name: str
+    days: int
+    slope_kg_per_week: Optional[float] = None
+    latest_e1rm_kg: float
+    best_e1rm_kg: float
+
+
+def set_history():
+    from .db import engine
+
+    return analytics.history(engine)
+
+
+@app.get("/analytics/volume", response_model=List[WeeklyVolume])
+def analytics_volume(
+    from_: Optional[datetime] = Query(None, alias="from"), to: Optional[datetime] = None
+):
+    """Weekly sets, reps and tonnage per body_part (`to` is exclusive)."""
+    h = analytics.in_range(set_history(), from_, to)
+    return fast_json(analytics.weekly_volume(h, exercise_catalog()))
+
+
+@app.get("/analytics/workload", response_model=List[WorkloadDay])
+def analytics_workload(
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    acute_days: int = Query(7, ge=1, le=365),
+    chronic_days: int = Query(28, ge=2, le=365),
+):
+    """Daily tonnage with acute/chronic rolling means and the acute:chronic workload ratio."""
+    if acute_days >= chronic_days:
+        raise HTTPException(400, "acute_days must be shorter than chronic_days")
+    rows = analytics.workload(
+        set_history(), exercise_catalog(), acute_days, chronic_days, since=from_, until=to
+    )
+    return fast_json(rows)
+
+
+@app.get("/analytics/e1rm-trends", response_model=List[E1rmTrend])
+def analytics_e1rm_trends(
+    from_: Optional[datetime] = Query(None, alias="from"), to: Optional[datetime] = None
+):
+    """Per-exercise e1RM trend: least-squares slope of the best e1RM per training day."""
+    h = analytics.in_range(set_history(), from_, to)
+    return fast_json(analytics.e1rm_trends(h, exercise_catalog()))
+
+
+EXPORT_BATCH_SIZE = 500
+# Lines are sent in chunks of about this many bytes rather than one message per record.
+EXPORT_CHUNK_SIZE = 64 * 1024
+EXPORT_COLUMNS = [
+    "type",
+    "id",
+    "session_id",
+    "exercise_id",
+    "exercise_name",
+    "date",
+    "ended_at",
+    "weight_kg",
+    "reps",
+    "total_kg",
+    "bodyweight_kg",
+    "goal_type",
+    "target_weight_kg",
+    "target_reps",
+    "target_sessions_per_week",
+]
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def export_records():
+    """Yield every session, set, bodyweight reading and goal as a flat dict.
+
+    Rows are pulled from the cursor EXPORT_BATCH_SIZE at a time, so memory does
+    not grow with the history; archived sets are read from the memory-mapped
+    columns in slices of the same size, ahead of the newer sets in SQLite.
+    Opens its own session because the response is streamed after request
+    dependencies have been closed.
+    """
+    from .db import engine
+
+    with Session(engine) as db:
+        sessions = select(
+            WorkoutSession.id,
+            WorkoutSession.started_at,
+            WorkoutSession.ended_at,
+            WorkoutSession.bodyweight_kg,
+        ).order_by(WorkoutSession.started_at, WorkoutSession.id)
+        for session_id, started_at, ended_at, bodyweight_kg in db.exec(
+            sessions.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        ):
+            yield {
+                "type": "session",
+                "id": session_id,
+                "date": _iso(started_at),
+                "ended_at": _iso(ended_at),
+                "bodyweight_kg": bodyweight_kg,
+            }
+
+        archived = cold_archive().sets()
+        if archived.size:
+            catalog = exercise_catalog()
+            bodyweights = dict(db.exec(archive.SESSION_BODYWEIGHTS).all())
+        for start in range(0, archived.size, EXPORT_BATCH_SIZE):
+            batch = archived.select(slice(start, start + EXPORT_BATCH_SIZE))
+            for entry_id, session_id, exercise_id, created_at, weight_kg, reps in _archived_rows(
+                batch, "id", "session_id", "exercise_id", "created_at", "weight_kg", "reps"
+            ):
+                if exercise_id not in catalog.by_id:
+                    continue  # dropped by the join below too
+                yield {
+                    "type": "set",
+                    "id": entry_id,
+                    "session_id": session_id,
+                    "exercise_id": exercise_id,
+                    "exercise_name": catalog.name(exercise_id),
+                    "date": _iso(created_at),
+                    "weight_kg": weight_kg,
+                    "reps": reps,
+                    "total_kg": catalog_total_load(
+                        catalog, exercise_id, weight_kg, bodyweights.get(session_id)
+                    ),
+                }
+
+        sets = (
+            select(
+                SetEntry.id,
+                SetEntry.session_id,
+                SetEntry.exercise_id,
+                Exercise.name,
+                SetEntry.created_at,
+                SetEntry.weight_kg,
+                SetEntry.reps,
+                total_load_expr(),
+            )
+            .join(Exercise, Exercise.id == SetEntry.exercise_id)
+            .join(WorkoutSession, WorkoutSession.id == SetEntry.session_id, isouter=True)
+            .order_by(SetEntry.created_at, SetEntry.id)
+        )
+        for entry_id, session_id, exercise_id, name, created_at, weight_kg, reps, total in db.exec(
+            sets.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        ):
+            yield {
+                "type": "set",
+                "id": entry_id,
+                "session_id": session_id,
+                "exercise_id": exercise_id,
+                "exercise_name": name,
+                "date": _iso(created_at),
+                "weight_kg": weight_kg,
+                "reps": reps,
+                "total_kg": total,
+            }
+
+        bodyweights = (
+            select(WorkoutSession.id, WorkoutSession.started_at, WorkoutSession.bodyweight_kg)
+            .where(WorkoutSession.bodyweight_kg.is_not(None))
+            .order_by(WorkoutSession.started_at, WorkoutSession.id)
+        )
+        for session_id, started_at, bodyweight_kg in db.exec(
+            bodyweights.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        ):
+            yield {
+                "type": "bodyweight",
+                "session_id": session_id,
+                "date": _iso(started_at),
+                "weight_kg": bodyweight_kg,
+            }
+
+        for g in db.exec(select(FitnessGoal).order_by(FitnessGoal.created_at)):
+            yield {
+                "type": "goal",
+                "id": g.id,
+                "exercise_id": g.exercise_id,
+                "date": _iso(g.created_at),
+                "goal_type": g.type,
+                "target_weight_kg": g.target_weight_kg,
+                "target_reps": g.target_reps,
+                "target_sessions_per_week": g.target_sessions_per_week,
+            }
+
+
+def _ndjson_lines(records):
+    chunk = bytearray()
+    for record in records:
+        chunk += json_bytes(record)
+        chunk += b"\n"
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
+
+def _csv_lines(records):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS, restval="")
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+        if buf.tell() >= EXPORT_CHUNK_SIZE:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+@app.get("/export")
+def export_history(fmt: str = Query("ndjson", alias="format")):
+    """Stream the full training history as NDJSON (one record per line) or CSV."""
+    fmt = (fmt or "").strip().lower()
+    if fmt == "ndjson":
+        body, media_type = _ndjson_lines(export_records()), "application/x-ndjson"
+    elif fmt == "csv":
+        body, media_type = _csv_lines(export_records()), "text/csv"
+    else:
+        raise HTTPException(400, "Invalid export format")
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="fitnesstracker-export.{fmt}"'},
+    )
+
+
+class ImportOut(BaseModel):
+    rows: int
+    skipped: int
+    inserted: int
+    duplicates: int
+    # Rows from before the archive horizon, which are not imported
+    archived: int
+    sessions_created: int
+    exercises_created: int
+
+
+@app.post("/import", response_model=ImportOut)
+async def import_history(request: Request, source: str = "auto", unit: str = "kg"):
+    """Import a Strong/Hevy CSV sent as the raw request body.
+
+    The upload is spooled (to disk past 1 MiB) and parsed as a stream; sets go in
+    IMPORT_CHUNK_SIZE at a time. Re-importing the same file adds nothing.
+    """
+    if source not in {"auto", "strong", "hevy"}:
+        raise HTTPException(400, "Invalid import source")
+    if unit not in {"kg", "lb"}:
+        raise HTTPException(400, "Invalid weight unit")
+
+    from .db import engine
+
+    def progress(rows_read: int, inserted: int) -> None:
+        logger.info("Import: %d rows read, %d sets inserted", rows_read, inserted)
+
+    with tempfile.SpooledTemporaryFile(max_size=1 << 20) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        text_stream = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+        try:
+            result = await run_in_threadpool(
+                import_rows,
+                engine,
+                parse_rows(text_stream, source, unit),
+                IMPORT_CHUNK_SIZE,
+                progress,
+            )
+        except CsvImportError as e:
+            raise HTTPException(400, str(e))
+        finally:
+            text_stream.detach()
+    return ImportOut(**result._asdict())
+
+
+class ChangesOut(BaseModel):
+    cursor: int
+    sessions: List[SessionOut]
+    sets: List[EntryOut]
+    goals: List[GoalOut]
+    # Ids per entity: "session", "set" and "goal"
+    deleted: Dict[str, List[int]]
+
+
+# Below SQLite's default host-parameter limit of 32766.
+CHANGES_ID_CHUNK = 10000
+
+
+def _chunks(ids: List[int]):
+    for start in range(0, len(ids), CHANGES_ID_CHUNK):
+        yield ids[start : start + CHANGES_ID_CHUNK]
+
+
+@app.get("/changes", response_model=ChangesOut)
+async def list_changes(
+    since: Optional[int] = Query(None, ge=0), db: AsyncSession = Depends(get_async_session)
+):
+    """Sessions, sets and goals created, changed or deleted after cursor `since`.
+
+    Upserted rows come back in their /sessions, /sessions/{id}/entries and
+    /goals shapes; deletions as ids. Without `since` only the current cursor is
+    returned: take it before a full load, then poll with it. 410 means the
+    cursor predates a reset or the retention window, so reload everything.
+    """
+    if since is None:
+        cursor = await db.run_sync(lambda sync_db: changes.latest_cursor(sync_db.connection()))
+        empty = {entity: [] for entity in changes.ENTITIES}
+        return ChangesOut(cursor=cursor, sessions=[], sets=[], goals=[], deleted=empty)
+
+    delta = await db.run_sync(lambda sync_db: changes.changes_since(sync_db.connection(), since))
+    if delta is None:
+        raise HTTPException(410, "Cursor is too old; reload everything")
+
+    sessions: List[SessionOut] = []
+    for ids in _chunks(delta.upserted["session"]):
+        page = select(
+            WorkoutSession.id,
+            WorkoutSession.started_at,
+            WorkoutSession.ended_at,
+            WorkoutSession.bodyweight_kg,
+        ).where(WorkoutSession.id.in_(ids))
+        sessions += await _sessions_out(db, page.subquery())
+
+    catalog = await exercise_catalog_async()
+    sets: List[EntryOut] = []
+    for ids in _chunks(delta.upserted["set"]):
+        rows = await db.exec(
+            select(
+                SetEntry.id,
+                SetEntry.session_id,
+                SetEntry.exercise_id,
+                SetEntry.weight_kg,
+                SetEntry.reps,
+                SetEntry.created_at,
+                WorkoutSession.bodyweight_kg,
+            )
+            .join(WorkoutSession, WorkoutSession.id == SetEntry.session_id, isouter=True)
+            .where(SetEntry.id.in_(ids))
+            .order_by(SetEntry.created_at, SetEntry.id)
+        )
+        sets += [
+            EntryOut(
+                id=entry_id,
+                session_id=session_id,
+                exercise_id=exercise_id,
+                exercise_name=catalog.name(exercise_id),
+                weight_kg=weight_kg,
+                reps=reps,
+                created_at=created_at,
+                total_kg=catalog_total_load(catalog, exercise_id, weight_kg, bodyweight_kg),
+            )
+            for entry_id, session_id, exercise_id, weight_kg, reps, created_at, bodyweight_kg in rows
+        ]
+
+    goals: List[GoalOut] = []
+    for ids in _chunks(delta.upserted["goal"]):
+        rows = await db.exec(
+            select(FitnessGoal).where(FitnessGoal.id.in_(ids)).order_by(FitnessGoal.created_at)
+        )
+        goals += [_goal_out(g) for g in rows]
+
+    return ChangesOut(
+        cursor=delta.cursor, sessions=sessions, sets=sets, goals=goals, deleted=delta.deleted
+    )
@@ -0,0 +1,232 @@
+"""Request and SQL metrics in Prometheus text format, served at /metrics.
+
+``MetricsMiddleware`` times every HTTP request by route template (so
+``/sessions/12`` and ``/sessions/13`` share ``/sessions/{session_id}``) and
+counts the SQL statements it runs via ``instrument_engine``'s cursor events.
+Everything lives in process memory and resets on restart, which is what a
+scraping collector expects.
+"""
+
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (128, 1024, 8192, 65536, 262144, 1048576, 4194304, 16777216)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+_lock = threading.Lock()
+
+# [statements, seconds] for the request being handled in this context.
+_request_sql: ContextVar[Optional[List[float]]] = ContextVar("request_sql", default=None)
+_request_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {} if labels else {(): 0}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self, kind: str = "counter") -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {kind}"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.labels, key)} {_number(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def render(self, kind: str = "gauge") -> List[str]:
+        return super().render(kind)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float]):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self.values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        with _lock:
+            series = self.values.get(labels)
+            if series is None:
+                series = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, series):
+                le = _labels(self.labels, key, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {count}")
+            inf = _labels(self.labels, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {series[-2]}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {series[-2]}")
+        return lines
+
+
+REQUESTS = Counter("http_requests_total", "HTTP requests handled.", ("method", "route", "status"))
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being handled.")
+LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time from request start to the last body byte sent.",
+    ("method", "route"),
+    LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Response body size.", ("method", "route"), SIZE_BUCKETS
+)
+REQUEST_STATEMENTS = Histogram(
+    "http_request_sql_statements",
+    "SQL statements executed per request.",
+    ("method", "route"),
+    STATEMENT_BUCKETS,
+)
+REQUEST_SQL_TIME = Histogram(
+    "http_request_sql_duration_seconds",
+    "Time spent executing SQL per request.",
+    ("method", "route"),
+    LATENCY_BUCKETS,
+)
+STATEMENTS = Counter("db_statements_total", "SQL statements executed, including outside requests.")
+SQL_TIME = Counter("db_statement_duration_seconds_total", "Time spent executing SQL statements.")
+CATALOG_CACHE = Counter(
+    "catalog_cache_lookups_total", "Exercise catalog cache lookups by result.", ("result",)
+)
+
+METRICS = (
+    REQUESTS,
+    IN_FLIGHT,
+    LATENCY,
+    RESPONSE_SIZE,
+    REQUEST_STATEMENTS,
+    REQUEST_SQL_TIME,
+    STATEMENTS,
+    SQL_TIME,
+    CATALOG_CACHE,
+)
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Start times live on the execution context, which is discarded with the
+# statement, so a statement that raises leaves nothing behind on the connection.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    elapsed = time.perf_counter() - started if started is not None else 0.0
+    STATEMENTS.inc()
+    SQL_TIME.inc(amount=elapsed)
+    stats = _request_sql.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count and time every statement run on `engine` (pass ``.sync_engine`` for async)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    if route is None:
+        # Requests answered by middleware (e.g. a 304) never reach the router.
+        for candidate in scope["app"].router.routes:
+            if candidate.matches(scope)[0] == Match.FULL:
+                route = candidate
+                break
+    # Unmatched paths share one label so scanners cannot blow up the series count.
+    return getattr(route, "path", "unmatched")
+
+
+def current_route() -> Optional[str]:
+    """ "GET /sessions/{session_id}" for the request running in this context, if any."""
+    scope = _request_scope.get()
+    if scope is None:
+        return None
+    return f"{scope['method']} {_route_template(scope)}"
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        size = 0
+        sql = [0, 0.0]
+        token = _request_sql.set(sql)
+        scope_token = _request_scope.set(scope)
+        started = time.perf_counter()
+        IN_FLIGHT.inc()
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec()
+            _request_sql.reset(token)
+            _request_scope.reset(scope_token)
+            method = scope["method"]
+            route = _route_template(scope)
+            REQUESTS.inc(method, route, str(status))
+            LATENCY.observe(elapsed, method, route)
+            RESPONSE_SIZE.observe(size, method, route)
+            REQUEST_STATEMENTS.observe(sql[0], method, route)
+            REQUEST_SQL_TIME.observe(sql[1], method, route)
@@ -0,0 +1,186 @@
+"""Versioned schema migrations.
+
+Each step runs once, in order, inside a single transaction together with the
+bump of ``schema_version``. A database that is already current costs one read.
+
+To change the schema: update ``models.py`` and append a step to ``MIGRATIONS``.
+Never edit or reorder a step that has shipped.
+"""
+
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+from sqlmodel import SQLModel
+
+from . import models  # noqa: F401  (registers the tables on SQLModel.metadata)
+from .aggregates import rebuild_totals
+from .rollups import rebuild_rollups
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+def _table_exists(conn: Connection, table: str) -> bool:
+    row = conn.execute(
+        text("SELECT name FROM sqlite_master WHERE type='table' AND name=:name"),
+        {"name": table},
+    ).fetchone()
+    return row is not None
+
+
+def _column_exists(conn: Connection, table: str, column: str) -> bool:
+    rows = conn.execute(text(f"PRAGMA table_info({table})")).fetchall()
+    return any(r[1] == column for r in rows)
+
+
+def _add_column(table: str, column: str, ddl: str) -> Callable[[Connection], None]:
+    # Databases from before schema_version may already have some of these columns.
+    def apply(conn: Connection) -> None:
+        if _table_exists(conn, table) and not _column_exists(conn, table, column):
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+    return apply
+
+
+def _execute(*statements: str) -> Callable[[Connection], None]:
+    def apply(conn: Connection) -> None:
+        for statement in statements:
+            conn.execute(text(statement))
+
+    return apply
+
+
+def _steps(*steps: Callable[[Connection], None]) -> Callable[[Connection], None]:
+    def apply(conn: Connection) -> None:
+        for step in steps:
+            step(conn)
+
+    return apply
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        1,
+        "exercise.uses_bodyweight",
+        _add_column("exercise", "uses_bodyweight", "BOOLEAN NOT NULL DEFAULT 0"),
+    ),
+    Migration(
+        2,
+        "exercise.body_part",
+        _add_column("exercise", "body_part", "TEXT NOT NULL DEFAULT 'other'"),
+    ),
+    Migration(
+        3,
+        "exercise.sub_part",
+        _add_column("exercise", "sub_part", "TEXT NOT NULL DEFAULT 'compound'"),
+    ),
+    # Added 2026-02
+    Migration(
+        4, "workoutsession.bodyweight_kg", _add_column("workoutsession", "bodyweight_kg", "FLOAT")
+    ),
+    Migration(
+        5,
+        "indexes for progress and session paging",
+        _execute(
+            "CREATE INDEX IF NOT EXISTS ix_setentry_exercise_id_created_at "
+            "ON setentry (exercise_id, created_at)",
+            "CREATE INDEX IF NOT EXISTS ix_workoutsession_started_at "
+            "ON workoutsession (started_at)",
+        ),
+    ),
+    Migration(
+        6,
+        "appmeta key/value table",
+        _execute(
+            "CREATE TABLE IF NOT EXISTS appmeta "
+            "(key VARCHAR NOT NULL PRIMARY KEY, value VARCHAR NOT NULL)"
+        ),
+    ),
+    Migration(
+        7,
+        "setentry.idempotency_key",
+        _steps(
+            _add_column("setentry", "idempotency_key", "VARCHAR"),
+            _execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ix_setentry_idempotency_key "
+                "ON setentry (idempotency_key)"
+            ),
+        ),
+    ),
+    # create_all has already added the table; fill it from the existing sets.
+    Migration(8, "runningtotals for /goals/summary", rebuild_totals),
+    Migration(9, "daily and weekly rollups per exercise", rebuild_rollups),
+    # Also added by create_all; the log starts empty and clients begin from cursor 0.
+    Migration(10, "changelog for /changes", _execute()),
+    # Chin-ups were matched by "chin" anywhere in the name, which caught "Machine ...".
+    Migration(11, "chin-ups by exact name", _steps(rebuild_totals, rebuild_rollups)),
+    # Added by create_all; sets archived before it lost their keys.
+    Migration(12, "archivedkey for replays of archived sets", _execute()),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def current_version(conn: Connection) -> int:
+    try:
+        return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+    except OperationalError:
+        return 0
+
+
+def _ensure_version_table(conn: Connection) -> None:
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER PRIMARY KEY, description TEXT NOT NULL, applied_at DATETIME NOT NULL)"
+        )
+    )
+
+
+def _record(conn: Connection, migration: Migration) -> None:
+    conn.execute(
+        text("INSERT INTO schema_version VALUES (:version, :description, :applied_at)"),
+        {
+            "version": migration.version,
+            "description": migration.description,
+            "applied_at": datetime.utcnow(),
+        },
+    )
+
+
+def migrate(engine: Engine) -> List[int]:
+    """Bring the database up to LATEST_VERSION; returns the versions applied."""
+    with engine.connect() as conn:
+        if current_version(conn) >= LATEST_VERSION:
+            return []
+
+    with engine.connect() as conn:
+        # pysqlite does not open a transaction for DDL by itself; take the write
+        # lock up front so the whole upgrade commits or rolls back as one.
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            version = current_version(conn)
+            fresh = not _table_exists(conn, "exercise")
+            _ensure_version_table(conn)
+            SQLModel.metadata.create_all(conn)
+
+            applied: List[int] = []
+            for migration in MIGRATIONS:
+                if migration.version <= version:
+                    continue
+                # create_all already built a brand-new database at the latest schema.
+                if not fresh:
+                    migration.apply(conn)
+                _record(conn, migration)
+                applied.append(migration.version)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return applied
@@ -1,5 +1,6 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 
 
@@ -13,18 +14,31 @@ class Exercise(SQLModel, table=True):
 
 class WorkoutSession(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    started_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     ended_at: Optional[datetime] = None
     bodyweight_kg: Optional[float] = None
 
 
 class SetEntry(SQLModel, table=True):
+    __table_args__ = (
+        # Latest/ranged sets per exercise; SQLite appends the rowid, so this also covers id.
+        Index("ix_setentry_exercise_id_created_at", "exercise_id", "created_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     session_id: int = Field(index=True, foreign_key="workoutsession.id")
     exercise_id: int = Field(index=True, foreign_key="exercise.id")
     weight_kg: float
     reps: int
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Client-generated key for batch uploads; replays with a known key are dropped.
+    idempotency_key: Optional[str] = Field(default=None, index=True, unique=True)
+
+
+class ArchivedKey(SQLModel, table=True):
+    """Idempotency key of a set moved into the archive, so its replays are still dropped."""
+
+    idempotency_key: str = Field(primary_key=True)
 
 
 class FitnessGoal(SQLModel, table=True):
@@ -35,3 +49,51 @@ class FitnessGoal(SQLModel, table=True):
     target_reps: Optional[int] = None
     target_sessions_per_week: Optional[int] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class AppMeta(SQLModel, table=True):
+    key: str = Field(primary_key=True)
+    value: str
+
+
+class RunningTotals(SQLModel, table=True):
+    """Single row (id=1) behind /goals/summary, kept in step with setentry by every write."""
+
+    id: int = Field(default=1, primary_key=True)
+    total_sets: int = 0
+    total_load_kg: float = 0.0
+    chinup_reps: int = 0
+    chinup_sets: int = 0
+
+
+class ChangeLog(SQLModel, table=True):
+    """One row per change to a session, set or goal; the id is the /changes cursor."""
+
+    # AUTOINCREMENT: ids are never reused after compaction, so cursors only grow.
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    entity: str  # "session", "set", "goal", or "all" for a reset
+    entity_id: int = 0
+    op: str  # "upsert", "delete" or "reset"
+    changed_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class RollupBase(SQLModel):
+    exercise_id: int = Field(primary_key=True)
+    # First day of the bucket (the Monday for weekly rollups)
+    bucket: date = Field(primary_key=True, index=True)
+    sets: int
+    reps: int
+    tonnage_kg: float
+    top_set_kg: float  # heaviest total load
+    max_e1rm_kg: float
+    best_set_id: int  # the set with max e1RM; the earliest one on ties
+
+
+class DailyRollup(RollupBase, table=True):
+    pass
+
+
+class WeeklyRollup(RollupBase, table=True):
+    pass
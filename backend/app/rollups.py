@@ -0,0 +1,287 @@
+"""Per-exercise daily and weekly rollups of the set history.
+
+``dailyrollup`` and ``weeklyrollup`` hold, per (exercise_id, bucket), the set
+count, reps, tonnage, top set, max e1RM and the id of the best-e1RM set.
+Maxima cannot be decremented, so writes do not patch rows: they collect the
+(exercise, day) buckets they touch and ``refresh_days`` recomputes just those
+days from the raw sets, then their weeks from the days. Everything runs in the
+caller's transaction.
+
+Rebuild a date range (or everything) with:
+
+    python -m app.rollups [--since 2024-01-01] [--until 2025-01-01]
+"""
+
+import argparse
+import sys
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Date, DateTime, and_, bindparam, case, delete, func, insert, select, tuple_
+from sqlalchemy.engine import Connection
+
+from .aggregates import total_load_expr
+from .archive import archived_daily_rollups
+from .models import DailyRollup, Exercise, SetEntry, WeeklyRollup, WorkoutSession
+
+Bucket = Tuple[int, date]  # (exercise_id, day)
+
+_CHUNK = 500
+# Up to this many buckets are refreshed one at a time with the prebuilt
+# statements below; more go through the chunked IN-list path.
+_FEW = 16
+_COLUMNS = (
+    "exercise_id",
+    "bucket",
+    "sets",
+    "reps",
+    "tonnage_kg",
+    "top_set_kg",
+    "max_e1rm_kg",
+    "best_set_id",
+)
+
+
+def _day(column):
+    return func.date(column, type_=Date)
+
+
+def _week(column):
+    # Monday of the ISO week, as main._bucket_expr("week")
+    return func.date(column, "weekday 0", "-6 days", type_=Date)
+
+
+def monday(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def _daily_select(*where):
+    load = total_load_expr()
+    # Same arithmetic as main.epley_1rm, so ties and maxima agree with the raw path.
+    e1rm = load * (1.0 + SetEntry.reps / 30.0)
+    day = _day(SetEntry.created_at)
+    ranked = (
+        select(
+            SetEntry.exercise_id,
+            day.label("bucket"),
+            SetEntry.id,
+            SetEntry.reps,
+            load.label("load"),
+            e1rm.label("e1rm"),
+            func.row_number()
+            .over(
+                partition_by=(SetEntry.exercise_id, day),
+                order_by=(e1rm.desc(), SetEntry.created_at, SetEntry.id),
+            )
+            .label("rank"),
+        )
+        .join(Exercise, Exercise.id == SetEntry.exercise_id, isouter=True)
+        .join(WorkoutSession, WorkoutSession.id == SetEntry.session_id, isouter=True)
+        .where(*where)
+        .subquery()
+    )
+    return select(
+        ranked.c.exercise_id,
+        ranked.c.bucket,
+        func.count(),
+        func.sum(ranked.c.reps),
+        func.sum(ranked.c.load * ranked.c.reps),
+        func.max(ranked.c.load),
+        func.max(ranked.c.e1rm),
+        func.max(case((ranked.c.rank == 1, ranked.c.id))),
+    ).group_by(ranked.c.exercise_id, ranked.c.bucket)
+
+
+def _weekly_select(*where):
+    week = _week(DailyRollup.bucket)
+    ranked = (
+        select(
+            DailyRollup,
+            week.label("week"),
+            func.row_number()
+            .over(
+                partition_by=(DailyRollup.exercise_id, week),
+                order_by=(DailyRollup.max_e1rm_kg.desc(), DailyRollup.bucket),
+            )
+            .label("rank"),
+        )
+        .where(*where)
+        .subquery()
+    )
+    return select(
+        ranked.c.exercise_id,
+        ranked.c.week,
+        func.sum(ranked.c.sets),
+        func.sum(ranked.c.reps),
+        func.sum(ranked.c.tonnage_kg),
+        func.max(ranked.c.top_set_kg),
+        func.max(ranked.c.max_e1rm_kg),
+        func.max(case((ranked.c.rank == 1, ranked.c.best_set_id))),
+    ).group_by(ranked.c.exercise_id, ranked.c.week)
+
+
+def affected_days(conn: Connection, *where) -> Set[Bucket]:
+    """(exercise_id, day) buckets of the sets matching `where`."""
+    stmt = select(SetEntry.exercise_id, _day(SetEntry.created_at)).where(*where).distinct()
+    return {(ex_id, day) for ex_id, day in conn.execute(stmt)}
+
+
+def days_of_entries(conn: Connection, entry_ids: Iterable[int]) -> Set[Bucket]:
+    ids: List[int] = list(entry_ids)
+    days: Set[Bucket] = set()
+    for start in range(0, len(ids), _CHUNK):
+        days |= affected_days(conn, SetEntry.id.in_(ids[start : start + _CHUNK]))
+    return days
+
+
+def _refresh_chunk(conn: Connection, days: List[Bucket]) -> None:
+    exercise_ids = {ex_id for ex_id, _ in days}
+    first = min(day for _, day in days)
+    last = max(day for _, day in days)
+    # The range terms let SQLite use ix_setentry_exercise_id_created_at.
+    sets_in_days = and_(
+        SetEntry.exercise_id.in_(exercise_ids),
+        SetEntry.created_at >= datetime.combine(first, time.min),
+        SetEntry.created_at < datetime.combine(last + timedelta(days=1), time.min),
+        tuple_(SetEntry.exercise_id, _day(SetEntry.created_at)).in_(days),
+    )
+    conn.execute(
+        delete(DailyRollup).where(tuple_(DailyRollup.exercise_id, DailyRollup.bucket).in_(days))
+    )
+    conn.execute(insert(DailyRollup).from_select(_COLUMNS, _daily_select(sets_in_days)))
+
+    weeks = list({(ex_id, monday(day)) for ex_id, day in days})
+    conn.execute(
+        delete(WeeklyRollup).where(tuple_(WeeklyRollup.exercise_id, WeeklyRollup.bucket).in_(weeks))
+    )
+    days_in_weeks = and_(
+        DailyRollup.exercise_id.in_(exercise_ids),
+        DailyRollup.bucket >= monday(first),
+        DailyRollup.bucket < monday(last) + timedelta(days=7),
+        tuple_(DailyRollup.exercise_id, _week(DailyRollup.bucket)).in_(weeks),
+    )
+    conn.execute(insert(WeeklyRollup).from_select(_COLUMNS, _weekly_select(days_in_weeks)))
+
+
+# Single-bucket refreshes, built once: a single-set write touches one day and
+# one week, and building and cache-keying the windowed selects per call costs
+# several times more than running them.
+_ex = bindparam("exercise_id")
+_DAY_STATEMENTS = (
+    delete(DailyRollup).where(
+        DailyRollup.exercise_id == _ex, DailyRollup.bucket == bindparam("day", type_=Date)
+    ),
+    insert(DailyRollup).from_select(
+        _COLUMNS,
+        _daily_select(
+            SetEntry.exercise_id == _ex,
+            SetEntry.created_at >= bindparam("start", type_=DateTime),
+            SetEntry.created_at < bindparam("end", type_=DateTime),
+        ),
+    ),
+)
+_WEEK_STATEMENTS = (
+    delete(WeeklyRollup).where(
+        WeeklyRollup.exercise_id == _ex, WeeklyRollup.bucket == bindparam("week", type_=Date)
+    ),
+    insert(WeeklyRollup).from_select(
+        _COLUMNS,
+        _weekly_select(
+            DailyRollup.exercise_id == _ex,
+            DailyRollup.bucket >= bindparam("week", type_=Date),
+            DailyRollup.bucket < bindparam("week_end", type_=Date),
+        ),
+    ),
+)
+
+
+def _refresh_few(conn: Connection, days: List[Bucket]) -> None:
+    for ex_id, day in days:
+        start = datetime.combine(day, time.min)
+        params = {
+            "exercise_id": ex_id,
+            "day": day,
+            "start": start,
+            "end": start + timedelta(days=1),
+        }
+        for stmt in _DAY_STATEMENTS:
+            conn.execute(stmt, params)
+    for ex_id, week in sorted({(ex_id, monday(day)) for ex_id, day in days}):
+        params = {"exercise_id": ex_id, "week": week, "week_end": week + timedelta(days=7)}
+        for stmt in _WEEK_STATEMENTS:
+            conn.execute(stmt, params)
+
+
+def refresh_days(conn: Connection, days: Iterable[Bucket]) -> None:
+    """Recompute the daily rollups for `days` and the weekly rollups containing them."""
+    days = sorted(set(days))
+    if len(days) <= _FEW:
+        _refresh_few(conn, days)
+        return
+    for start in range(0, len(days), _CHUNK):
+        _refresh_chunk(conn, days[start : start + _CHUNK])
+
+
+def reset_rollups(conn: Connection) -> None:
+    conn.execute(delete(DailyRollup))
+    conn.execute(delete(WeeklyRollup))
+
+
+def rebuild_rollups(
+    conn: Connection, since: Optional[date] = None, until: Optional[date] = None
+) -> None:
+    """Recompute every bucket in [since, until), or all of them.
+
+    Days before the archive horizon are recomputed from the archive segments,
+    as ``rebuild_totals`` does, so both follow catalog and bodyweight changes.
+    """
+    sets_where, daily_where, weekly_where = [], [], []
+    if since is not None:
+        sets_where.append(SetEntry.created_at >= datetime.combine(since, time.min))
+        daily_where.append(DailyRollup.bucket >= since)
+        # Whole weeks: the days before `since` in the first week are still valid.
+        weekly_where.append(WeeklyRollup.bucket >= monday(since))
+    if until is not None:
+        sets_where.append(SetEntry.created_at < datetime.combine(until, time.min))
+        daily_where.append(DailyRollup.bucket < until)
+        weekly_where.append(WeeklyRollup.bucket < until)
+
+    conn.execute(delete(DailyRollup).where(*daily_where))
+    conn.execute(insert(DailyRollup).from_select(_COLUMNS, _daily_select(*sets_where)))
+    archived = archived_daily_rollups(conn, since, until)
+    if archived:
+        conn.execute(insert(DailyRollup), archived)
+    conn.execute(delete(WeeklyRollup).where(*weekly_where))
+    week = _week(DailyRollup.bucket)
+    days_where = []
+    if since is not None:
+        days_where.append(week >= monday(since))
+    if until is not None:
+        days_where.append(week < until)
+    conn.execute(insert(WeeklyRollup).from_select(_COLUMNS, _weekly_select(*days_where)))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild the daily and weekly rollups.")
+    parser.add_argument("--since", type=date.fromisoformat, help="first day to rebuild")
+    parser.add_argument("--until", type=date.fromisoformat, help="day after the last one")
+    args = parser.parse_args(argv)
+
+    from sqlmodel import Session
+
+    from .dataversion import bump_data_version
+    from .db import engine, init_db
+
+    init_db()
+    with Session(engine) as db:
+        conn = db.connection()
+        rebuild_rollups(conn, args.since, args.until)
+        days = conn.execute(select(func.count()).select_from(DailyRollup)).scalar()
+        bump_data_version(db)
+        db.commit()
+    print(f"Rebuilt rollups; {days} exercise-days stored")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
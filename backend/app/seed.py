@@ -1,5 +1,16 @@
-from sqlmodel import Session, select
-from .models import Exercise
+import hashlib
+import json
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session
+
+from .aggregates import rebuild_totals
+from .catalog import mark_catalog_changed
+from .dataversion import bump_data_version
+from .models import AppMeta, Exercise
+from .rollups import rebuild_rollups
+
+SEED_FINGERPRINT_KEY = "seed_exercises_fingerprint"
 
 PRESET_EXERCISES = [
     # LEGS
@@ -151,32 +162,50 @@ PRESET_EXERCISES = [
 ]
 
 
-def seed_exercises(db: Session) -> None:
-    existing = {e.name: e for e in db.exec(select(Exercise)).all()}
+def catalog_fingerprint() -> str:
+    payload = json.dumps(PRESET_EXERCISES, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def seed_exercises(db: Session, force: bool = False) -> bool:
+    """Upsert PRESET_EXERCISES unless this exact catalog was already applied.
+
+    Returns True when the catalog was written. Totals and rollups depend on
+    uses_bodyweight and are recomputed in the same transaction.
+    """
+    fingerprint = catalog_fingerprint()
+    stored = db.get(AppMeta, SEED_FINGERPRINT_KEY)
+    if not force and stored is not None and stored.value == fingerprint:
+        return False
 
-    for ex in PRESET_EXERCISES:
-        name = ex["name"]
-        row = existing.get(name)
-        if row:
-            updated = False
-            if row.uses_bodyweight != ex["uses_bodyweight"]:
-                row.uses_bodyweight = ex["uses_bodyweight"]
-                updated = True
-            if (row.body_part or "") != ex["body_part"]:
-                row.body_part = ex["body_part"]
-                updated = True
-            if (row.sub_part or "") != ex["sub_part"]:
-                row.sub_part = ex["sub_part"]
-                updated = True
-            if updated:
-                db.add(row)
-        else:
-            db.add(
-                Exercise(
-                    name=name,
-                    uses_bodyweight=ex["uses_bodyweight"],
-                    body_part=ex["body_part"],
-                    sub_part=ex["sub_part"],
-                )
-            )
+    stmt = insert(Exercise)
+    db.exec(
+        stmt.on_conflict_do_update(
+            index_elements=[Exercise.name],
+            set_={
+                "uses_bodyweight": stmt.excluded.uses_bodyweight,
+                "body_part": stmt.excluded.body_part,
+                "sub_part": stmt.excluded.sub_part,
+            },
+        ),
+        params=[
+            {
+                "name": ex["name"],
+                "uses_bodyweight": ex["uses_bodyweight"],
+                "body_part": ex["body_part"],
+                "sub_part": ex["sub_part"],
+            }
+            for ex in PRESET_EXERCISES
+        ],
+    )
+    if stored is None:
+        stored = AppMeta(key=SEED_FINGERPRINT_KEY, value=fingerprint)
+    stored.value = fingerprint
+    db.add(stored)
+    conn = db.connection()
+    rebuild_totals(conn)
+    rebuild_rollups(conn)
+    mark_catalog_changed(db)
+    bump_data_version(db)
     db.commit()
+    return True
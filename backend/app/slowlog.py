@@ -0,0 +1,125 @@
+"""Opt-in slow-query log.
+
+With ``SLOW_QUERY_MS`` set, every statement that takes at least that long is
+recorded with its parameters, duration, the route that ran it and SQLite's
+``EXPLAIN QUERY PLAN``. Entries are appended as JSON lines to a rotating file
+(``SLOW_QUERY_LOG``, default ``slow_queries.log`` next to the database) and the
+most recent ones are served at ``/admin/slow-queries``.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Deque, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .metrics import current_route
+
+RECENT_LIMIT = 200
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+logger = logging.getLogger("app.slow_queries")
+logger.propagate = False
+
+_lock = threading.Lock()
+_recent: Deque[dict] = deque(maxlen=RECENT_LIMIT)
+threshold_s: Optional[float] = None
+log_path: Optional[str] = None
+
+
+def configure(threshold_ms: Optional[float], path: Optional[str] = None) -> None:
+    """Enable logging at `threshold_ms` (None disables) and point the file at `path`."""
+    global threshold_s, log_path
+    threshold_s = None if threshold_ms is None else threshold_ms / 1000
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    log_path = path if threshold_s is not None else None
+    if log_path:
+        handler = RotatingFileHandler(log_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+
+def recent(limit: int = RECENT_LIMIT) -> List[dict]:
+    """Most recent slow statements, newest first."""
+    with _lock:
+        return list(reversed(_recent))[:limit]
+
+
+def clear() -> None:
+    with _lock:
+        _recent.clear()
+
+
+def _explain(conn, statement: str, parameters) -> Optional[List[str]]:
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    try:
+        # Straight on the DBAPI connection so the EXPLAIN is not itself timed or logged.
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            return [row[-1] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    except Exception as e:  # the plan is best-effort; never fail the request over it
+        return [f"unavailable: {e}"]
+
+
+def _jsonable(value):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    return str(value)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the context rather than the connection: it is dropped even if the statement fails.
+    if context is not None:
+        context._slowlog_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_slowlog_started", None)
+    if threshold_s is None or started is None:
+        return
+    elapsed = time.perf_counter() - started
+    if elapsed < threshold_s:
+        return
+    if executemany:
+        rows = len(parameters)
+        parameters = parameters[0] if parameters else ()
+    else:
+        rows = 1
+    entry = {
+        "at": datetime.utcnow().isoformat(timespec="milliseconds"),
+        "duration_ms": round(elapsed * 1000, 3),
+        "route": current_route(),
+        "statement": statement,
+        "parameters": _jsonable(parameters),
+        "executemany_rows": rows if executemany else None,
+        "plan": _explain(conn, statement, parameters),
+    }
+    with _lock:
+        _recent.append(entry)
+    logger.info(json.dumps(entry))
+
+
+def instrument_engine(engine: Engine) -> None:
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,231 @@
+"""Time every API endpoint against synthetic histories of increasing size.
+
+    cd backend
+    python -m benchmarks.bench_endpoints                       # 1k and 100k sets
+    python -m benchmarks.bench_endpoints --sizes 1k,100k,1m
+    python -m benchmarks.bench_endpoints --update-baseline     # record new baselines
+
+Each timing is the median of --repeat requests after one warm-up. Every GET is
+also timed once with the catalog, archive and data-version caches cleared, as
+after a restart, under "<name> (cold)". With a baseline
+file, any endpoint slower than baseline * --threshold (and by more than
+--min-delta-ms) is reported and the exit status is 1, so it can gate CI.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from fastapi.testclient import TestClient
+
+from .synthetic import HistorySpec, generate_history
+
+BASELINE_PATH = Path(__file__).with_name("baselines.json")
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+
+@contextmanager
+def app_client(db_path: str) -> Iterator[TestClient]:
+    """Fresh app bound to db_path (same reload dance as tests/conftest.py)."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("DATABASE_PROFILE", "sdcard-safe")
+
+    import app.dataversion as dataversion
+    import app.db as db
+    import app.main as main
+
+    importlib.reload(db)
+    importlib.reload(main)
+    dataversion.invalidate_data_version()
+    with TestClient(main.app) as client:
+        yield client
+
+
+def _import_csv(rows: int) -> str:
+    """A Strong export of `rows` sets, all after the synthetic history ends."""
+    start = datetime(2026, 2, 1, 18, 0)
+    lines = [
+        "Date;Workout Name;Duration;Exercise Name;Set Order;Weight;Reps;Distance;Seconds;Notes"
+    ]
+    for i in range(rows):
+        started_at = start + timedelta(days=i // 20)
+        lines.append(
+            f"{started_at:%Y-%m-%d %H:%M:%S};Legs;1h;Back Squat;{i % 20 + 1};"
+            f"{100 + i % 5 * 2.5};5;0;0;"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def _request_plan(client: TestClient) -> List[Tuple[str, Callable[[], object]]]:
+    exercises = client.get("/exercises").json()
+    squat = next(e for e in exercises if e["name"] == "Back Squat")
+    chinup = next(e for e in exercises if e["name"] == "Chin-Up")
+    latest = client.get("/sessions", params={"limit": 1}).json()[0]
+    client.post(
+        "/goals",
+        json={"type": "pr", "exercise_id": squat["id"], "target_weight_kg": 140, "target_reps": 5},
+    )
+    client.post("/goals", json={"type": "frequency", "target_sessions_per_week": 4})
+    cursor = client.get("/changes").json()["cursor"]
+    import_body = _import_csv(1000)
+
+    def write_cycle():
+        s = client.post("/sessions/start", json={"bodyweight_kg": 80}).json()
+        entry = client.post(
+            f"/sessions/{s['id']}/entries",
+            json={"exercise_id": squat["id"], "weight_kg": 100, "reps": 5},
+        ).json()
+        client.post(f"/sessions/{s['id']}/bodyweight", json={"bodyweight_kg": 80.5})
+        client.delete(f"/entries/{entry['id']}")
+        client.post(f"/sessions/{s['id']}/end")
+        client.delete(f"/sessions/{s['id']}")
+
+    def get(path: str, **params):
+        return lambda: client.get(path, params=params).content
+
+    return [
+        ("GET /exercises", get("/exercises")),
+        ("GET /sessions", get("/sessions")),
+        ("GET /sessions?limit=20", get("/sessions", limit=20)),
+        ("GET /sessions/{id}", get(f"/sessions/{latest['id']}")),
+        ("GET /sessions/{id}/entries", get(f"/sessions/{latest['id']}/entries")),
+        ("GET /progress/summary", get("/progress/summary")),
+        ("GET /progress/exercise/{id}", get(f"/progress/exercise/{chinup['id']}")),
+        (
+            "GET /progress/exercise/{id}?max_points=200",
+            get(f"/progress/exercise/{chinup['id']}", max_points=200),
+        ),
+        ("GET /goals", get("/goals")),
+        ("GET /goals/summary", get("/goals/summary")),
+        ("GET /goals/progress", get("/goals/progress")),
+        ("GET /bodyweight", get("/bodyweight")),
+        ("GET /heatmap/entries", get("/heatmap/entries")),
+        ("GET /heatmap?bucket=day", get("/heatmap", bucket="day")),
+        ("GET /heatmap?bucket=week", get("/heatmap", bucket="week")),
+        ("GET /heatmap?bucket=month", get("/heatmap", bucket="month")),
+        ("GET /changes?since={cursor}", get("/changes", since=cursor)),
+        ("GET /export", get("/export")),
+        # The warm-up inserts the sets; the timed runs re-import them as duplicates.
+        (
+            "POST /import (1k rows, already imported)",
+            lambda: client.post("/import", content=import_body).content,
+        ),
+        ("GET /analytics/volume", get("/analytics/volume")),
+        ("GET /analytics/workload", get("/analytics/workload")),
+        ("GET /analytics/e1rm-trends", get("/analytics/e1rm-trends")),
+        ("write cycle (start/add/bodyweight/delete/end/delete)", write_cycle),
+    ]
+
+
+def _median_seconds(fn: Callable[[], object], repeat: int) -> float:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def _clear_caches() -> None:
+    from app import archive, catalog, dataversion
+
+    catalog.invalidate_catalog()
+    archive.invalidate_archive()
+    dataversion.invalidate_data_version()
+
+
+def _cold_seconds(fn: Callable[[], object]) -> float:
+    _clear_caches()
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def run_size(label: str, total_sets: int, repeat: int) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory(prefix="ft_bench_") as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        with app_client(db_path) as client:
+            import app.db as db
+
+            started = time.perf_counter()
+            generate_history(db.engine, HistorySpec(total_sets=total_sets))
+            print(
+                f"[{label}] generated {total_sets} sets in {time.perf_counter() - started:.1f}s",
+                file=sys.stderr,
+            )
+            timings = {}
+            for name, fn in _request_plan(client):
+                if name.startswith("GET "):
+                    timings[f"{name} (cold)"] = _cold_seconds(fn)
+                timings[name] = _median_seconds(fn, repeat)
+            return timings
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+    min_delta_s: float,
+) -> List[str]:
+    regressions = []
+    for label, timings in results.items():
+        for name, seconds in timings.items():
+            base = baseline.get(label, {}).get(name)
+            if base is None:
+                continue
+            if seconds > base * threshold and seconds - base > min_delta_s:
+                regressions.append(
+                    f"[{label}] {name}: {seconds * 1000:.1f}ms vs baseline {base * 1000:.1f}ms"
+                )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1k,100k", help=f"comma-separated: {','.join(SIZES)}")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=1.5)
+    parser.add_argument("--min-delta-ms", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    labels = [s.strip().lower() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in labels if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+
+    results = {label: run_size(label, SIZES[label], args.repeat) for label in labels}
+    for label, timings in results.items():
+        print(f"\n{label} sets")
+        for name, seconds in timings.items():
+            print(f"  {name:<56}{seconds * 1000:>10.1f}ms")
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if args.update_baseline:
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms / 1000)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold}x baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Compare the validated response_model path with fast_json for the big list endpoints.
+
+cd backend && python -m benchmarks.bench_serialization --rows 20000
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+
+from app.main import EntryOut, HeatmapEntry, ProgressPoint, epley_1rm, fast_json
+
+
+def _rows(n: int):
+    start = datetime(2024, 1, 1, 18, 0, 0, 123456)
+    for i in range(n):
+        weight = 20.0 + (i % 80) * 2.5
+        reps = 1 + i % 12
+        yield i + 1, i // 20 + 1, i % 40 + 1, weight, reps, start + timedelta(minutes=3 * i)
+
+
+SHAPES = {
+    "/sessions/{id}/entries": (
+        EntryOut,
+        lambda r: {
+            "id": r[0],
+            "session_id": r[1],
+            "exercise_id": r[2],
+            "exercise_name": "Back Squat",
+            "weight_kg": r[3],
+            "reps": r[4],
+            "created_at": r[5],
+            "total_kg": r[3],
+        },
+    ),
+    "/progress/exercise/{id}": (
+        ProgressPoint,
+        lambda r: {
+            "date": r[5],
+            "weight_kg": r[3],
+            "total_kg": r[3],
+            "reps": r[4],
+            "e1rm": epley_1rm(r[3], r[4]),
+        },
+    ),
+    "/heatmap/entries": (
+        HeatmapEntry,
+        lambda r: {
+            "id": r[0],
+            "session_id": r[1],
+            "exercise_id": r[2],
+            "weight_kg": r[3],
+            "reps": r[4],
+            "created_at": r[5],
+            "total_kg": r[3],
+        },
+    ),
+}
+
+
+def _best_of(repeat: int, fn: Callable[[], bytes]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(rows: int, repeat: int) -> List[dict]:
+    tuples = list(_rows(rows))
+    results = []
+    for endpoint, (model, to_dict) in SHAPES.items():
+        adapter = TypeAdapter(List[model])
+
+        def validated():
+            # What FastAPI does with a list of models: build, validate, dump, json.dumps.
+            objs = [model(**to_dict(r)) for r in tuples]
+            value = adapter.validate_python(objs)
+            return json.dumps(
+                adapter.dump_python(value, mode="json"), separators=(",", ":")
+            ).encode()
+
+        def fast():
+            return fast_json([to_dict(r) for r in tuples]).body
+
+        assert json.loads(validated()) == json.loads(fast())
+        slow_s, fast_s = _best_of(repeat, validated), _best_of(repeat, fast)
+        results.append(
+            {
+                "endpoint": endpoint,
+                "validated_s": slow_s,
+                "fast_s": fast_s,
+                "speedup": slow_s / fast_s,
+            }
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{args.rows} rows, best of {args.repeat}")
+    print(f"{'endpoint':<26}{'validated':>12}{'fast':>12}{'speedup':>10}")
+    for r in run(args.rows, args.repeat):
+        print(
+            f"{r['endpoint']:<26}{r['validated_s'] * 1000:>10.1f}ms"
+            f"{r['fast_s'] * 1000:>10.1f}ms{r['speedup']:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,7 @@ def client():
     fd, path = tempfile.mkstemp(prefix="ft_test_", suffix=".db")
     os.close(fd)
     os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ["DATABASE_PROFILE"] = "test"
 
     import app.db as db
     import app.main as main
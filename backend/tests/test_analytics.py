@@ -0,0 +1,95 @@
+from datetime import datetime
+from types import MappingProxyType
+
+import numpy as np
+import pytest
+
+from app.analytics import SetHistory, e1rm_trends, epoch_seconds, weekly_volume, workload
+from app.catalog import Catalog, ExerciseInfo
+
+SQUAT = ExerciseInfo(1, "Back Squat", False, "legs", "compound")
+CHINUP = ExerciseInfo(2, "Chin-Up", True, "back", "lats")
+CATALOG = Catalog(MappingProxyType({1: SQUAT, 2: CHINUP}), (SQUAT, CHINUP))
+
+
+def _history(rows):
+    ts, ex, weight, reps, bw = zip(*rows)
+    return SetHistory(
+        np.array([epoch_seconds(t) for t in ts], dtype=np.int64),
+        np.array(ex, dtype=np.int64),
+        np.array(weight, dtype=float),
+        np.array(reps, dtype=np.int64),
+        np.array(bw, dtype=float),
+    )
+
+
+def test_weekly_volume_groups_by_monday_and_body_part():
+    h = _history(
+        [
+            (datetime(2025, 3, 3, 9), 1, 100.0, 5, 80.0),  # Monday
+            (datetime(2025, 3, 9, 23), 1, 100.0, 5, 80.0),  # Sunday, same week
+            (datetime(2025, 3, 4, 9), 2, 10.0, 8, 80.0),  # bodyweight added
+            (datetime(2025, 3, 10, 9), 1, 50.0, 10, 0.0),  # next week
+            (datetime(2025, 3, 10, 9), 99, 50.0, 10, 0.0),  # exercise not in catalog
+        ]
+    )
+    assert weekly_volume(h, CATALOG) == [
+        {
+            "week": datetime(2025, 3, 3).date(),
+            "body_part": "back",
+            "sets": 1,
+            "reps": 8,
+            "tonnage_kg": 720.0,
+        },
+        {
+            "week": datetime(2025, 3, 3).date(),
+            "body_part": "legs",
+            "sets": 2,
+            "reps": 10,
+            "tonnage_kg": 1000.0,
+        },
+        {
+            "week": datetime(2025, 3, 10).date(),
+            "body_part": "legs",
+            "sets": 1,
+            "reps": 10,
+            "tonnage_kg": 500.0,
+        },
+    ]
+
+
+def test_workload_rolling_means_and_ratio():
+    h = _history(
+        [
+            (datetime(2025, 1, 1, 9), 1, 100.0, 1, 0.0),
+            (datetime(2025, 1, 3, 9), 1, 200.0, 1, 0.0),
+        ]
+    )
+    days = workload(h, CATALOG, acute_days=2, chronic_days=3)
+    assert [d["load_kg"] for d in days] == [100.0, 0.0, 200.0]
+    assert [d["acute_kg"] for d in days] == [50.0, 50.0, 100.0]
+    assert [d["chronic_kg"] for d in days] == pytest.approx([100 / 3, 100 / 3, 100.0])
+    assert days[-1]["ratio"] == pytest.approx(1.0)
+
+    tail = workload(h, CATALOG, 2, 3, since=datetime(2025, 1, 2), until=datetime(2025, 1, 3))
+    assert [d["date"] for d in tail] == [datetime(2025, 1, 2).date()]
+    assert tail[0]["chronic_kg"] == pytest.approx(100 / 3)
+
+
+def test_e1rm_trend_slope_uses_best_set_per_day():
+    h = _history(
+        [
+            (datetime(2025, 1, 6, 9), 1, 100.0, 0, 0.0),
+            (datetime(2025, 1, 6, 10), 1, 90.0, 0, 0.0),  # not the day's best
+            (datetime(2025, 1, 13, 9), 1, 102.0, 0, 0.0),
+            (datetime(2025, 1, 20, 9), 1, 104.0, 0, 0.0),
+            (datetime(2025, 1, 20, 9), 2, 0.0, 30, 80.0),
+        ]
+    )
+    squat, chinup = e1rm_trends(h, CATALOG)
+    assert squat["days"] == 3
+    assert squat["slope_kg_per_week"] == pytest.approx(2.0)
+    assert squat["latest_e1rm_kg"] == 104.0
+    assert squat["best_e1rm_kg"] == 104.0
+    assert chinup["slope_kg_per_week"] is None
+    assert chinup["latest_e1rm_kg"] == pytest.approx(160.0)
@@ -1,3 +1,6 @@
+import json
+from datetime import datetime, timedelta
+
 import pytest
 
 
@@ -23,6 +26,7 @@ def test_session_entries_and_progress(client):
         json={"exercise_id": squat["id"], "weight_kg": 100, "reps": 3},
     )
     assert res.status_code == 200
+    assert set(res.json()) == {"id", "session_id", "exercise_id", "weight_kg", "reps", "created_at"}
 
     entries = client.get(f"/sessions/{session_id}/entries").json()
     assert len(entries) == 2
@@ -259,3 +263,1018 @@ def test_empty_database_states(client):
     # Get entries for a valid session with no entries
     entries = client.get(f"/sessions/{session['id']}/entries").json()
     assert entries == []
+
+
+def test_heatmap_buckets_aggregate_by_body_part(client):
+    exercises = client.get("/exercises").json()
+    chinup = next(e for e in exercises if e["name"] == "Chin-Up")
+    squat = next(e for e in exercises if e["name"] == "Back Squat")
+
+    session_id = client.post("/sessions/start", json={"bodyweight_kg": 80}).json()["id"]
+    for payload in (
+        {"exercise_id": chinup["id"], "weight_kg": 0, "reps": 5},
+        {"exercise_id": chinup["id"], "weight_kg": 10, "reps": 3},
+        {"exercise_id": squat["id"], "weight_kg": 100, "reps": 5},
+    ):
+        client.post(f"/sessions/{session_id}/entries", json=payload)
+
+    res = client.get("/heatmap", params={"bucket": "day"})
+    assert res.status_code == 200
+    rows = {(r["body_part"], r["sub_part"]): r for r in res.json()}
+    assert len(rows) == 2
+
+    back = rows[("back", "compound")]
+    assert back["sets"] == 2
+    assert back["reps"] == 8
+    # Bodyweight is added for chin-ups: 80 * 5 + 90 * 3
+    assert back["tonnage_kg"] == pytest.approx(670.0)
+    assert rows[("legs", "compound")]["tonnage_kg"] == pytest.approx(500.0)
+
+    assert len(client.get("/heatmap", params={"bucket": "month"}).json()) == 2
+    assert client.get("/heatmap", params={"from": "2999-01-01T00:00:00"}).json() == []
+    assert client.get("/heatmap", params={"bucket": "year"}).status_code == 400
+
+
+def test_progress_summary_returns_latest_set_per_exercise(client):
+    exercises = client.get("/exercises").json()
+    chinup = next(e for e in exercises if e["name"] == "Chin-Up")
+    squat = next(e for e in exercises if e["name"] == "Back Squat")
+
+    session_id = client.post("/sessions/start", json={"bodyweight_kg": 80}).json()["id"]
+    for payload in (
+        {"exercise_id": squat["id"], "weight_kg": 100, "reps": 5},
+        {"exercise_id": chinup["id"], "weight_kg": 5, "reps": 8},
+        {"exercise_id": squat["id"], "weight_kg": 110, "reps": 3},
+    ):
+        client.post(f"/sessions/{session_id}/entries", json=payload)
+
+    summary = client.get("/progress/summary").json()
+    assert len(summary) == 2
+    by_exercise = {p["exercise_id"]: p for p in summary}
+    assert by_exercise[squat["id"]]["weight_kg"] == 110
+    assert by_exercise[squat["id"]]["total_kg"] == 110
+    assert by_exercise[chinup["id"]]["total_kg"] == pytest.approx(85.0)
+
+
+def test_exercise_progress_range_filters(client):
+    exercises = client.get("/exercises").json()
+    chinup = next(e for e in exercises if e["name"] == "Chin-Up")
+
+    session_id = client.post("/sessions/start", json={"bodyweight_kg": 80}).json()["id"]
+    for weight in (0, 5, 10):
+        client.post(
+            f"/sessions/{session_id}/entries",
+            json={"exercise_id": chinup["id"], "weight_kg": weight, "reps": 5},
+        )
+
+    points = client.get(f"/progress/exercise/{chinup['id']}").json()
+    assert [p["total_kg"] for p in points] == [80, 85, 90]
+
+    latest = client.get(f"/progress/exercise/{chinup['id']}", params={"limit": 2}).json()
+    assert [p["weight_kg"] for p in latest] == [5, 10]
+
+    future = client.get(
+        f"/progress/exercise/{chinup['id']}", params={"since": "2999-01-01T00:00:00"}
+    ).json()
+    assert future == []
+    past = client.get(
+        f"/progress/exercise/{chinup['id']}", params={"until": "2000-01-01T00:00:00"}
+    ).json()
+    assert past == []
+
+    res = client.get(f"/progress/exercise/{chinup['id']}", params={"limit": 0})
+    assert res.status_code == 422
+
+
+def test_exercise_progress_downsampling_keeps_prs(client):
+    exercises = client.get("/exercises").json()
+    squat = next(e for e in exercises if e["name"] == "Back Squat")
+
+    session_id = client.post("/sessions/start").json()["id"]
+    weights = [60, 80, 100, 90, 70, 120, 100, 80, 60, 40, 50, 60]
+    for weight in weights:
+        client.post(
+            f"/sessions/{session_id}/entries",
+            json={"exercise_id": squat["id"], "weight_kg": weight, "reps": 5},
+        )
+
+    url = f"/progress/exercise/{squat['id']}"
+    daily = client.get(url, params={"resolution": "day"}).json()
+    assert [p["weight_kg"] for p in daily] == [120]
+
+    thinned = client.get(url, params={"max_points": 5}).json()
+    thinned_weights = [p["weight_kg"] for p in thinned]
+    for pr in (60, 80, 100, 120):
+        assert pr in thinned_weights
+    assert len(thinned) <= 5
+
+    # Every set a PR: the PRs themselves are thinned to stay within max_points.
+    for weight in range(130, 190, 5):
+        client.post(
+            f"/sessions/{session_id}/entries",
+            json={"exercise_id": squat["id"], "weight_kg": weight, "reps": 5},
+        )
+    thinned = client.get(url, params={"max_points": 5}).json()
+    assert len(thinned) == 5
+    assert thinned[0]["weight_kg"] == 60 and thinned[-1]["weight_kg"] == 185
+
+    assert client.get(url, params={"resolution": "year"}).status_code == 400
+
+
+def test_goals_progress_evaluates_all_goals(client):
+    exercises = client.get("/exercises").json()
+    squat = next(e for e in exercises if e["name"] == "Back Squat")
+    chinup = next(e for e in exercises if e["name"] == "Chin-Up")
+
+    session_id = client.post("/sessions/start", json={"bodyweight_kg": 80}).json()["id"]
+    for payload in (
+        {"exercise_id": squat["id"], "weight_kg": 120, "reps": 1},
+        {"exercise_id": squat["id"], "weight_kg": 100, "reps": 5},
+        {"exercise_id": squat["id"], "weight_kg": 90, "reps": 8},
+        {"exercise_id": chinup["id"], "weight_kg": 10, "reps": 3},
+    ):
+        client.post(f"/sessions/{session_id}/entries", json=payload)
+
+    squat_goal = client.post(
+        "/goals",
+        json={"type": "pr", "exercise_id": squat["id"], "target_weight_kg": 125, "target_reps": 5},
+    ).json()
+    chinup_goal = client.post(
+        "/goals",
+        json={"type": "pr", "exercise_id": chinup["id"], "target_weight_kg": 100, "target_reps": 5},
+    ).json()
+    freq_goal = client.post(
+        "/goals", json={"type": "frequency", "target_sessions_per_week": 4}
+    ).json()
+
+    res = client.get("/goals/progress", params={"weeks": 4})
+    assert res.status_code == 200
+    progress = {p["goal_id"]: p for p in res.json()}
+    assert len(progress) == 3
+
+    squat_progress = progress[squat_goal["id"]]
+    assert squat_progress["has_match"] is True
+    assert squat_progress["best_weight_kg"] == 100
+    assert squat_progress["best_reps"] == 5
+    assert squat_progress["percent"] == pytest.approx(0.8)
+
+    # No chin-up set reaches 5 reps, so fall back to the heaviest set (with bodyweight)
+    chinup_progress = progress[chinup_goal["id"]]
+    assert chinup_progress["has_match"] is False
+    assert chinup_progress["best_total_kg"] == pytest.approx(90.0)
+
+    freq_progress = progress[freq_goal["id"]]
+    assert freq_progress["sessions_last_7_days"] == 1
+    assert freq_progress["percent"] == pytest.approx(0.25)
+    assert len(freq_progress["weekly_sessions"]) == 4
+    assert freq_progress["weekly_sessions"][-1]["sessions"] == 1
+
+
+def test_sessions_keyset_pagination_and_set_counts(client):
+    exercises = client.get("/exercises").json()
+    squat = next(e for e in exercises if e["name"] == "Back Squat")
+
+    ids = [client.post("/sessions/start").json()["id"] for _ in range(5)]
+    for _ in range(3):
+        client.post(
+            f"/sessions/{ids[0]}/entries",
+            json={"exercise_id": squat["id"], "weight_kg": 100, "reps": 5},
+        )
+
+    first = client.get("/sessions", params={"limit": 2}).json()
+    assert [s["id"] for s in first] == [ids[4], ids[3]]
+
+    seen = [s["id"] for s in first]
+    cursor = f"{first[-1]['started_at']},{first[-1]['id']}"
+    while True:
+        page = client.get("/sessions", params={"limit": 2, "before": cursor}).json()
+        if not page:
+            break
+        seen.extend(s["id"] for s in page)
+        cursor = f"{page[-1]['started_at']},{page[-1]['id']}"
+    assert seen == list(reversed(ids))
+
+    all_sessions = {s["id"]: s for s in client.get("/sessions").json()}
+    assert all_sessions[ids[0]]["sets"] == 3
+    assert all_sessions[ids[1]]["sets"] == 0
+
+    assert client.get("/sessions", params={"before": "garbage"}).status_code == 400
+
+
+def test_storage_profile_applied_to_connections(client):
+    from app import db
+
+    settings = db.storage_settings()
+    assert db.DATABASE_PROFILE == "test"
+    assert settings["journal_mode"] == "memory"
+    assert settings["busy_timeout"] == 1000
+    assert settings["synchronous"] == 0
+
+
+def test_seed_skipped_when_catalog_unchanged(client):
+    from sqlmodel import Session, select
+
+    from app import db, seed
+    from app.aggregates import rebuild_totals
+    from app.models import AppMeta, Exercise
+    from app.rollups import rebuild_rollups
+
+    session_id = client.post("/sessions/start", json={"bodyweight_kg": 80}).json()["id"]
+    chinup_id = next(e["id"] for e in client.get("/exercises").json() if e["name"] == "Chin-Up")
+    client.post(
+        f"/sessions/{session_id}/entries",
+        json={"exercise_id": chinup_id, "weight_kg": 10, "reps": 5},
+    )
+    assert client.get("/goals/summary").json()["avg_load_kg"] == pytest.approx(90.0)
+
+    with Session(db.engine) as session:
+        assert seed.seed_exercises(session) is False
+
+        squat = session.exec(select(Exercise).where(Exercise.name == "Back Squat")).one()
+        squat.body_part = "other"
+        session.add(squat)
+        # An older catalog without bodyweight for chin-ups, with totals to match.
+        session.get(Exercise, chinup_id).uses_bodyweight = False
+        session.flush()
+        rebuild_totals(session.connection())
+        rebuild_rollups(session.connection())
+        meta = session.get(AppMeta, seed.SEED_FINGERPRINT_KEY)
+        meta.value = "stale"
+        session.add(meta)
+        session.commit()
+        assert client.get("/goals/summary").json()["avg_load_kg"] == pytest.approx(10.0)
+
+        assert seed.seed_exercises(session) is True
+        session.refresh(squat)
+        assert squat.body_part == "legs"
+        assert client.get("/goals/summary").json()["avg_load_kg"] == pytest.approx(90.0)
+        names = set(session.exec(select(Exercise.name)).all())
+        assert {ex["name"] for ex in seed.PRESET_EXERCISES} <= names
+
+    timings = client.get("/admin/startup").json()
+    assert {"imports_s", "init_db_s", "seed_s"} <= set(timings)
+
+
+def test_conditional_get_uses_data_version(client):
+    res = client.get("/sessions")
+    etag = res.headers["ETag"]
+    assert etag.startswith("W/")
+
+    res = client.get("/progress/summary", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.content == b""
+
+    client.post("/sessions/start", json={"bodyweight_kg": 80})
+    res = client.get("/sessions", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+    assert len(res.json()) == 1
+
+    # Time-dependent responses are never validated
+    assert "ETag" not in client.get("/goals/progress").headers
+
+
+def test_if_none_match_uses_weak_comparison():
+    from app.dataversion import etag_matches
+
+    etag = 'W/"12"'
+    assert etag_matches('W/"12"', etag)
+    assert etag_matches('"12"', etag)
+    assert etag_matches('"3", W/"12" ,"4"', etag)
+    assert etag_matches(" * ", etag)
+    assert not etag_matches('W/"123"', etag)
+    assert not etag_matches('W/"1"', etag)
+    assert not etag_matches('W/"1", "2"', etag)
+    assert not etag_matches("12", etag)
+    assert not etag_matches("", etag)
+
+
+def test_cache_misses_are_loaded_off_the_event_loop(client, monkeypatch):
+    import asyncio
+
+    from app import archive, main
+    from app.catalog import invalidate_catalog
+    from app.dataversion import invalidate_data_version
+
+    session_id = client.post("/sessions/start").json()["id"]
+    loads = []
+
+    def probe(load):
+        def wrapper(*args):
+            try:
+                asyncio.get_running_loop()
+                loads.append((load.__name__, "event loop"))
+            except RuntimeError:
+                loads.append((load.__name__, "thread"))
+            return load(*args)
+
+        return wrapper
+
+    monkeypatch.setattr(main, "current_data_version", probe(main.current_data_version))
+    monkeypatch.setattr(main, "get_catalog", probe(main.get_catalog))
+    monkeypatch.setattr(archive, "get_archive", probe(archive.get_archive))
+    invalidate_data_version()
+    invalidate_catalog()
+    archive.invalidate_archive()
+
+    assert client.get(f"/sessions/{session_id}/entries").status_code == 200
+    assert client.get("/progress/summary").status_code == 200
+    assert sorted(set(loads)) == [
+        ("current_data_version", "thread"),
+        ("get_archive", "thread"),
+        ("get_catalog", "thread"),
+    ]
+
+
+def test_batch_entries_are_idempotent(client):
+    exercises = client.get("/exercises").json()
+    squat = next(e for e in exercises if e["name"] == "Back Squat")
+    session_id = client.post("/sessions/start").json()["id"]
+
+    batch = {
+        "entries": [
+            {
+                "exercise_id": squat["id"],
+                "weight_kg": 100,
+                "reps": 5,
+                "idempotency_key": f"set-{i}",
+                "created_at": f"2026-10-0{i + 1}T10:00:00",
+            }
+            for i in range(3)
+        ]
+    }
+    res = client.post(f"/sessions/{session_id}/entries/batch", json=batch)
+    assert res.status_code == 200
+    assert res.json() == {"inserted": 3, "duplicates": 0}
+
+    # A retried flush with one new set only stores the new one
+    batch["entries"].append(
+        {"exercise_id": squat["id"], "weight_kg": 105, "reps": 3, "idempotency_key": "set-3"}
+    )
+    res = client.post(f"/sessions/{session_id}/entries/batch", json=batch)
+    assert res.json() == {"inserted": 1, "duplicates": 3}
+
+    entries = client.get(f"/sessions/{session_id}/entries").json()
+    assert len(entries) == 4
+    assert entries[-1]["created_at"].startswith("2026-10-01")
+
+    bad = {"entries": [{"exercise_id": 99999, "weight_kg": 1, "reps": 1, "idempotency_key": "x"}]}
+    res = client.post(f"/sessions/{session_id}/entries/batch", json=bad)
+    assert res.status_code == 404
+    assert len(client.get(f"/sessions/{session_id}/entries").json()) == 4
+
+
+def test_export_streams_history(client):
+    import csv
+    import io
+    import json
+
+    exercises = client.get("/exercises").json()
+    chinup = next(e for e in exercises if e["name"] == "Chin-Up")
+    session_id = client.post("/sessions/start", json={"bodyweight_kg": 80}).json()["id"]
+    client.post(
+        f"/sessions/{session_id}/entries",
+        json={"exercise_id": chinup["id"], "weight_kg": 10, "reps": 5},
+    )
+    client.post("/goals", json={"type": "frequency", "target_sessions_per_week": 3})
+
+    res = client.get("/export")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in res.text.splitlines()]
+    assert [r["type"] for r in records] == ["session", "set", "bodyweight", "goal"]
+    assert records[1]["exercise_name"] == "Chin-Up"
+    assert records[1]["total_kg"] == pytest.approx(90.0)
+
+    res = client.get("/export", params={"format": "csv"})
+    rows = list(csv.DictReader(io.StringIO(res.text)))
+    assert len(rows) == 4
+    assert rows[1]["type"] == "set"
+    assert float(rows[1]["total_kg"]) == pytest.approx(90.0)
+
+    assert client.get("/export", params={"format": "xml"}).status_code == 400
+
+
+def test_export_lines_are_sent_in_chunks():
+    import json
+
+    from app import main
+
+    records = [{"type": "set", "id": i, "exercise_name": "Back Squat"} for i in range(5000)]
+    for lines in (main._ndjson_lines(records), main._csv_lines(records)):
+        chunks = list(lines)
+        assert 1 < len(chunks) < 10
+        assert all(len(c) >= main.EXPORT_CHUNK_SIZE for c in chunks[:-1])
+    body = b"".join(main._ndjson_lines(records))
+    assert [json.loads(line)["id"] for line in body.splitlines()] == list(range(5000))
+
+
+STRONG_CSV = """Date;Workout Name;Duration;Exercise Name;Set Order;Weight;Reps;Distance;Seconds;Notes
+2024-01-02 18:00:00;Legs;1h 5m;Squat (Barbell);1;100;5;0;0;
+2024-01-02 18:00:00;Legs;1h 5m;Squat (Barbell);2;110;3;0;0;
+2024-01-02 18:00:00;Legs;1h 5m;Running;1;0;0;5;1800;
+2024-01-04 18:00:00;Pull;45m;Chin-Up;1;0;8;0;0;
+"""
+
+HEVY_CSV = """title,start_time,end_time,exercise_title,set_index,set_type,weight_lbs,reps
+Push,"5 Jan 2024, 18:00","5 Jan 2024, 19:00",Bench Press (Barbell),0,normal,225,5
+"""
+
+
+def test_import_strong_and_hevy_csv(client):
+    res = client.post("/import", content=STRONG_CSV, headers={"Content-Type": "text/csv"})
+    assert res.status_code == 200
+    result = res.json()
+    assert result["rows"] == 4
+    assert result["skipped"] == 1
+    assert result["inserted"] == 3
+    assert result["sessions_created"] == 2
+    # Chin-Up matches the seeded catalog; the squat is created
+    assert result["exercises_created"] == 1
+
+    again = client.post("/import", content=STRONG_CSV).json()
+    assert again["inserted"] == 0
+    assert again["duplicates"] == 3
+    assert again["sessions_created"] == 0
+
+    sessions = client.get("/sessions").json()
+    assert [s["sets"] for s in sessions] == [1, 2]
+    assert all(s["ended_at"] for s in sessions)
+
+    res = client.post("/import", params={"source": "hevy"}, content=HEVY_CSV).json()
+    assert res["inserted"] == 1
+    bench = next(e for e in client.get("/exercises").json() if e["name"] == "Bench Press (Barbell)")
+    points = client.get(f"/progress/exercise/{bench['id']}").json()
+    assert points[0]["weight_kg"] == pytest.approx(102.058, abs=0.01)
+    assert client.get("/goals/summary").json()["total_sets"] == 4
+
+    res = client.post("/import", content="a,b,c\n1,2,3\n")
+    assert res.status_code == 400
+    res = client.post("/import", params={"source": "hevy"}, content=STRONG_CSV)
+    assert res.status_code == 400
+    assert "exercise_title" in res.json()["detail"]
+
+
+def test_import_rejects_bad_values_and_encoding(client):
+    bad_weight = STRONG_CSV.replace(";100;5;", ";abc;5;")
+    res = client.post("/import", content=bad_weight)
+    assert res.status_code == 400
+    assert res.json()["detail"].startswith("Line ")
+    assert "abc" in res.json()["detail"]
+
+    bad_date = STRONG_CSV.replace("2024-01-04 18:00:00", "yesterday")
+    res = client.post("/import", content=bad_date)
+    assert res.status_code == 400
+    assert "yesterday" in res.json()["detail"]
+
+    res = client.post("/import", content=STRONG_CSV.encode("utf-8") + b"\xff\xfe;;\n")
+    assert res.status_code == 400
+    assert "UTF-8" in res.json()["detail"]
+
+
+def _metric(text, name, **labels):
+    wanted = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    prefix = f"{name}{{{wanted}}} " if labels else f"{name} "
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line[len(prefix) :])
+    return 0.0
+
+
+def test_metrics_by_route_template(client):
+    before = client.get("/metrics").text
+    s1 = client.post("/sessions/start").json()
+    s2 = client.post("/sessions/start").json()
+    client.get(f"/sessions/{s1['id']}")
+    client.get(f"/sessions/{s2['id']}")
+    client.get("/no-such-page")
+
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    assert "ETag" not in res.headers
+    text = res.text
+
+    route = {"method": "GET", "route": "/sessions/{session_id}"}
+    counted = _metric(text, "http_requests_total", **route, status="200")
+    assert counted - _metric(before, "http_requests_total", **route, status="200") == 2
+    assert _metric(text, "http_request_duration_seconds_count", **route) >= 2
+    assert _metric(text, "http_response_size_bytes_sum", **route) > 0
+    assert _metric(text, "http_request_sql_statements_sum", **route) >= 2
+    assert _metric(text, "http_requests_total", method="GET", route="unmatched", status="404") >= 1
+    assert _metric(text, "db_statements_total") > 0
+    # /metrics itself is still in flight while it renders
+    assert _metric(text, "http_requests_in_flight") == 1
+    assert 'le="+Inf"' in text
+
+
+def test_slow_query_log_captures_plan_and_route(client, tmp_path):
+    from app import slowlog
+
+    assert client.get("/admin/slow-queries").json()["enabled"] is False
+    log_file = tmp_path / "slow.log"
+    slowlog.configure(0, str(log_file))
+    try:
+        client.delete("/admin/slow-queries")
+        client.get("/sessions")
+        body = client.get("/admin/slow-queries").json()
+    finally:
+        slowlog.configure(None)
+        slowlog.clear()
+
+    assert body["enabled"] is True
+    assert body["threshold_ms"] == 0
+    entry = next(q for q in body["queries"] if "FROM workoutsession" in q["statement"])
+    assert entry["route"] == "GET /sessions"
+    assert entry["duration_ms"] >= 0
+    assert isinstance(entry["parameters"], list)
+    assert any("workoutsession" in step for step in entry["plan"])
+    logged = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert any(q["route"] == "GET /sessions" for q in logged)
+
+
+def test_failed_statements_leave_no_timing_state_on_the_connection(client):
+    from sqlalchemy import text
+    from sqlalchemy.exc import IntegrityError
+
+    from app import db
+
+    with db.engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(IntegrityError):
+                conn.execute(text("INSERT INTO exercise (id, name) SELECT id, name FROM exercise"))
+            conn.rollback()
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+        assert not [key for key in conn.info if key.endswith("_started")]
+
+
+def test_exercise_catalog_cache_hits_and_invalidation(client):
+    client.get("/exercises")
+    before = client.get("/metrics").text
+    names = {e["name"] for e in client.get("/exercises").json()}
+    client.get("/progress/summary")
+    after = client.get("/metrics").text
+
+    def lookups(text, result):
+        return _metric(text, "catalog_cache_lookups_total", result=result)
+
+    assert lookups(after, "hit") - lookups(before, "hit") == 2
+    assert lookups(after, "miss") == lookups(before, "miss")
+
+    csv_text = (
+        "Date,Workout Name,Duration,Exercise Name,Set Order,Weight,Reps\n"
+        "2025-03-01 09:00:00,Legs,1h,Catalog Cache Lunge,1,20,10\n"
+    )
+    assert client.post("/import", content=csv_text).json()["exercises_created"] == 1
+    refreshed = {e["name"] for e in client.get("/exercises").json()}
+    assert refreshed - names == {"Catalog Cache Lunge"}
+    assert lookups(client.get("/metrics").text, "miss") == lookups(after, "miss") + 1
+
+
+def test_analytics_endpoints(client):
+    exercises = client.get("/exercises").json()
+    squat = next(e for e in exercises if e["name"] == "Back Squat")
+    chinup = next(e for e in exercises if e["name"] == "Chin-Up")
+    assert client.get("/analytics/volume").json() == []
+
+    s = client.post("/sessions/start", json={"bodyweight_kg": 80}).json()
+    client.post(
+        f"/sessions/{s['id']}/entries",
+        json={"exercise_id": squat["id"], "weight_kg": 100, "reps": 5},
+    )
+    client.post(
+        f"/sessions/{s['id']}/entries",
+        json={"exercise_id": chinup["id"], "weight_kg": 10, "reps": 8},
+    )
+
+    volume = client.get("/analytics/volume").json()
+    heatmap = client.get("/heatmap", params={"bucket": "week"}).json()
+    by_part = {}
+    for b in heatmap:
+        by_part[b["body_part"]] = by_part.get(b["body_part"], 0) + b["tonnage_kg"]
+    assert {v["body_part"]: v["tonnage_kg"] for v in volume} == by_part
+    assert by_part[chinup["body_part"]] == pytest.approx(90 * 8)
+
+    days = client.get("/analytics/workload").json()
+    assert len(days) == 1
+    assert days[0]["load_kg"] == pytest.approx(500 + 720)
+    assert days[0]["acute_kg"] == pytest.approx((500 + 720) / 7)
+    assert client.get("/analytics/workload", params={"acute_days": 28}).status_code == 400
+
+    trends = {t["exercise_id"]: t for t in client.get("/analytics/e1rm-trends").json()}
+    assert trends[chinup["id"]]["latest_e1rm_kg"] == pytest.approx(90 * (1 + 8 / 30))
+    assert trends[squat["id"]]["slope_kg_per_week"] is None
+
+
+def test_caches_notice_commits_from_other_processes(client):
+    from sqlalchemy.dialects.sqlite import insert
+
+    from app import db
+    from app.appmeta import increment_meta
+    from app.catalog import VERSION_KEY
+    from app.dataversion import DATA_VERSION_KEY
+    from app.models import Exercise
+
+    res = client.get("/exercises")
+    etag = res.headers["ETag"]
+    assert client.get("/exercises", headers={"If-None-Match": etag}).status_code == 304
+
+    # A bare connection commits without the Session hooks, like a CLI in another process.
+    with db.engine.begin() as conn:
+        conn.execute(insert(Exercise).values(name="Zercher Squat"))
+        increment_meta(conn, VERSION_KEY)
+        increment_meta(conn, DATA_VERSION_KEY)
+
+    res = client.get("/exercises", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+    assert "Zercher Squat" in [e["name"] for e in res.json()]
+
+
+def test_machine_exercises_are_not_chinups(client):
+    from app import db
+    from app.aggregates import read_totals, rebuild_totals
+    from app.archive import archived_totals
+
+    exercises = client.get("/exercises").json()
+    names = {e["name"]: e["id"] for e in exercises}
+    session_id = client.post("/sessions/start", json={"bodyweight_kg": 80}).json()["id"]
+    for name, reps in (("Machine Pec Fly", 12), ("Machine Reverse Fly", 10), ("Chin-Up", 8)):
+        client.post(
+            f"/sessions/{session_id}/entries",
+            json={"exercise_id": names[name], "weight_kg": 20, "reps": reps},
+        )
+
+    summary = client.get("/goals/summary").json()
+    assert (summary["chinup_sets"], summary["chinup_reps"]) == (1, 8)
+    with db.engine.begin() as conn:
+        rebuild_totals(conn)
+        totals = read_totals(conn)
+        assert archived_totals(conn) == (0, 0.0, 0, 0)
+    assert (totals.chinup_sets, totals.chinup_reps) == (1, 8)
+
+
+def test_goals_summary_running_totals_follow_every_write(client):
+    from app import db
+    from app.aggregates import read_totals, rebuild_totals
+
+    exercises = client.get("/exercises").json()
+    squat = next(e for e in exercises if e["name"] == "Back Squat")
+    chinup = next(e for e in exercises if e["name"] == "Chin-Up")
+
+    s1 = client.post("/sessions/start", json={"bodyweight_kg": 80}).json()
+    client.post(
+        f"/sessions/{s1['id']}/entries",
+        json={"exercise_id": squat["id"], "weight_kg": 100, "reps": 5},
+    )
+    doomed = client.post(
+        f"/sessions/{s1['id']}/entries",
+        json={"exercise_id": squat["id"], "weight_kg": 60, "reps": 5},
+    ).json()
+    batch = {
+        "entries": [
+            {"exercise_id": chinup["id"], "weight_kg": 10, "reps": 8, "idempotency_key": "t-1"},
+            {"exercise_id": chinup["id"], "weight_kg": 0, "reps": 6, "idempotency_key": "t-2"},
+        ]
+    }
+    client.post(f"/sessions/{s1['id']}/entries/batch", json=batch)
+    client.post(f"/sessions/{s1['id']}/entries/batch", json=batch)  # replay adds nothing
+    client.post(f"/sessions/{s1['id']}/bodyweight", json={"bodyweight_kg": 82})
+    client.delete(f"/entries/{doomed['id']}")
+
+    s2 = client.post("/sessions/start").json()
+    client.post(
+        f"/sessions/{s2['id']}/entries",
+        json={"exercise_id": chinup["id"], "weight_kg": 5, "reps": 3},
+    )
+    client.delete(f"/sessions/{s2['id']}")
+
+    summary = client.get("/goals/summary").json()
+    assert summary == {
+        "chinup_reps": 14,
+        "chinup_sets": 2,
+        "avg_load_kg": pytest.approx((100 + 92 + 82) / 3),
+        "total_sets": 3,
+    }
+
+    with db.engine.begin() as conn:
+        incremental = read_totals(conn)
+        rebuild_totals(conn)
+        rebuilt = read_totals(conn)
+    assert rebuilt.total_sets == incremental.total_sets
+    assert rebuilt.chinup_reps == incremental.chinup_reps
+    assert rebuilt.total_load_kg == pytest.approx(incremental.total_load_kg)
+
+    client.post("/admin/reset")
+    assert client.get("/goals/summary").json()["total_sets"] == 0
+
+
+# 0 sends every write through the chunked IN-list refresh instead of the per-bucket one.
+@pytest.mark.parametrize("few_buckets", [None, 0])
+def test_rollups_follow_writes_and_match_raw_sets(client, monkeypatch, few_buckets):
+    from sqlalchemy import select
+
+    from app import db, rollups
+    from app.models import DailyRollup, WeeklyRollup
+    from app.rollups import rebuild_rollups
+
+    if few_buckets is not None:
+        monkeypatch.setattr(rollups, "_FEW", few_buckets)
+
+    exercises = client.get("/exercises").json()
+    squat = next(e for e in exercises if e["name"] == "Back Squat")
+    chinup = next(e for e in exercises if e["name"] == "Chin-Up")
+
+    s = client.post("/sessions/start", json={"bodyweight_kg": 80}).json()
+    day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    batch = [
+        {
+            "exercise_id": squat["id"],
+            "weight_kg": w,
+            "reps": 5,
+            "idempotency_key": f"r-{i}",
+            "created_at": (day - timedelta(days=d)).isoformat(),
+        }
+        for i, (w, d) in enumerate([(100, 0), (110, 0), (90, 1), (120, 9)])
+    ]
+    client.post(f"/sessions/{s['id']}/entries/batch", json={"entries": batch})
+    chin = client.post(
+        f"/sessions/{s['id']}/entries",
+        json={"exercise_id": chinup["id"], "weight_kg": 10, "reps": 8},
+    ).json()
+    client.post(f"/sessions/{s['id']}/bodyweight", json={"bodyweight_kg": 82})
+    client.delete(f"/entries/{chin['id']}")
+
+    def stored():
+        with db.engine.connect() as conn:
+            return [
+                [tuple(r) for r in conn.execute(select(t).order_by(t.exercise_id, t.bucket))]
+                for t in (DailyRollup, WeeklyRollup)
+            ]
+
+    daily, weekly = stored()
+    # (sets, tonnage, top set) per day; the deleted chin-up leaves no row behind
+    assert [(r[2], r[4], r[5]) for r in daily] == [
+        (1, 600.0, 120.0),
+        (1, 450.0, 90.0),
+        (2, 1050.0, 110.0),
+    ]
+    assert sum(r[2] for r in weekly) == 4
+
+    incremental = stored()
+    with db.engine.begin() as conn:
+        rebuild_rollups(conn, since=(day - timedelta(days=1)).date())
+    assert stored() == incremental
+    with db.engine.begin() as conn:
+        rebuild_rollups(conn)
+    assert stored() == incremental
+
+    for bucket in ("day", "week", "month"):
+        from_rollups = client.get("/heatmap", params={"bucket": bucket}).json()
+        raw = client.get("/heatmap", params={"bucket": bucket, "from": "2000-01-01T00:00:01"})
+        assert from_rollups == raw.json()
+    for resolution in ("day", "week"):
+        params = {"resolution": resolution}
+        from_rollups = client.get(f"/progress/exercise/{squat['id']}", params=params).json()
+        raw = client.get(f"/progress/exercise/{squat['id']}", params={**params, "limit": 1000})
+        assert from_rollups == raw.json()
+    assert [p["weight_kg"] for p in from_rollups][-1] == 110
+
+    client.delete(f"/sessions/{s['id']}")
+    assert stored() == [[], []]
+
+
+def test_archive_moves_old_sets_and_reads_stay_the_same(client, tmp_path, monkeypatch):
+    from sqlalchemy import func, select
+
+    from app import archive, db
+    from app.aggregates import read_totals, rebuild_totals
+    from app.models import DailyRollup, SetEntry, WeeklyRollup
+    from app.rollups import rebuild_rollups
+
+    previous_dir = archive.archive_dir
+    archive.configure(str(tmp_path))
+    try:
+        exercises = client.get("/exercises").json()
+        squat = next(e for e in exercises if e["name"] == "Back Squat")
+        chinup = next(e for e in exercises if e["name"] == "Chin-Up")
+        old = client.post("/sessions/start", json={"bodyweight_kg": 80}).json()
+        new = client.post("/sessions/start").json()
+        now = datetime.utcnow()
+        batch = [
+            {
+                "exercise_id": ex["id"],
+                "weight_kg": w,
+                "reps": 5,
+                "idempotency_key": f"a-{i}",
+                "created_at": (now - timedelta(days=d, minutes=i)).isoformat(),
+            }
+            for i, (ex, w, d) in enumerate(
+                [(squat, 100, 400), (squat, 110, 400), (chinup, 10, 60), (squat, 90, 3)]
+            )
+        ]
+        client.post(f"/sessions/{old['id']}/entries/batch", json={"entries": batch[:3]})
+        client.post(f"/sessions/{new['id']}/entries/batch", json={"entries": batch[3:]})
+        client.post(
+            "/goals",
+            json={
+                "type": "pr",
+                "exercise_id": squat["id"],
+                "target_weight_kg": 120,
+                "target_reps": 5,
+            },
+        )
+        archived_id = client.get(f"/sessions/{old['id']}/entries").json()[0]["id"]
+        unaligned = (now - timedelta(days=500)).replace(hour=12, minute=34).isoformat()
+
+        reads = [
+            "/export",
+            "/heatmap/entries",
+            "/sessions",
+            f"/sessions/{old['id']}/entries",
+            f"/progress/exercise/{squat['id']}",
+            f"/progress/exercise/{squat['id']}?limit=2",
+            f"/progress/exercise/{squat['id']}?resolution=day",
+            "/analytics/volume",
+            "/analytics/e1rm-trends",
+            "/goals/summary",
+            "/goals/progress",
+            "/progress/summary",
+            "/heatmap?bucket=week",
+            f"/heatmap?from={unaligned}&bucket=week",
+            f"/heatmap?from={unaligned}&bucket=day",
+        ]
+        before = [client.get(path).content for path in reads]
+
+        # Left behind by a run that never committed: ignored, then cleaned up.
+        (tmp_path / "sets-29991231").mkdir()
+        monkeypatch.setattr(archive, "ARCHIVE_BATCH_SIZE", 2)
+        res = client.post("/admin/archive", params={"older_than_days": 30})
+        assert res.status_code == 200
+        assert res.json()["archived"] == 3
+        assert sorted(p.name for p in tmp_path.iterdir()) == [res.json()["segment"]]
+        assert sorted(p.name for p in (tmp_path / res.json()["segment"]).iterdir()) == sorted(
+            f"{name}.npy" for name, _ in archive.COLUMNS
+        )
+        with db.engine.connect() as conn:
+            assert conn.execute(select(func.count()).select_from(SetEntry)).scalar() == 1
+        status = client.get("/admin/archive").json()
+        assert (status["segments"], status["sets"]) == (1, 3)
+
+        assert [client.get(path).content for path in reads] == before
+
+        # A replayed batch of archived sets is still recognised by its keys.
+        res = client.post(f"/sessions/{old['id']}/entries/batch", json={"entries": batch[:3]})
+        assert res.json() == {"inserted": 0, "duplicates": 3}
+
+        # Archived history is read-only.
+        late = {**batch[0], "idempotency_key": "a-late"}
+        res = client.post(f"/sessions/{new['id']}/entries/batch", json={"entries": [late]})
+        assert res.status_code == 400
+        res = client.post(f"/sessions/{old['id']}/bodyweight", json={"bodyweight_kg": 90})
+        assert res.status_code == 400
+        assert client.delete(f"/sessions/{old['id']}").status_code == 400
+        res = client.delete(f"/entries/{archived_id}")
+        assert (res.status_code, res.json()["detail"]) == (400, "Entry is archived")
+        imported = client.post("/import", content=STRONG_CSV).json()
+        assert (imported["inserted"], imported["duplicates"], imported["archived"]) == (0, 0, 3)
+
+        def derived():
+            with db.engine.connect() as conn:
+                rows = [conn.execute(select(t)).all() for t in (DailyRollup, WeeklyRollup)]
+                return read_totals(conn), sorted(rows[0]), sorted(rows[1])
+
+        stored = derived()
+        with db.engine.begin() as conn:
+            rebuild_totals(conn)
+            rebuild_rollups(conn)
+        assert derived() == stored
+
+        client.post("/admin/reset")
+        assert list(tmp_path.iterdir()) == []
+        assert client.get("/admin/archive").json()["horizon"] is None
+    finally:
+        archive.configure(previous_dir)
+
+
+def test_changes_replays_upserts_and_deletes_since_cursor(client):
+    from app import changes, db
+
+    start = client.get("/changes").json()
+    assert start["sets"] == [] and start["deleted"] == {"session": [], "set": [], "goal": []}
+    cursor = start["cursor"]
+
+    exercises = client.get("/exercises").json()
+    chinup = next(e for e in exercises if e["name"] == "Chin-Up")
+    s = client.post("/sessions/start").json()
+    kept = client.post(
+        f"/sessions/{s['id']}/entries",
+        json={"exercise_id": chinup["id"], "weight_kg": 0, "reps": 8},
+    ).json()
+    gone = client.post(
+        f"/sessions/{s['id']}/entries",
+        json={"exercise_id": chinup["id"], "weight_kg": 0, "reps": 6},
+    ).json()
+    client.delete(f"/entries/{gone['id']}")
+    client.post(f"/sessions/{s['id']}/bodyweight", json={"bodyweight_kg": 75})
+    goal = client.post("/goals", json={"type": "frequency", "target_sessions_per_week": 3}).json()
+    client.delete(f"/goals/{goal['id']}")
+
+    delta = client.get("/changes", params={"since": cursor}).json()
+    assert [(x["id"], x["sets"], x["bodyweight_kg"]) for x in delta["sessions"]] == [
+        (s["id"], 1, 75.0)
+    ]
+    assert [(x["id"], x["total_kg"]) for x in delta["sets"]] == [(kept["id"], 75.0)]
+    assert delta["sets"] == client.get(f"/sessions/{s['id']}/entries").json()
+    assert delta["goals"] == []
+    assert delta["deleted"] == {"session": [], "set": [gone["id"]], "goal": [goal["id"]]}
+
+    cursor = delta["cursor"]
+    assert client.get("/changes", params={"since": cursor}).json()["sets"] == []
+    client.delete(f"/sessions/{s['id']}")
+    delta = client.get("/changes", params={"since": cursor}).json()
+    assert delta["deleted"] == {"session": [s["id"]], "set": [kept["id"]], "goal": []}
+    assert delta["cursor"] > cursor
+
+    # Compaction keeps the latest entry per row; expired cursors must reload.
+    with db.engine.begin() as conn:
+        assert changes.compact(conn, retention_days=30) > 0
+    assert client.get("/changes", params={"since": cursor}).json()["deleted"]["set"] == [kept["id"]]
+    with db.engine.begin() as conn:
+        changes.compact(conn, retention_days=0, now=datetime.utcnow() + timedelta(seconds=1))
+    assert client.get("/changes", params={"since": cursor}).status_code == 410
+    latest = client.get("/changes").json()["cursor"]
+    assert latest == delta["cursor"]
+    assert client.get("/changes", params={"since": latest}).status_code == 200
+    assert client.get("/changes", params={"since": latest + 1}).status_code == 410
+
+    client.post("/admin/reset")
+    assert client.get("/changes", params={"since": latest}).status_code == 410
+    assert client.get("/changes").json()["cursor"] > latest
+
+
+def test_session_events_push_changed_rows(client):
+    import threading
+    import time
+
+    from app import live
+
+    exercises = client.get("/exercises").json()
+    squat = next(e for e in exercises if e["name"] == "Back Squat")
+    s = client.post("/sessions/start").json()
+    other = client.post("/sessions/start").json()
+    assert client.get("/sessions/999999/events").status_code == 404
+
+    received = {}
+    listener = threading.Thread(
+        target=lambda: received.update(res=client.get(f"/sessions/{s['id']}/events"))
+    )
+    listener.start()
+    deadline = time.monotonic() + 5
+    while not live.subscriber_count(s["id"]) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert live.subscriber_count(s["id"]) == 1
+
+    entry = client.post(
+        f"/sessions/{s['id']}/entries",
+        json={"exercise_id": squat["id"], "weight_kg": 100, "reps": 5},
+    ).json()
+    client.post(
+        f"/sessions/{s['id']}/entries/batch",
+        json={
+            "entries": [
+                {"exercise_id": squat["id"], "weight_kg": 105, "reps": 3, "idempotency_key": "e-1"}
+            ]
+        },
+    )
+    client.post(
+        f"/sessions/{other['id']}/entries",
+        json={"exercise_id": squat["id"], "weight_kg": 60, "reps": 10},
+    )
+    client.delete(f"/entries/{entry['id']}")
+    client.post(f"/sessions/{s['id']}/bodyweight", json={"bodyweight_kg": 80})
+    client.post(f"/sessions/{s['id']}/end")
+    listener.join(timeout=5)
+    assert not listener.is_alive()
+
+    res = received["res"]
+    assert res.headers["content-type"].startswith("text/event-stream")
+    assert "etag" not in res.headers
+    events = []
+    for block in res.text.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    assert [name for name, _ in events] == [
+        "entry_added",
+        "entry_added",
+        "entry_deleted",
+        "bodyweight",
+        "session_ended",
+    ]
+    assert events[0][1]["id"] == entry["id"]
+    assert (events[1][1]["weight_kg"], events[1][1]["exercise_name"]) == (105.0, "Back Squat")
+    assert events[2][1] == {"id": entry["id"], "session_id": s["id"]}
+    assert events[3][1]["bodyweight_kg"] == 80
+    assert events[4][1]["ended_at"] is not None
+    assert live.subscriber_count(s["id"]) == 0
+    assert client.get(f"/sessions/{s['id']}/events").status_code == 400
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from app.downsample import bucket_max, lttb, running_max_indices, week_key
+
+
+def test_lttb_keeps_endpoints_and_peak():
+    xs = list(range(100))
+    ys = [0.0] * 100
+    ys[42] = 10.0
+    keep = lttb(xs, ys, 10)
+    assert len(keep) == 10
+    assert keep[0] == 0 and keep[-1] == 99
+    assert 42 in keep
+    assert keep == sorted(keep)
+
+
+def test_lttb_passthrough_when_under_threshold():
+    assert lttb([1, 2, 3], [1, 2, 3], 10) == [0, 1, 2]
+
+
+def test_bucket_max_and_running_max():
+    keys = ["a", "a", "b", "b", "b", "c"]
+    values = [1, 3, 2, 5, 4, 1]
+    assert bucket_max(keys, values) == [1, 3, 5]
+    assert running_max_indices(values) == [0, 1, 3]
+
+
+def test_week_key_is_monday():
+    assert week_key(datetime(2026, 10, 18, 9, 30)) == datetime(2026, 10, 12).date()
@@ -0,0 +1,46 @@
+from sqlalchemy import event, text
+from sqlmodel import create_engine
+
+from app.migrations import LATEST_VERSION, MIGRATIONS, current_version, migrate
+
+
+def _engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+
+
+def _columns(conn, table):
+    return {r[1] for r in conn.execute(text(f"PRAGMA table_info({table})"))}
+
+
+def test_fresh_database_is_stamped_latest(tmp_path):
+    engine = _engine(tmp_path)
+    assert migrate(engine) == [m.version for m in MIGRATIONS]
+    with engine.connect() as conn:
+        assert current_version(conn) == LATEST_VERSION
+        assert "bodyweight_kg" in _columns(conn, "workoutsession")
+
+
+def test_legacy_database_is_upgraded_once(tmp_path):
+    engine = _engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE exercise (id INTEGER PRIMARY KEY, name TEXT NOT NULL)"))
+        conn.execute(
+            text(
+                "CREATE TABLE workoutsession (id INTEGER PRIMARY KEY, "
+                "started_at DATETIME NOT NULL, ended_at DATETIME)"
+            )
+        )
+        conn.execute(text("INSERT INTO exercise (name) VALUES ('Back Squat')"))
+
+    assert migrate(engine) == [m.version for m in MIGRATIONS]
+    with engine.connect() as conn:
+        assert {"uses_bodyweight", "body_part", "sub_part"} <= _columns(conn, "exercise")
+        assert "bodyweight_kg" in _columns(conn, "workoutsession")
+        assert conn.execute(text("SELECT body_part FROM exercise")).scalar() == "other"
+        indexes = {r[1] for r in conn.execute(text("PRAGMA index_list(setentry)"))}
+        assert "ix_setentry_exercise_id_created_at" in indexes
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert migrate(engine) == []
+    assert len(statements) == 1
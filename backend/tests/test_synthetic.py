@@ -0,0 +1,38 @@
+from sqlalchemy import func
+from sqlmodel import Session, create_engine, select
+
+from app.migrations import migrate
+from app.models import SetEntry, WorkoutSession
+from app.seed import seed_exercises
+from benchmarks.synthetic import HistorySpec, generate_history
+
+
+def _engine(path):
+    engine = create_engine(f"sqlite:///{path}")
+    migrate(engine)
+    with Session(engine) as db:
+        seed_exercises(db)
+    return engine
+
+
+def _rows(engine):
+    with Session(engine) as db:
+        return db.exec(
+            select(
+                SetEntry.exercise_id, SetEntry.weight_kg, SetEntry.reps, SetEntry.created_at
+            ).order_by(SetEntry.id)
+        ).all()
+
+
+def test_generate_history_is_exact_and_deterministic(tmp_path):
+    spec = HistorySpec(total_sets=1234, years=1.0)
+    first, second = _engine(tmp_path / "a.db"), _engine(tmp_path / "b.db")
+
+    assert generate_history(first, spec) == 62
+    generate_history(second, spec)
+
+    with Session(first) as db:
+        assert db.exec(select(func.count()).select_from(SetEntry)).one() == 1234
+        started = db.exec(select(WorkoutSession.started_at).order_by(WorkoutSession.id)).all()
+        assert started == sorted(started)
+    assert _rows(first) == _rows(second)
@@ -23,11 +23,22 @@ export async function controllerPing() {
     }
 }
 
+// path -> { etag, data } for conditional GETs; the server answers 304 while
+// nothing has been written since the cached response.
+const responseCache = new Map();
+
 export async function apiGet(path) {
     controllerPing();
-    const res = await fetch(joinUrl(API_BASE, path));
+    const cached = responseCache.get(path);
+    const headers = cached ? { "If-None-Match": cached.etag } : {};
+    const res = await fetch(joinUrl(API_BASE, path), { headers });
+    if (res.status === 304 && cached) return cached.data;
     if (!res.ok) throw new Error(await res.text());
-    return res.json();
+    const data = await res.json();
+    const etag = res.headers.get("ETag");
+    if (etag) responseCache.set(path, { etag, data });
+    else responseCache.delete(path);
+    return data;
 }
 
 export async function apiPost(path, body) {
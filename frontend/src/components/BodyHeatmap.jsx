@@ -506,12 +506,8 @@ function BodyBackSVG({ heatData, onPartClick, hoveredPart, setHoveredPart }) {
 }
 
 // Calculate heat data from workout entries
-export function calculateHeatData(entries, exercises, timeRange = 30) {
+function emptyHeatMap() {
     const heatMap = {};
-    const now = new Date();
-    const cutoff = new Date(now - timeRange * 24 * 60 * 60 * 1000);
-
-    // Initialize all parts to 0
     const allParts = [
         // Front view parts
         "traps-front",
@@ -539,6 +535,39 @@ export function calculateHeatData(entries, exercises, timeRange = 30) {
         "calves-left-back", "calves-right-back",
     ];
     allParts.forEach(part => heatMap[part] = 0);
+    return heatMap;
+}
+
+// Heat level (0-5) from the number of sets in the time period
+function heatLevelForSets(setCount) {
+    if (setCount === 0) return 0;
+    if (setCount <= 2) return 1;
+    if (setCount <= 4) return 2;
+    if (setCount <= 6) return 3;
+    if (setCount <= 10) return 4;
+    return 5;
+}
+
+// Heat per part from /heatmap rows ({ body_part, sub_part, sets, ... } per time
+// bucket), summed over the buckets the server returned.
+export function calculateHeatFromBuckets(buckets) {
+    const heatMap = emptyHeatMap();
+    const setsByPart = {};
+    buckets.forEach(row => {
+        const key = `${row.body_part?.toLowerCase()}|${row.sub_part?.toLowerCase()}`;
+        setsByPart[key] = (setsByPart[key] || 0) + (row.sets || 0);
+    });
+    Object.entries(setsByPart).forEach(([key, setCount]) => {
+        const [bodyPart, subPart] = key.split("|");
+        applyHeatToParts(heatMap, bodyPart, subPart, heatLevelForSets(setCount));
+    });
+    return heatMap;
+}
+
+export function calculateHeatData(entries, exercises, timeRange = 30) {
+    const heatMap = emptyHeatMap();
+    const now = new Date();
+    const cutoff = new Date(now - timeRange * 24 * 60 * 60 * 1000);
 
     // Group entries by exercise
     const exerciseEntries = {};
@@ -565,16 +594,7 @@ export function calculateHeatData(entries, exercises, timeRange = 30) {
             totalVolume += weight * reps;
         });
 
-        // Normalize volume to heat level (0-5)
-        // Base heat on number of sets in the time period
-        const setCount = recentEntries.length;
-        let heatLevel = 0;
-        if (setCount === 0) heatLevel = 0;
-        else if (setCount <= 2) heatLevel = 1;
-        else if (setCount <= 4) heatLevel = 2;
-        else if (setCount <= 6) heatLevel = 3;
-        else if (setCount <= 10) heatLevel = 4;
-        else heatLevel = 5;
+        const heatLevel = heatLevelForSets(recentEntries.length);
 
         // Map to body parts
         const bodyPart = exercise.body_part?.toLowerCase();
@@ -715,7 +735,10 @@ function HeatLegend() {
 }
 
 // Main Body Heatmap Component
+// Pass `buckets` (rows from /heatmap, already limited to the time range) or raw
+// `entries` with their `exercises`, filtered here to the last `timeRange` days.
 export default function BodyHeatmap({
+    buckets,
     entries = [],
     exercises = [],
     onPartClick,
@@ -725,8 +748,9 @@ export default function BodyHeatmap({
     const [hoveredPart, setHoveredPart] = useState(null);
 
     const heatData = useMemo(() => {
+        if (buckets) return calculateHeatFromBuckets(buckets);
         return calculateHeatData(entries, exercises, timeRange);
-    }, [entries, exercises, timeRange]);
+    }, [buckets, entries, exercises, timeRange]);
 
     return (
         <div style={styles.container}>
@@ -1,7 +1,7 @@
 import React from "react";
 import { describe, expect, it } from "vitest";
 import { render, screen } from "@testing-library/react";
-import BodyHeatmap, { calculateHeatData } from "./BodyHeatmap.jsx";
+import BodyHeatmap, { calculateHeatData, calculateHeatFromBuckets } from "./BodyHeatmap.jsx";
 
 describe("BodyHeatmap", () => {
     it("renders the heatmap title", () => {
@@ -34,4 +34,18 @@ describe("BodyHeatmap", () => {
         expect(heat["quads-right"]).toBeGreaterThan(0);
         expect(heat["abs"]).toBeGreaterThan(0);
     });
+
+    it("sums /heatmap buckets per sub part", () => {
+        const buckets = [
+            { bucket: "2026-09-01", body_part: "legs", sub_part: "quads", sets: 2, reps: 10, tonnage_kg: 1000 },
+            { bucket: "2026-10-01", body_part: "legs", sub_part: "quads", sets: 3, reps: 15, tonnage_kg: 1500 },
+            { bucket: "2026-10-01", body_part: "core", sub_part: "abs", sets: 1, reps: 10, tonnage_kg: 0 },
+        ];
+
+        const heat = calculateHeatFromBuckets(buckets);
+        // 5 sets of quads over both buckets
+        expect(heat["quads-left"]).toBe(3);
+        expect(heat["abs"]).toBe(1);
+        expect(heat["biceps-left"]).toBe(0);
+    });
 });
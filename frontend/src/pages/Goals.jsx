@@ -1,4 +1,4 @@
-import React, { useEffect, useMemo, useState } from "react";
+import React, { useEffect, useState } from "react";
 import { apiDelete, apiGet, apiPost } from "../api.js";
 import { COLORS } from "../theme.js";
 
@@ -6,7 +6,6 @@ export default function Goals() {
     const [exercises, setExercises] = useState([]);
     const [goals, setGoals] = useState([]);
     const [summary, setSummary] = useState(null);
-    const [sessions, setSessions] = useState([]);
     const [err, setErr] = useState("");
 
     const [type, setType] = useState("pr");
@@ -15,30 +14,26 @@ export default function Goals() {
     const [targetReps, setTargetReps] = useState("");
     const [targetFreq, setTargetFreq] = useState("");
 
-    const [prProgress, setPrProgress] = useState({});
+    const [progress, setProgress] = useState({});
 
     useEffect(() => {
         apiGet("/exercises").then(setExercises).catch((e) => setErr(String(e)));
         loadGoals();
         loadSummary();
-        loadSessions();
     }, []);
 
     useEffect(() => {
-        const run = async () => {
-            const next = {};
-            const prGoals = goals.filter((g) => g.type === "pr" && g.exercise_id);
-            for (const g of prGoals) {
-                try {
-                    const points = await apiGet(`/progress/exercise/${g.exercise_id}`);
-                    next[g.id] = computePrProgress(points, g);
-                } catch (e) {
-                    next[g.id] = { percent: 0, best: null, hasMatch: false };
-                }
-            }
-            setPrProgress(next);
-        };
-        if (goals.length) run();
+        if (!goals.length) {
+            setProgress({});
+            return;
+        }
+        apiGet("/goals/progress")
+            .then((rows) => {
+                const next = {};
+                for (const row of rows) next[row.goal_id] = row;
+                setProgress(next);
+            })
+            .catch((e) => setErr(String(e)));
     }, [goals]);
 
     async function loadGoals() {
@@ -59,15 +54,6 @@ export default function Goals() {
         }
     }
 
-    async function loadSessions() {
-        try {
-            const rows = await apiGet("/sessions");
-            setSessions(rows);
-        } catch (e) {
-            setErr(String(e));
-        }
-    }
-
     async function addGoal() {
         setErr("");
         try {
@@ -119,8 +105,6 @@ export default function Goals() {
         }
     }
 
-    const weeklyCount = useMemo(() => countLast7Days(sessions), [sessions]);
-
     return (
         <div style={styles.card}>
             <div style={styles.statsGrid}>
@@ -207,9 +191,9 @@ export default function Goals() {
                             )}
                             <div style={styles.progress}>
                                 {g.type === "pr" ? (
-                                    <PrProgress progress={prProgress[g.id]} goal={g} />
+                                    <PrProgress progress={progress[g.id]} goal={g} />
                                 ) : (
-                                    <FrequencyProgress count={weeklyCount} goal={g} />
+                                    <FrequencyProgress progress={progress[g.id]} goal={g} />
                                 )}
                             </div>
                         </div>
@@ -224,45 +208,28 @@ export default function Goals() {
     );
 }
 
-function computePrProgress(points, goal) {
-    if (!points || points.length === 0) {
-        return { percent: 0, best: null, hasMatch: false };
-    }
-    const targetWeight = Number(goal.target_weight_kg || 0);
-    const targetReps = Number(goal.target_reps || 0);
-    const eligible = points.filter((p) => p.reps >= targetReps);
-    const best = (eligible.length ? eligible : points).reduce((a, b) => (b.total_kg > a.total_kg ? b : a), points[0]);
-    const percent = targetWeight > 0 ? Math.min(1, best.total_kg / targetWeight) : 0;
-    return { percent, best, hasMatch: eligible.length > 0 };
-}
-
-function countLast7Days(sessions) {
-    const cutoff = new Date();
-    cutoff.setDate(cutoff.getDate() - 7);
-    return sessions.filter((s) => new Date(s.started_at) >= cutoff).length;
-}
-
 function exerciseName(exercises, id) {
     const ex = exercises.find((e) => String(e.id) === String(id));
     return ex ? ex.name : "Exercise";
 }
 
 function PrProgress({ progress, goal }) {
-    if (!progress || !progress.best) return <span style={styles.muted}>No sets yet</span>;
+    if (!progress || progress.best_total_kg == null) return <span style={styles.muted}>No sets yet</span>;
     const pct = Math.round(progress.percent * 100);
     return (
         <div>
-            <div style={styles.progressText}>{pct}% • Best {progress.best.total_kg.toFixed(1)} kg × {progress.best.reps}</div>
-            {!progress.hasMatch && (
+            <div style={styles.progressText}>{pct}% • Best {progress.best_total_kg.toFixed(1)} kg × {progress.best_reps}</div>
+            {!progress.has_match && (
                 <div style={styles.hint}>No sets at {goal.target_reps}+ reps yet</div>
             )}
         </div>
     );
 }
 
-function FrequencyProgress({ count, goal }) {
+function FrequencyProgress({ progress, goal }) {
     const target = Number(goal.target_sessions_per_week || 0);
-    const pct = target > 0 ? Math.min(1, count / target) : 0;
+    const count = progress ? progress.sessions_last_7_days : 0;
+    const pct = progress ? progress.percent : 0;
     return (
         <div style={styles.progressText}>
             {Math.round(pct * 100)}% • {count} of {target} sessions (last 7 days)
@@ -2,8 +2,11 @@ import React, { useEffect, useState } from "react";
 import { apiDelete, apiGet, apiPost } from "../api.js";
 import { COLORS } from "../theme.js";
 
+const PAGE_SIZE = 20;
+
 export default function Home({ nav }) {
     const [sessions, setSessions] = useState([]);
+    const [hasMore, setHasMore] = useState(false);
     const [err, setErr] = useState("");
     const [bodyweight, setBodyweight] = useState("");
 
@@ -13,8 +16,22 @@ export default function Home({ nav }) {
 
     async function loadSessions() {
         try {
-            const rows = await apiGet("/sessions");
+            const rows = await apiGet(`/sessions?limit=${PAGE_SIZE}`);
             setSessions(rows);
+            setHasMore(rows.length === PAGE_SIZE);
+        } catch (e) {
+            setErr(String(e));
+        }
+    }
+
+    async function loadMore() {
+        const last = sessions[sessions.length - 1];
+        if (!last) return;
+        try {
+            const before = encodeURIComponent(`${last.started_at},${last.id}`);
+            const rows = await apiGet(`/sessions?limit=${PAGE_SIZE}&before=${before}`);
+            setSessions((prev) => [...prev, ...rows]);
+            setHasMore(rows.length === PAGE_SIZE);
         } catch (e) {
             setErr(String(e));
         }
@@ -94,6 +111,9 @@ export default function Home({ nav }) {
                     ))}
                     {sessions.length === 0 && <div style={styles.empty}>No workouts yet</div>}
                 </div>
+                {hasMore && (
+                    <button style={styles.secondarySmall} onClick={loadMore}>Load more</button>
+                )}
             </div>
 
             <div style={styles.divider} />
@@ -13,6 +13,15 @@ const BODY_PART_LABELS = {
     other: "Other",
 };
 
+const HEATMAP_DAYS = 30;
+
+// Start of the heatmap range at midnight UTC: whole days are answered from the
+// server's rollups instead of the raw sets.
+function heatmapFrom(days) {
+    const from = new Date(Date.now() - days * 24 * 60 * 60 * 1000);
+    return `${from.toISOString().slice(0, 10)}T00:00:00`;
+}
+
 function labelFromKey(key) {
     if (!key) return "Other";
     return key.charAt(0).toUpperCase() + key.slice(1);
@@ -22,13 +31,15 @@ export default function Progress({ nav, exerciseId }) {
     const [exercises, setExercises] = useState([]);
     const [summary, setSummary] = useState([]);
     const [points, setPoints] = useState([]);
-    const [heatmapEntries, setHeatmapEntries] = useState([]);
+    const [heatmapBuckets, setHeatmapBuckets] = useState([]);
     const [err, setErr] = useState("");
 
     useEffect(() => {
         apiGet("/exercises").then(setExercises).catch((e) => setErr(String(e)));
         apiGet("/progress/summary").then(setSummary).catch((e) => setErr(String(e)));
-        apiGet("/heatmap/entries").then(setHeatmapEntries).catch((e) => setErr(String(e)));
+        apiGet(`/heatmap?from=${heatmapFrom(HEATMAP_DAYS)}&bucket=month`)
+            .then(setHeatmapBuckets)
+            .catch((e) => setErr(String(e)));
     }, []);
 
     useEffect(() => {
@@ -119,10 +130,8 @@ export default function Progress({ nav, exerciseId }) {
     return (
         <div style={styles.container}>
             <BodyHeatmap
-                entries={heatmapEntries}
-                exercises={exercises}
+                buckets={heatmapBuckets}
                 onPartClick={handlePartClick}
-                timeRange={30}
             />
 
             <div style={styles.card}>
@@ -42,6 +42,28 @@ export default function Session({ nav, sessionId }) {
         }
     }
 
+    // Sets logged on another device arrive as they happen.
+    useEffect(() => {
+        if (!sessionId || typeof EventSource === "undefined") return;
+        const source = new EventSource(`${API_BASE}/sessions/${sessionId}/events`);
+        source.addEventListener("entry_added", (e) => {
+            const row = JSON.parse(e.data);
+            setLog((prev) => (prev.some((x) => x.id === row.id) ? prev : [row, ...prev]));
+        });
+        source.addEventListener("entry_deleted", (e) => {
+            const { id } = JSON.parse(e.data);
+            setLog((prev) => prev.filter((x) => x.id !== id));
+        });
+        source.addEventListener("bodyweight", (e) => {
+            const s = JSON.parse(e.data);
+            if (s.bodyweight_kg !== null) setBodyweight(String(s.bodyweight_kg));
+            loadEntries(); // totals of bodyweight exercises changed
+        });
+        source.addEventListener("resync", () => loadEntries());
+        source.addEventListener("session_ended", () => source.close());
+        return () => source.close();
+    }, [sessionId]);
+
     useEffect(() => {
         if (!sessionId) return;
 